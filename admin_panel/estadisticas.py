@@ -0,0 +1,169 @@
+# admin_panel/estadisticas.py
+"""
+Estadísticas del dashboard del administrador.
+
+Todos los contadores (totales, mascotas por estado de adopción, solicitudes por
+estado y altas por mes) salen de **una sola consulta**: cada bloque es una
+subconsulta escalar dentro de un ``json_build_object`` y PostgreSQL devuelve un
+único documento JSON. El resultado se guarda unos segundos en el caché para que
+recargar el dashboard no vuelva a recorrer las tablas.
+
+Con ``DASHBOARD_ESTADISTICAS_ESTIMADAS = True`` los totales y los desgloses por
+estado se estiman con ``pg_class.reltuples`` y los valores más frecuentes de
+``pg_stats`` (lo que deja ``ANALYZE``), sin leer las tablas. Útil cuando son
+muy grandes y alcanza con una cifra aproximada; las altas por mes siguen
+siendo exactas porque solo miran el último año.
+"""
+import json
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from mascotas.models import Mascota, SolicitudAdopcion
+from usuarios.models import Adoptante, Refugio
+
+CLAVE_ESTADISTICAS = 'admin_panel:estadisticas_dashboard'
+DURACION_ESTADISTICAS = 60
+MESES_ALTAS = 12
+
+
+def _usar_estimacion():
+    return getattr(settings, 'DASHBOARD_ESTADISTICAS_ESTIMADAS', False)
+
+
+def _inicio_periodo(hoy, meses=MESES_ALTAS):
+    """Primer día del mes que abre la ventana de ``meses`` meses hasta ``hoy``."""
+    indice = hoy.year * 12 + hoy.month - 1 - (meses - 1)
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def _altas_por_mes(tabla, columna):
+    return f"""(
+        SELECT COALESCE(json_object_agg(mes, total ORDER BY mes), '{{}}'::json)
+        FROM (
+            SELECT to_char(date_trunc('month', {columna}), 'YYYY-MM') AS mes, COUNT(*) AS total
+            FROM {tabla}
+            WHERE {columna} >= %(desde)s
+            GROUP BY 1
+        ) AS altas
+    )"""
+
+
+def _conteo_exacto(tabla):
+    return f"(SELECT COUNT(*) FROM {tabla})"
+
+
+def _conteo_estimado(tabla):
+    # reltuples vale -1 si la tabla nunca se analizó
+    return f"(SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = '{tabla}'::regclass)"
+
+
+def _desglose_exacto(tabla, expresion):
+    return f"""(
+        SELECT COALESCE(json_object_agg(valor, total), '{{}}'::json)
+        FROM (SELECT ({expresion})::text AS valor, COUNT(*) AS total FROM {tabla} GROUP BY 1) AS d
+    )"""
+
+
+def _desglose_estimado(tabla, columna):
+    # Frecuencias de los valores más comunes que guarda ANALYZE, por el total estimado
+    return f"""(
+        SELECT COALESCE(json_object_agg(u.valor, round(u.frecuencia * GREATEST(c.reltuples, 0))::bigint), '{{}}'::json)
+        FROM pg_stats AS s
+        CROSS JOIN LATERAL unnest(s.most_common_vals::text::text[], s.most_common_freqs) AS u(valor, frecuencia)
+        JOIN pg_class AS c ON c.oid = '{tabla}'::regclass
+        WHERE s.schemaname = current_schema() AND s.tablename = '{tabla}' AND s.attname = '{columna}'
+    )"""
+
+
+def consulta_estadisticas(estimadas=False):
+    """Arma el SQL de las estadísticas (un único SELECT que devuelve JSON)."""
+    adoptantes = Adoptante._meta.db_table
+    refugios = Refugio._meta.db_table
+    mascotas = Mascota._meta.db_table
+    solicitudes = SolicitudAdopcion._meta.db_table
+
+    if estimadas:
+        conteo = _conteo_estimado
+        mascotas_por_estado = _desglose_estimado(mascotas, 'adoptada')
+        solicitudes_por_estado = _desglose_estimado(solicitudes, 'estado')
+    else:
+        conteo = _conteo_exacto
+        mascotas_por_estado = _desglose_exacto(mascotas, 'adoptada')
+        solicitudes_por_estado = _desglose_exacto(solicitudes, 'estado')
+
+    return f"""
+        SELECT json_build_object(
+            'usuarios', {conteo(adoptantes)},
+            'refugios', {conteo(refugios)},
+            'mascotas', {conteo(mascotas)},
+            'solicitudes', {conteo(solicitudes)},
+            'mascotas_por_estado', {mascotas_por_estado},
+            'solicitudes_por_estado', {solicitudes_por_estado},
+            'altas_por_mes', json_build_object(
+                'usuarios', {_altas_por_mes(adoptantes, 'fecha_registro')},
+                'mascotas', {_altas_por_mes(mascotas, 'fecha_ingreso')},
+                'solicitudes', {_altas_por_mes(solicitudes, 'fecha_solicitud')}
+            )
+        )
+    """
+
+
+def _normalizar(datos, estimadas, desde):
+    # Los booleanos llegan como texto: 'true'/'false' (exacto) o 't'/'f' (pg_stats)
+    por_adopcion = {valor[:1]: total for valor, total in datos['mascotas_por_estado'].items()}
+    por_estado = dict.fromkeys(
+        (clave for clave, _ in SolicitudAdopcion.ESTADOS), 0
+    )
+    por_estado.update(datos['solicitudes_por_estado'])
+
+    meses = []
+    actual = desde
+    for _ in range(MESES_ALTAS):
+        meses.append(actual.strftime('%Y-%m'))
+        actual = date(actual.year + actual.month // 12, actual.month % 12 + 1, 1)
+    altas = [
+        {
+            'mes': mes,
+            'usuarios': datos['altas_por_mes']['usuarios'].get(mes, 0),
+            'mascotas': datos['altas_por_mes']['mascotas'].get(mes, 0),
+            'solicitudes': datos['altas_por_mes']['solicitudes'].get(mes, 0),
+        }
+        for mes in meses
+    ]
+
+    return {
+        'total_usuarios': datos['usuarios'],
+        'total_refugios': datos['refugios'],
+        'total_mascotas': datos['mascotas'],
+        'total_solicitudes': datos['solicitudes'],
+        'mascotas_disponibles': por_adopcion.get('f', 0),
+        'mascotas_adoptadas': por_adopcion.get('t', 0),
+        'solicitudes_por_estado': por_estado,
+        'altas_por_mes': altas,
+        'estimadas': estimadas,
+    }
+
+
+def calcular_estadisticas(estimadas=None):
+    """Ejecuta la consulta única y devuelve las estadísticas ya normalizadas."""
+    if estimadas is None:
+        estimadas = _usar_estimacion()
+    desde = _inicio_periodo(date.today())
+    with connection.cursor() as cursor:
+        cursor.execute(consulta_estadisticas(estimadas), {'desde': desde})
+        datos = cursor.fetchone()[0]
+    if isinstance(datos, str):  # según el driver el JSON puede llegar sin decodificar
+        datos = json.loads(datos)
+    return _normalizar(datos, estimadas, desde)
+
+
+def obtener_estadisticas():
+    """Estadísticas del dashboard, cacheadas ``DURACION_ESTADISTICAS`` segundos."""
+    estadisticas = cache.get(CLAVE_ESTADISTICAS)
+    if estadisticas is None:
+        estadisticas = calcular_estadisticas()
+        cache.set(CLAVE_ESTADISTICAS, estadisticas, DURACION_ESTADISTICAS)
+    return estadisticas
@@ -2,6 +2,7 @@ from django import forms
 from django.contrib.auth.models import User
 from usuarios.models import Adoptante
 from mascotas.models import Refugio, Mascota, SolicitudAdopcion
+from mascotas.forms import ImagenMascotaMixin
 
 class CrearRefugioUserForm(forms.Form):
     # Campos del User
@@ -84,7 +85,7 @@ class RefugioForm(forms.ModelForm):
         self.fields['email'].required = False
 
 # ---- Mascota ----
-class MascotaForm(forms.ModelForm):
+class MascotaForm(ImagenMascotaMixin, forms.ModelForm):
     class Meta:
         model = Mascota
         fields = ['nombre', 'especie', 'raza', 'edad', 'adoptada', 'imagen', 'refugio']
@@ -1,9 +1,16 @@
+import csv
+import io
+import json
+from datetime import date
+
+from django.core.cache import cache
 from django.test import TestCase, Client
 from django.contrib.auth.models import User
 from django.urls import reverse
 from django.contrib.messages import get_messages
 from usuarios.models import Refugio, Adoptante 
 from mascotas.models import Mascota, SolicitudAdopcion
+from .estadisticas import CLAVE_ESTADISTICAS, calcular_estadisticas, obtener_estadisticas
 
 # ========================================================================
 # CÓDIGO DE SETUP: CREACIÓN DE OBJETOS BÁSICOS PARA EL ADMIN PANEL
@@ -196,4 +203,104 @@ class RefugiosManagementTests(AdminPanelSetupMixin):
         
         # Verificar que el objeto haya sido eliminado (y el User asociado)
         self.assertFalse(Refugio.objects.filter(pk=refugio_to_delete_pk).exists())
-        self.assertFalse(User.objects.filter(pk=refugio_user_pk).exists())
\ No newline at end of file
+        self.assertFalse(User.objects.filter(pk=refugio_user_pk).exists())
+
+# ========================================================================
+# C. PRUEBAS DE ESTADÍSTICAS DEL DASHBOARD
+# ========================================================================
+
+class DashboardEstadisticasTests(AdminPanelSetupMixin):
+    """Verifica que el dashboard salga de una única consulta cacheada."""
+
+    def setUp(self):
+        super().setUp()
+        cache.delete(CLAVE_ESTADISTICAS)
+        self.addCleanup(cache.delete, CLAVE_ESTADISTICAS)
+        Mascota.objects.create(
+            nombre='Adoptado', especie='Gato', raza='Siamés', edad=2,
+            sexo='M', refugio=self.refugio, adoptada=True,
+        )
+        for estado in ('pendiente', 'pendiente', 'aprobada'):
+            SolicitudAdopcion.objects.create(
+                mascota=self.mascota, nombre_adoptante='Ana', apellido_adoptante='Pérez',
+                telefono='1', email='ana@test.com', direccion='X', estado=estado,
+            )
+
+    def test_calcula_todo_en_una_consulta(self):
+        with self.assertNumQueries(1):
+            estadisticas = calcular_estadisticas(estimadas=False)
+
+        self.assertEqual(estadisticas['total_usuarios'], 1)
+        self.assertEqual(estadisticas['total_refugios'], 1)
+        self.assertEqual(estadisticas['total_mascotas'], 2)
+        self.assertEqual(estadisticas['total_solicitudes'], 3)
+        self.assertEqual(estadisticas['mascotas_disponibles'], 1)
+        self.assertEqual(estadisticas['mascotas_adoptadas'], 1)
+        self.assertEqual(
+            estadisticas['solicitudes_por_estado'],
+            {'pendiente': 2, 'aprobada': 1, 'rechazada': 0},
+        )
+
+    def test_altas_por_mes_incluye_el_mes_actual(self):
+        altas = calcular_estadisticas(estimadas=False)['altas_por_mes']
+        self.assertEqual(len(altas), 12)
+        actual = altas[-1]
+        self.assertEqual(actual['mes'], date.today().strftime('%Y-%m'))
+        self.assertEqual(actual['mascotas'], 2)
+        self.assertEqual(actual['solicitudes'], 3)
+
+    def test_modo_estimado_no_falla_sin_analyze(self):
+        estadisticas = calcular_estadisticas(estimadas=True)
+        self.assertTrue(estadisticas['estimadas'])
+        self.assertGreaterEqual(estadisticas['total_mascotas'], 0)
+
+    def test_dashboard_usa_el_cache(self):
+        self.client.login(username='admin_test', password='adminpass')
+        self.client.get(reverse('admin_panel:dashboard'))
+        self.assertIsNotNone(cache.get(CLAVE_ESTADISTICAS))
+
+        # Con el caché lleno el dashboard no vuelve a consultar las tablas
+        with self.assertNumQueries(0):
+            obtener_estadisticas()
+        response = self.client.get(reverse('admin_panel:dashboard'))
+        self.assertContains(response, 'Mascotas adoptadas')
+
+# ========================================================================
+# D. PRUEBAS DE EXPORTACIÓN EN STREAMING
+# ========================================================================
+
+class ExportacionTablasTests(AdminPanelSetupMixin):
+    """Verifica las descargas CSV / JSON Lines de los listados."""
+
+    def setUp(self):
+        super().setUp()
+        self.client.login(username='admin_test', password='adminpass')
+
+    def descargar(self, tabla, formato):
+        response = self.client.get(reverse('admin_panel:exportar_tabla', args=[tabla, formato]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_exportar_mascotas_csv(self):
+        filas = list(csv.reader(io.StringIO(self.descargar('mascotas', 'csv'))))
+        self.assertEqual(filas[0][:3], ['id', 'nombre', 'especie'])
+        self.assertEqual(len(filas), 2)
+        self.assertEqual(filas[1][1], self.mascota.nombre)
+        self.assertEqual(filas[1][-1], self.refugio.nombre)
+
+    def test_exportar_usuarios_jsonl(self):
+        lineas = self.descargar('usuarios', 'jsonl').splitlines()
+        self.assertEqual(len(lineas), 1)
+        usuario = json.loads(lineas[0])
+        self.assertEqual(usuario['usuario'], 'adoptante_test')
+        self.assertEqual(usuario['cedula'], '111')
+
+    def test_tabla_desconocida_da_404(self):
+        response = self.client.get(reverse('admin_panel:exportar_tabla', args=['tareas', 'csv']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_solo_staff_puede_exportar(self):
+        self.client.login(username='adoptante_test', password='adoptantepass')
+        response = self.client.get(reverse('admin_panel:exportar_tabla', args=['usuarios', 'csv']))
+        self.assertEqual(response.status_code, 302)
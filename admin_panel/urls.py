@@ -6,6 +6,7 @@ app_name = "admin_panel"
 
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
+    path('exportar/<str:tabla>.<str:formato>', views.exportar_tabla, name='exportar_tabla'),
 
     # Usuarios
     path('usuarios/', views.gestion_usuarios, name='gestion_usuarios'),
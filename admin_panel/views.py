@@ -3,9 +3,12 @@ from django.contrib.auth.decorators import user_passes_test
 from django.contrib import messages
 from django.contrib.auth.models import User
 from django.urls import reverse
+from django.http import Http404
 from usuarios.forms import UserForm, AdoptanteForm
 from usuarios.models import Adoptante
 from mascotas.models import Mascota, Refugio, SolicitudAdopcion
+from .estadisticas import obtener_estadisticas
+from .exportar import CONSULTAS, FORMATOS, respuesta_exportacion
 from .forms import CrearUsuarioForm, EditarUsuarioForm, EditarUserForm, RefugioForm, MascotaForm, SolicitudForm, SolicitudAdminForm, CrearRefugioUserForm # <-- ¡Añade esto!
 
 
@@ -17,24 +20,24 @@ def admin_required(view_func):
 # ---------- DASHBOARD ----------
 @admin_required
 def dashboard(request):
-    total_usuarios = Adoptante.objects.count()
-    total_mascotas = Mascota.objects.count()
-    total_refugios = Refugio.objects.count()
-    total_solicitudes = SolicitudAdopcion.objects.count()
-
-    context = {
-        'total_usuarios': total_usuarios,
-        'total_mascotas': total_mascotas,
-        'total_refugios': total_refugios,
-        'total_solicitudes': total_solicitudes,
-    }
+    # Una sola consulta (cacheada unos segundos) en vez de un COUNT por tabla
+    context = obtener_estadisticas()
     return render(request, 'admin_panel/dashboard.html', context)
 
 
+# ---------- EXPORTACIÓN ----------
+@admin_required
+def exportar_tabla(request, tabla, formato):
+    """Descarga completa de un listado en CSV o JSON Lines (en streaming)."""
+    if tabla not in CONSULTAS or formato not in FORMATOS:
+        raise Http404("Exportación no disponible.")
+    return respuesta_exportacion(tabla, formato)
+
+
 # ---------- USUARIOS ----------
 @admin_required
 def gestion_usuarios(request):
-    adoptantes = Adoptante.objects.select_related('user').all()
+    adoptantes = CONSULTAS['usuarios']()
     return render(request, 'admin_panel/usuarios.html', {'adoptantes': adoptantes})
 
 @admin_required
@@ -98,7 +101,7 @@ def eliminar_usuario(request, user_id):
 
 @admin_required
 def gestion_refugios(request):
-    refugios = Refugio.objects.select_related('usuario').all() # Mejorado para select_related
+    refugios = CONSULTAS['refugios']()
     return render(request, 'admin_panel/refugios.html', {'refugios': refugios})
 
 @admin_required
@@ -190,7 +193,7 @@ def eliminar_refugio(request, refugio_id):
 # ---------- MASCOTAS ----------
 @admin_required
 def gestion_mascotas(request):
-    mascotas = Mascota.objects.select_related('refugio').all()
+    mascotas = CONSULTAS['mascotas']()
     return render(request, 'admin_panel/mascotas.html', {'mascotas': mascotas})
 
 # admin_panel/views.py
@@ -241,7 +244,7 @@ def eliminar_mascota(request, mascota_id):
 # ---------- SOLICITUDES ----------
 @admin_required
 def gestion_solicitudes(request):
-    solicitudes = SolicitudAdopcion.objects.select_related('mascota').all()
+    solicitudes = CONSULTAS['solicitudes']()
     return render(request, 'admin_panel/solicitudes.html', {'solicitudes': solicitudes})
 
 @admin_required
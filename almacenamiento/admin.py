@@ -0,0 +1 @@
+from django.contrib import admin
@@ -0,0 +1,114 @@
+# almacenamiento/management/commands/limpiar_media.py
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from mascotas.models import Mascota
+from usuarios.models import Adoptante
+
+CARPETA_CUARENTENA = '.cuarentena'
+# Archivos que las plantillas usan directamente y no figuran en ninguna fila
+PROTEGIDOS = {'mascotas/placeholder.png'}
+
+
+def recorrer(carpeta):
+    """Genera las entradas de archivo bajo ``carpeta`` sin armar listas en memoria."""
+    with os.scandir(carpeta) as entradas:
+        for entrada in entradas:
+            if entrada.is_dir(follow_symlinks=False):
+                if entrada.name != CARPETA_CUARENTENA:
+                    yield from recorrer(entrada.path)
+            elif entrada.is_file(follow_symlinks=False):
+                yield entrada
+
+
+def rutas_referenciadas(chunk_size):
+    """Rutas relativas a MEDIA_ROOT que alguna fila de la base usa."""
+    referenciadas = set(PROTEGIDOS)
+
+    mascotas = Mascota.objects.order_by().values_list('imagen', 'variantes')
+    for imagen, variantes in mascotas.iterator(chunk_size=chunk_size):
+        if imagen:
+            referenciadas.add(imagen)
+        for variante in (variantes or {}).values():
+            referenciadas.update(r for r in (variante.get('ruta'), variante.get('webp')) if r)
+
+    adoptantes = Adoptante.objects.order_by().values_list('foto_perfil', 'foto_miniatura')
+    for foto, miniatura in adoptantes.iterator(chunk_size=chunk_size):
+        referenciadas.update(r for r in (foto, miniatura) if r)
+
+    return referenciadas
+
+
+class Command(BaseCommand):
+    help = (
+        "Busca en MEDIA_ROOT archivos que ninguna Mascota ni Adoptante referencia "
+        "(imágenes de registros eliminados, variantes viejas) y los borra o los "
+        "mueve a cuarentena por lotes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Solo lista los huérfanos, no toca nada.')
+        parser.add_argument('--cuarentena', action='store_true',
+                            help=f'Mueve los huérfanos a MEDIA_ROOT/{CARPETA_CUARENTENA}/ en lugar de borrarlos.')
+        parser.add_argument('--lote', type=int, default=500,
+                            help='Huérfanos procesados por lote (por defecto 500).')
+        parser.add_argument('--antiguedad-minima', type=int, default=60,
+                            help='Ignora archivos modificados hace menos de estos minutos '
+                                 '(subidas en curso). Por defecto 60.')
+
+    def handle(self, *args, **options):
+        raiz = os.fspath(settings.MEDIA_ROOT)
+        if not os.path.isdir(raiz):
+            self.stdout.write(f"{raiz} no existe; nada para limpiar.")
+            return
+
+        referenciadas = rutas_referenciadas(chunk_size=2000)
+        limite = time.time() - options['antiguedad_minima'] * 60
+        destino = os.path.join(raiz, CARPETA_CUARENTENA, time.strftime('%Y%m%d-%H%M%S'))
+
+        lote, huerfanos, liberados = [], 0, 0
+        for entrada in recorrer(raiz):
+            relativa = os.path.relpath(entrada.path, raiz).replace(os.sep, '/')
+            if relativa in referenciadas:
+                continue
+            stat = entrada.stat(follow_symlinks=False)
+            if stat.st_mtime > limite:
+                continue
+
+            huerfanos += 1
+            liberados += stat.st_size
+            lote.append(relativa)
+            if len(lote) >= options['lote']:
+                self._procesar_lote(raiz, lote, destino, limite, options)
+                lote = []
+        if lote:
+            self._procesar_lote(raiz, lote, destino, limite, options)
+
+        accion = 'encontrados' if options['dry_run'] else ('en cuarentena' if options['cuarentena'] else 'eliminados')
+        self.stdout.write(self.style.SUCCESS(
+            f"{huerfanos} archivos huérfanos {accion} ({liberados / 1024 / 1024:.1f} MB)."
+        ))
+
+    def _procesar_lote(self, raiz, lote, destino, limite, options):
+        for relativa in lote:
+            if options['dry_run']:
+                self.stdout.write(f"[dry-run] {relativa}")
+                continue
+            origen = os.path.join(raiz, relativa)
+            try:
+                # Una subida con el mismo contenido pudo reutilizarlo después de la
+                # foto de las rutas referenciadas (el storage le actualiza el mtime)
+                if os.stat(origen).st_mtime > limite:
+                    continue
+                if options['cuarentena']:
+                    nuevo = os.path.join(destino, relativa)
+                    os.makedirs(os.path.dirname(nuevo), exist_ok=True)
+                    os.replace(origen, nuevo)
+                else:
+                    os.remove(origen)
+            except FileNotFoundError:
+                pass  # ya no estaba (otro proceso lo movió o borró)
@@ -0,0 +1,2 @@
+# El almacenamiento por contenido no guarda estado en la base: los archivos
+# huérfanos se detectan comparando MEDIA_ROOT con las filas (ver limpiar_media).
@@ -0,0 +1,63 @@
+# almacenamiento/storage.py
+"""
+Almacenamiento de archivos direccionado por contenido.
+
+Cada archivo se guarda con el nombre de su hash SHA-256, repartido en
+subcarpetas (``mascotas/ab/cd/abcd....jpg``) para que ningún directorio crezca
+demasiado. Si el mismo contenido ya existe no se vuelve a escribir. Así el disco
+y los backups crecen con las imágenes distintas y no con la cantidad de subidas.
+
+No se lleva un conteo de referencias: Django no llama a ``delete()`` cuando se
+reemplaza un archivo o se borra una fila, así que el conteo nunca podría bajar
+de forma confiable. Un mismo archivo puede estar en varias filas, por lo que
+:meth:`AlmacenamientoPorContenido.delete` no borra nada; los archivos que ya
+no usa ninguna fila los elimina ``manage.py limpiar_media``.
+"""
+import hashlib
+import os
+import posixpath
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+
+
+class AlmacenamientoPorContenido(FileSystemStorage):
+
+    def get_available_name(self, name, max_length=None):
+        # El nombre definitivo lo decide _save() a partir del contenido
+        return name
+
+    def nombre_por_contenido(self, name, content):
+        """Ruta ``<carpeta>/<h[:2]>/<h[2:4]>/<hash><ext>`` para ``content``."""
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk if isinstance(chunk, bytes) else chunk.encode())
+        content.seek(0)
+        hash_hex = digest.hexdigest()
+        carpeta = posixpath.dirname(name.replace('\\', '/'))
+        extension = os.path.splitext(name)[1].lower()
+        return posixpath.join(carpeta, hash_hex[:2], hash_hex[2:4], hash_hex + extension)
+
+    def _save(self, name, content):
+        destino = self.nombre_por_contenido(name, content)
+        if not self.exists(destino):
+            # Se escribe a un temporal y se renombra: nunca queda visible un
+            # archivo a medio escribir. Si otra petición guardó el mismo
+            # contenido a la vez, el reemplazo es inofensivo (bytes idénticos).
+            temporal = posixpath.join(posixpath.dirname(destino), f'.tmp-{uuid.uuid4().hex}')
+            temporal = super()._save(temporal, content)
+            os.replace(self.path(temporal), self.path(destino))
+        else:
+            # Se reutiliza un archivo que puede llevar tiempo huérfano: se actualiza
+            # su mtime para que limpiar_media lo trate como una subida reciente
+            os.utime(self.path(destino))
+        return destino
+
+    def delete(self, name):
+        """
+        No borra: el archivo puede seguir en uso por otra fila. Recuperar el
+        espacio depende por completo de ``manage.py limpiar_media``, que
+        elimina los archivos que ya no usa ninguna fila.
+        """
+        if not name:
+            raise ValueError("The name must be given to delete().")
@@ -0,0 +1,126 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from io import StringIO
+import os
+import shutil
+import tempfile
+import time
+
+from usuarios.models import Refugio
+from mascotas.models import Mascota
+
+from .storage import AlmacenamientoPorContenido
+
+
+# ========================================================================
+# PRUEBAS DEL ALMACENAMIENTO POR CONTENIDO
+# ========================================================================
+
+class AlmacenamientoPorContenidoTests(TestCase):
+
+    def setUp(self):
+        self.carpeta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.carpeta, ignore_errors=True)
+        self.storage = AlmacenamientoPorContenido(location=self.carpeta)
+
+    def test_nombre_segun_hash_en_subcarpetas(self):
+        nombre = self.storage.save('mascotas/LUNA.JPG', ContentFile(b'luna'))
+        self.assertRegex(nombre, r'^mascotas/([0-9a-f]{2})/([0-9a-f]{2})/\1\2[0-9a-f]{60}\.jpg$')
+        self.assertTrue(self.storage.exists(nombre))
+
+    def test_mismo_contenido_no_se_duplica(self):
+        a = self.storage.save('mascotas/a.jpg', ContentFile(b'igual'))
+        b = self.storage.save('mascotas/b.jpg', ContentFile(b'igual'))
+        c = self.storage.save('mascotas/c.jpg', ContentFile(b'distinto'))
+
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, c)
+
+    def test_borrar_no_elimina_contenido_compartido(self):
+        nombre = self.storage.save('profiles/yo.png', ContentFile(b'foto'))
+        self.storage.save('profiles/yo_otra_vez.png', ContentFile(b'foto'))
+
+        # Lo elimina limpiar_media cuando ninguna fila lo usa
+        self.storage.delete(nombre)
+        self.assertTrue(self.storage.exists(nombre))
+
+    def test_no_deja_temporales(self):
+        nombre = self.storage.save('mascotas/x.jpg', ContentFile(b'x'))
+        carpeta = self.storage.path(nombre).rsplit('/', 1)[0]
+        self.assertEqual(os.listdir(carpeta), [nombre.rsplit('/', 1)[1]])
+
+
+# ========================================================================
+# PRUEBAS DEL RECOLECTOR DE MEDIA HUÉRFANA
+# ========================================================================
+
+class LimpiarMediaTests(TestCase):
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        user = User.objects.create_user(username='refugio_media', password='x')
+        refugio = Refugio.objects.create(usuario=user, nombre='Refugio Media', email='m@test.com')
+        Mascota.objects.create(
+            nombre='Nala', especie='Gato', edad=1, refugio=refugio,
+            imagen='mascotas/nala.jpg',
+            variantes={'miniatura': {'ruta': 'mascotas/variantes/nala_400w.jpg', 'ancho': 400, 'alto': 300}},
+        )
+        for ruta in ('mascotas/nala.jpg', 'mascotas/variantes/nala_400w.jpg',
+                     'mascotas/placeholder.png', 'mascotas/huerfana.jpg', 'profiles/vieja.png'):
+            self._crear(ruta)
+
+    def _crear(self, ruta, antiguo=True):
+        completa = os.path.join(self.media, ruta)
+        os.makedirs(os.path.dirname(completa), exist_ok=True)
+        with open(completa, 'wb') as archivo:
+            archivo.write(b'x')
+        if antiguo:
+            hace_un_dia = time.time() - 86400
+            os.utime(completa, (hace_un_dia, hace_un_dia))
+
+    def _existe(self, ruta):
+        return os.path.exists(os.path.join(self.media, ruta))
+
+    def test_dry_run_no_toca_nada(self):
+        salida = StringIO()
+        call_command('limpiar_media', dry_run=True, stdout=salida)
+        self.assertIn('mascotas/huerfana.jpg', salida.getvalue())
+        self.assertTrue(self._existe('mascotas/huerfana.jpg'))
+
+    def test_borra_solo_huerfanos(self):
+        call_command('limpiar_media', lote=1, stdout=StringIO())
+        self.assertFalse(self._existe('mascotas/huerfana.jpg'))
+        self.assertFalse(self._existe('profiles/vieja.png'))
+        self.assertTrue(self._existe('mascotas/nala.jpg'))
+        self.assertTrue(self._existe('mascotas/variantes/nala_400w.jpg'))
+        self.assertTrue(self._existe('mascotas/placeholder.png'))
+
+    def test_respeta_archivos_recientes(self):
+        self._crear('mascotas/subiendo.jpg', antiguo=False)
+        call_command('limpiar_media', stdout=StringIO())
+        self.assertTrue(self._existe('mascotas/subiendo.jpg'))
+
+    def test_respeta_huerfanos_reutilizados_por_una_subida(self):
+        storage = AlmacenamientoPorContenido()
+        nombre = storage.save('mascotas/vieja.jpg', ContentFile(b'repetida'))
+        hace_un_dia = time.time() - 86400
+        os.utime(storage.path(nombre), (hace_un_dia, hace_un_dia))
+
+        # Nueva subida con los mismos bytes: reutiliza el huérfano y su fila todavía
+        # no existe (como si llegara después de que limpiar_media leyó la base)
+        self.assertEqual(storage.save('mascotas/nueva.jpg', ContentFile(b'repetida')), nombre)
+        call_command('limpiar_media', stdout=StringIO())
+        self.assertTrue(self._existe(nombre))
+
+    def test_cuarentena_mueve_en_lugar_de_borrar(self):
+        call_command('limpiar_media', cuarentena=True, stdout=StringIO())
+        self.assertFalse(self._existe('mascotas/huerfana.jpg'))
+        movidos = [f for _, _, archivos in os.walk(os.path.join(self.media, '.cuarentena')) for f in archivos]
+        self.assertCountEqual(movidos, ['huerfana.jpg', 'vieja.png'])
@@ -1,12 +1,30 @@
 from django.contrib import admin
+from django.db.models import Q
 from .models import Mascota, Refugio, SolicitudAdopcion
+from .busqueda import buscar_mascotas
+from usuarios.contadores import eliminar_y_recalcular
 
 # Registrar Mascota en el admin
 @admin.register(Mascota)
 class MascotaAdmin(admin.ModelAdmin):
     list_display = ('nombre', 'especie', 'raza', 'edad', 'adoptada', 'fecha_ingreso', 'refugio')
     list_filter = ('especie', 'adoptada', 'refugio')
-    search_fields = ('nombre', 'raza', 'refugio__nombre')
+    search_fields = ('nombre', 'raza', 'especie', 'descripcion', 'refugio__nombre')
+
+    def get_search_results(self, request, queryset, search_term):
+        # Usa el índice de texto completo/trigramas en lugar de ILIKE por campo;
+        # el nombre del refugio se sigue buscando como antes
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        coincidencias = buscar_mascotas(Mascota.objects.all(), search_term).values('pk')
+        return queryset.filter(
+            Q(pk__in=coincidencias) | Q(refugio__nombre__icontains=search_term)
+        ), False
+
+    def delete_queryset(self, request, queryset):
+        # El borrado en bloque no pasa por delete() de cada mascota
+        eliminar_y_recalcular(queryset, 'refugio_id')
 
 # Registrar Refugio en el admin
 @admin.register(Refugio)
@@ -19,3 +37,7 @@ class SolicitudAdopcionAdmin(admin.ModelAdmin):
     list_display = ('nombre_adoptante', 'apellido_adoptante', 'mascota', 'estado', 'fecha_solicitud')
     list_filter = ('estado',)
     search_fields = ('nombre_adoptante', 'apellido_adoptante', 'mascota__nombre')
+    raw_id_fields = ('adoptante',)
+
+    def delete_queryset(self, request, queryset):
+        eliminar_y_recalcular(queryset, 'mascota__refugio_id')
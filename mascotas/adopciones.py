@@ -0,0 +1,154 @@
+# mascotas/adopciones.py
+"""
+Aprobación de solicitudes de adopción.
+
+Aprobar una solicitud es una sola transacción: se bloquea la fila de la
+mascota con ``SELECT ... FOR UPDATE`` (así dos personas del refugio que
+aprueban a la vez quedan en fila y solo gana la primera), se aprueba la
+solicitud, se rechazan de un solo ``UPDATE`` las demás pendientes de esa
+mascota y se la marca como adoptada.
+
+Las acciones masivas del listado del refugio (:func:`aprobar_solicitudes` y
+:func:`rechazar_solicitudes`) cambian el estado de toda la selección con
+``UPDATE`` acotados al refugio y recalculan ``adoptada`` de las mascotas
+afectadas en una sola pasada.
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef
+
+from usuarios.contadores import CAMPO_SOLICITUD, aplicar_diferencia, recalcular_estadisticas
+from usuarios.facetas import invalidar_facetas
+from .models import Mascota, SolicitudAdopcion
+
+
+# Restricción única (mascota, adoptante) de SolicitudAdopcion
+RESTRICCION_SOLICITUD_UNICA = 'solicitud_mascota_adoptante_unica'
+
+
+class AdopcionNoDisponible(Exception):
+    """La mascota ya fue adoptada (por esta u otra solicitud)."""
+
+
+def registrar_solicitud(solicitud):
+    """
+    Inserta ``solicitud`` confiando en la restricción única de la base en vez
+    de consultar antes si existe: un solo INSERT, sin carrera entre dos envíos
+    simultáneos. Devuelve False si el adoptante ya había pedido esa mascota.
+    """
+    try:
+        with transaction.atomic():
+            solicitud.save()
+    except IntegrityError as error:
+        diag = getattr(error.__cause__, 'diag', None)
+        if getattr(diag, 'constraint_name', None) != RESTRICCION_SOLICITUD_UNICA:
+            raise
+        return False
+    return True
+
+
+def aprobar_solicitud(solicitud_id):
+    """
+    Aprueba la solicitud ``solicitud_id`` y rechaza las demás pendientes de la
+    misma mascota. Devuelve la cantidad de solicitudes rechazadas.
+
+    Lanza :class:`AdopcionNoDisponible` si la mascota ya está adoptada.
+    """
+    with transaction.atomic():
+        mascota_id = SolicitudAdopcion.objects.values_list('mascota_id', flat=True).get(pk=solicitud_id)
+        mascota = Mascota.objects.select_for_update().only('pk', 'adoptada', 'refugio').get(pk=mascota_id)
+        if mascota.adoptada:
+            raise AdopcionNoDisponible(f"La mascota {mascota_id} ya fue adoptada.")
+
+        # Con la mascota bloqueada el estado de la solicitud ya no puede cambiar por otra aprobación
+        estado_previo = SolicitudAdopcion.objects.values_list('estado', flat=True).get(pk=solicitud_id)
+        SolicitudAdopcion.objects.filter(pk=solicitud_id).update(estado='aprobada')
+        rechazadas = (SolicitudAdopcion.objects
+                      .filter(mascota_id=mascota_id, estado='pendiente')
+                      .exclude(pk=solicitud_id)
+                      .update(estado='rechazada'))
+        Mascota.objects.filter(pk=mascota_id).update(adoptada=True)
+
+        # update() no pasa por save(): los contadores del refugio se ajustan acá
+        cambios = Counter({'mascotas_disponibles': -1, 'solicitudes_aprobadas': 1})
+        cambios[CAMPO_SOLICITUD[estado_previo]] -= 1
+        cambios['solicitudes_pendientes'] -= rechazadas
+        cambios['solicitudes_rechazadas'] += rechazadas
+        aplicar_diferencia(None, (mascota.refugio_id, cambios))
+
+    invalidar_facetas()
+    return rechazadas
+
+
+def _recalcular_adoptada(mascota_ids):
+    """Una mascota queda adoptada si y solo si tiene una solicitud aprobada (un UPDATE)."""
+    if mascota_ids:
+        aprobada = SolicitudAdopcion.objects.filter(mascota=OuterRef('pk'), estado='aprobada')
+        Mascota.objects.filter(pk__in=mascota_ids).update(adoptada=Exists(aprobada))
+
+
+def aprobar_solicitudes(refugio, ids):
+    """
+    Aprobación masiva desde el listado del refugio. Por cada mascota todavía
+    disponible se aprueba la solicitud seleccionada más antigua y se rechazan
+    sus demás pendientes (seleccionadas o no). Solo se tocan solicitudes de
+    mascotas del ``refugio``. Devuelve ``(aprobadas, rechazadas, omitidas)``:
+    ``omitidas`` son las seleccionadas cuya mascota ya estaba adoptada.
+    """
+    with transaction.atomic():
+        candidatas = list(
+            SolicitudAdopcion.objects
+            .filter(pk__in=ids, mascota__refugio=refugio)
+            .exclude(estado='aprobada')
+            .order_by('fecha_solicitud', 'pk')
+            .values_list('pk', 'mascota_id')
+        )
+        # Se bloquean en orden de pk para no cruzarse con otras aprobaciones
+        disponibles = set(
+            Mascota.objects
+            .select_for_update()
+            .filter(pk__in={mascota_id for _, mascota_id in candidatas}, adoptada=False)
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+        elegidas = {}
+        for pk, mascota_id in candidatas:
+            if mascota_id in disponibles:
+                elegidas.setdefault(mascota_id, pk)
+
+        aprobadas = SolicitudAdopcion.objects.filter(pk__in=elegidas.values()).update(estado='aprobada')
+        rechazadas = (SolicitudAdopcion.objects
+                      .filter(mascota_id__in=elegidas, estado='pendiente')
+                      .update(estado='rechazada'))
+        _recalcular_adoptada(list(elegidas))
+        recalcular_estadisticas([refugio.pk])
+
+    invalidar_facetas()
+    omitidas = sum(1 for _, mascota_id in candidatas if mascota_id not in disponibles)
+    return aprobadas, rechazadas, omitidas
+
+
+def rechazar_solicitudes(refugio, ids):
+    """
+    Rechazo masivo con un único UPDATE acotado a las mascotas del
+    ``refugio``. Si se rechaza una solicitud aprobada, la mascota vuelve a
+    quedar disponible. Devuelve la cantidad de solicitudes rechazadas.
+    """
+    with transaction.atomic():
+        seleccion = SolicitudAdopcion.objects.filter(pk__in=ids, mascota__refugio=refugio)
+        # Mascotas que pueden perder su solicitud aprobada
+        mascota_ids = list(
+            Mascota.objects
+            .select_for_update()
+            .filter(pk__in=seleccion.filter(estado='aprobada').values('mascota_id'))
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+        rechazadas = seleccion.exclude(estado='rechazada').update(estado='rechazada')
+        _recalcular_adoptada(mascota_ids)
+        recalcular_estadisticas([refugio.pk])
+
+    if mascota_ids:
+        invalidar_facetas()
+    return rechazadas
@@ -0,0 +1,122 @@
+# mascotas/archivo.py
+"""
+Archivo de solicitudes y seguimientos cerrados.
+
+Las solicitudes rechazadas y los seguimientos finalizados o cancelados se
+acumulan en las mismas tablas que consultan las vistas del día a
+día. :func:`archivar` los mueve a sus tablas de archivo
+(``SolicitudAdopcionArchivada`` y ``SeguimientoArchivado``) por lotes: cada lote
+es **una sola sentencia**::
+
+    WITH movidas AS (DELETE FROM activa WHERE id IN (<lote>) RETURNING ...)
+    INSERT INTO archivo (...) SELECT ..., now() FROM movidas
+
+así una fila nunca queda en las dos tablas ni en ninguna. Se usa desde
+``manage.py archivar_cerrados``.
+
+Las solicitudes **aprobadas no se archivan nunca**: son el único vínculo
+adoptante → mascota, y de ellas leen ``seguimientos_de_adoptante``, los
+recordatorios por email y la exportación de datos personales, también para
+las revisiones de un año después de la adopción.
+
+Las tablas de archivo tienen las mismas columnas y en el mismo orden que las
+activas, por lo que las lecturas que piden el historial (por ejemplo
+``mis_solicitudes?historial=1``) hacen un ``UNION ALL`` con
+:func:`historial_solicitudes`.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from seguimiento.models import Seguimiento, SeguimientoArchivado
+from usuarios.contadores import recalcular_estadisticas
+from .models import Mascota, SolicitudAdopcion, SolicitudAdopcionArchivada
+
+ANTIGUEDAD_DIAS = 365
+TAMANO_LOTE = 1000
+
+
+def antiguedad_por_defecto():
+    return getattr(settings, 'ARCHIVO_ANTIGUEDAD_DIAS', ANTIGUEDAD_DIAS)
+
+
+def _cerradas(limite):
+    """(modelo activo, modelo de archivo, condición de fila cerrada y antigua)."""
+    return [
+        # Las aprobadas quedan en la tabla activa (ver el docstring del módulo)
+        (SolicitudAdopcion, SolicitudAdopcionArchivada,
+         Q(estado='rechazada', fecha_solicitud__lt=limite)),
+        (Seguimiento, SeguimientoArchivado,
+         Q(estado__in=['finalizado', 'cancelado'], fecha_revision__lt=limite)),
+    ]
+
+
+def _sql_mover(modelo, archivo, condicion, lote):
+    """SQL que mueve un lote de filas de ``modelo`` a ``archivo`` y devuelve sus mascotas."""
+    qn = connection.ops.quote_name
+    columnas = ', '.join(qn(campo.column) for campo in modelo._meta.concrete_fields)
+    # La única columna extra del archivo es la fecha en que se archivó
+    columna_fecha = qn(archivo._meta.concrete_fields[-1].column)
+    seleccion = modelo.objects.filter(condicion).order_by('pk').values('pk')[:lote]
+    sql_seleccion, params = seleccion.query.sql_with_params()
+    sql = f"""
+        WITH movidas AS (
+            DELETE FROM {qn(modelo._meta.db_table)}
+            WHERE {qn(modelo._meta.pk.column)} IN ({sql_seleccion})
+            RETURNING {columnas}
+        )
+        INSERT INTO {qn(archivo._meta.db_table)} ({columnas}, {columna_fecha})
+        SELECT {columnas}, %s FROM movidas
+        RETURNING {qn('mascota_id')}
+    """
+    return sql, params
+
+
+def archivar(dias=None, lote=TAMANO_LOTE, informar=None):
+    """
+    Mueve al archivo las filas cerradas con más de ``dias`` días (por defecto
+    ``ARCHIVO_ANTIGUEDAD_DIAS``), de a ``lote`` filas por transacción.
+    ``informar(modelo, cantidad)`` se llama después de cada lote. Devuelve
+    ``{nombre del modelo: filas movidas}``.
+    """
+    if dias is None:
+        dias = antiguedad_por_defecto()
+    limite = timezone.localdate() - timedelta(days=dias)
+    movidas = {}
+    mascota_ids = set()
+
+    for modelo, archivo, condicion in _cerradas(limite):
+        sql, params = _sql_mover(modelo, archivo, condicion, lote)
+        total = 0
+        while True:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(sql, (*params, timezone.now()))
+                filas = cursor.fetchall()
+            if not filas:
+                break
+            total += len(filas)
+            mascota_ids.update(mascota_id for (mascota_id,) in filas)
+            if informar:
+                informar(modelo, len(filas))
+        movidas[modelo.__name__] = total
+
+    # El DELETE no pasa por las señales: se recalculan los refugios afectados
+    if mascota_ids:
+        refugio_ids = set(Mascota.objects.filter(pk__in=mascota_ids).values_list('refugio_id', flat=True))
+        recalcular_estadisticas(refugio_ids)
+    return movidas
+
+
+def historial_solicitudes(filtro):
+    """
+    Solicitudes activas y archivadas que cumplen ``filtro`` (un ``Q``), en un
+    solo ``UNION ALL``. Devuelve instancias de SolicitudAdopcion (las
+    archivadas no se pueden guardar: su id ya no existe en la tabla activa).
+    """
+    columnas = [campo.attname for campo in SolicitudAdopcion._meta.concrete_fields]
+    activas = SolicitudAdopcion.objects.filter(filtro)
+    archivadas = SolicitudAdopcionArchivada.objects.filter(filtro).values_list(*columnas)
+    return activas.union(archivadas, all=True)
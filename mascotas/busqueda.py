@@ -0,0 +1,41 @@
+# mascotas/busqueda.py
+"""
+Búsqueda de mascotas con PostgreSQL.
+
+Combina el texto completo sobre ``Mascota.busqueda`` (tsvector ponderado, con
+índice GIN) y la similitud por trigramas sobre ``nombre`` y ``raza`` (índices
+``gin_trgm_ops``) para tolerar errores de tipeo. Ambas condiciones van en la
+misma consulta, así que PostgreSQL las resuelve con un BitmapOr de índices en
+lugar de recorrer la tabla con ILIKE.
+"""
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast, Greatest
+
+from .models import CONFIG_BUSQUEDA
+
+# Orden de los resultados: más relevantes primero, id desempata
+ORDEN_RELEVANCIA = ('-rango', '-id')
+
+
+def buscar_mascotas(queryset, texto):
+    """
+    Filtra ``queryset`` por ``texto`` y lo anota con ``rango`` (relevancia).
+
+    El rango se convierte a ``double precision`` para que el valor que viaja en
+    el cursor de paginación se compare exactamente igual en la página siguiente.
+    """
+    consulta = SearchQuery(texto, config=CONFIG_BUSQUEDA, search_type='websearch')
+    rango = SearchRank(F('busqueda'), consulta) + Greatest(
+        TrigramSimilarity('nombre', texto),
+        TrigramSimilarity('raza', texto),
+    )
+    return (
+        queryset
+        .filter(
+            Q(busqueda=consulta)
+            | Q(nombre__trigram_similar=texto)
+            | Q(raza__trigram_similar=texto)
+        )
+        .annotate(rango=Cast(rango, FloatField()))
+    )
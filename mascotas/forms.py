@@ -1,5 +1,7 @@
 from django import forms 
 from .models import SolicitudAdopcion, Mascota 
+from .imagenes import descartar_variantes
+from tareas.cola import encolar
 
 class SolicitudAdopcionForm(forms.ModelForm):
     class Meta:
@@ -16,7 +18,28 @@ class EstadoSolicitudForm(forms.ModelForm):
         model = SolicitudAdopcion
         fields = ['estado']
 
-class MascotaForm(forms.ModelForm):
+class ImagenMascotaMixin:
+    """
+    Cuando el formulario cambia la imagen, descarta las variantes viejas y
+    encola la generación de las nuevas (las plantillas muestran el original
+    mientras tanto). Si la vista guarda con commit=False debe llamar a
+    procesar_imagen() después de guardar la mascota.
+    """
+
+    def save(self, commit=True):
+        mascota = super().save(commit=commit)
+        if commit:
+            self.procesar_imagen()
+        return mascota
+
+    def procesar_imagen(self):
+        if 'imagen' in self.changed_data:
+            descartar_variantes(self.instance)
+            if self.instance.imagen:
+                encolar('variantes_mascota', self.instance.pk)
+
+
+class MascotaForm(ImagenMascotaMixin, forms.ModelForm):
     """Formulario para añadir o editar una Mascota."""
     class Meta:
         model = Mascota
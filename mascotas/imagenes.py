@@ -0,0 +1,113 @@
+# mascotas/imagenes.py
+"""
+Variantes redimensionadas de ``Mascota.imagen``.
+
+Al guardar una mascota con imagen nueva se generan versiones de ancho fijo
+(miniatura para las tarjetas y mediana para el detalle), sin metadatos EXIF y
+opcionalmente también en WebP. Las rutas y medidas quedan guardadas en
+``Mascota.variantes`` para que las plantillas armen el ``srcset`` sin abrir
+ningún archivo.
+"""
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from .models import Mascota
+
+# nombre de la variante -> ancho en píxeles
+VARIANTES = {
+    'miniatura': 400,
+    'mediana': 800,
+}
+CARPETA_VARIANTES = 'mascotas/variantes'
+CALIDAD_JPEG = 82
+CALIDAD_WEBP = 80
+
+
+def _usar_webp():
+    return getattr(settings, 'MASCOTAS_VARIANTES_WEBP', False)
+
+
+def codificar(imagen, formato, calidad):
+    buffer = BytesIO()
+    # Al no pasar exif= el archivo resultante sale sin metadatos
+    imagen.save(buffer, format=formato, quality=calidad, optimize=True)
+    return ContentFile(buffer.getvalue())
+
+
+def redimensionar(original, ancho):
+    if original.width <= ancho:
+        return original.copy()
+    alto = round(original.height * ancho / original.width)
+    return original.resize((ancho, alto), Image.LANCZOS)
+
+
+def abrir_imagen(storage, nombre):
+    """Abre una imagen del storage ya rotada según su EXIF y en modo RGB/L."""
+    with storage.open(nombre, 'rb') as archivo:
+        imagen = Image.open(archivo)
+        # Respeta la orientación de la cámara antes de descartar el EXIF
+        imagen = ImageOps.exif_transpose(imagen)
+        if imagen.mode not in ('RGB', 'L'):
+            imagen = imagen.convert('RGB')
+        imagen.load()
+    return imagen
+
+
+def generar_variantes(mascota):
+    """
+    Genera las variantes de la imagen de ``mascota`` y actualiza sus campos
+    ``imagen_ancho``, ``imagen_alto`` y ``variantes``.
+
+    Si la mascota no tiene imagen, limpia los datos de variantes.
+    """
+    datos = {'imagen_ancho': None, 'imagen_alto': None, 'variantes': {}}
+
+    if mascota.imagen:
+        storage = mascota.imagen.storage
+        base = os.path.splitext(os.path.basename(mascota.imagen.name))[0]
+
+        original = abrir_imagen(storage, mascota.imagen.name)
+        datos['imagen_ancho'], datos['imagen_alto'] = original.size
+
+        for nombre, ancho in VARIANTES.items():
+            imagen = redimensionar(original, ancho)
+            ruta = storage.save(
+                f'{CARPETA_VARIANTES}/{base}_{ancho}w.jpg',
+                codificar(imagen, 'JPEG', CALIDAD_JPEG),
+            )
+            variante = {'ruta': ruta, 'ancho': imagen.width, 'alto': imagen.height}
+            if _usar_webp():
+                variante['webp'] = storage.save(
+                    f'{CARPETA_VARIANTES}/{base}_{ancho}w.webp',
+                    codificar(imagen, 'WEBP', CALIDAD_WEBP),
+                )
+            datos['variantes'][nombre] = variante
+
+    # update() evita volver a disparar save() (vector de búsqueda, señales)
+    filtro = {'pk': mascota.pk}
+    if mascota.imagen:
+        # Si la imagen se cambió mientras se procesaba, no se pisan los datos
+        filtro['imagen'] = mascota.imagen.name
+    Mascota.objects.filter(**filtro).update(**datos)
+    for campo, valor in datos.items():
+        setattr(mascota, campo, valor)
+    return datos['variantes']
+
+
+def procesar_variantes_mascota(mascota_id):
+    """Punto de entrada de la cola de tareas (tipo 'variantes_mascota')."""
+    mascota = Mascota.objects.filter(pk=mascota_id).only('pk', 'imagen').first()
+    if mascota is not None:  # pudo eliminarse mientras esperaba en la cola
+        generar_variantes(mascota)
+
+
+def descartar_variantes(mascota):
+    """Olvida las variantes de la imagen anterior (sin tocar archivos)."""
+    datos = {'imagen_ancho': None, 'imagen_alto': None, 'variantes': {}}
+    Mascota.objects.filter(pk=mascota.pk).update(**datos)
+    for campo, valor in datos.items():
+        setattr(mascota, campo, valor)
@@ -0,0 +1,29 @@
+# mascotas/management/commands/archivar_cerrados.py
+from django.core.management.base import BaseCommand
+
+from mascotas.archivo import TAMANO_LOTE, antiguedad_por_defecto, archivar
+
+
+class Command(BaseCommand):
+    help = (
+        "Mueve a las tablas de archivo las solicitudes rechazadas y "
+        "los seguimientos finalizados o cancelados más antiguos que --dias. "
+        "Cada lote es un único DELETE ... RETURNING / INSERT, así que se puede "
+        "interrumpir y volver a ejecutar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=None,
+                            help='Antigüedad mínima en días (por defecto ARCHIVO_ANTIGUEDAD_DIAS).')
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE,
+                            help=f'Filas por lote (por defecto {TAMANO_LOTE}).')
+
+    def handle(self, *args, **options):
+        dias = options['dias'] if options['dias'] is not None else antiguedad_por_defecto()
+
+        def informar(modelo, cantidad):
+            self.stdout.write(f"{modelo.__name__}: {cantidad} filas archivadas")
+
+        movidas = archivar(dias=dias, lote=options['lote'], informar=informar)
+        resumen = ', '.join(f"{nombre}: {total}" for nombre, total in movidas.items())
+        self.stdout.write(self.style.SUCCESS(f"Listo (más de {dias} días). {resumen}."))
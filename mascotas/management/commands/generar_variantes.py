@@ -0,0 +1,29 @@
+# mascotas/management/commands/generar_variantes.py
+from django.core.management.base import BaseCommand
+
+from mascotas.imagenes import generar_variantes
+from mascotas.models import Mascota
+
+
+class Command(BaseCommand):
+    help = "Genera las variantes redimensionadas de las mascotas que todavía no las tienen."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todas', action='store_true',
+                            help='Regenera también las mascotas que ya tienen variantes.')
+
+    def handle(self, *args, **options):
+        mascotas = Mascota.objects.exclude(imagen='').exclude(imagen__isnull=True)
+        if not options['todas']:
+            mascotas = mascotas.filter(variantes={})
+
+        procesadas = errores = 0
+        for mascota in mascotas.only('pk', 'nombre', 'imagen').iterator(chunk_size=200):
+            try:
+                generar_variantes(mascota)
+                procesadas += 1
+            except (OSError, ValueError) as e:
+                errores += 1
+                self.stderr.write(f"{mascota.nombre} (id={mascota.pk}): {e}")
+
+        self.stdout.write(self.style.SUCCESS(f"Listo. {procesadas} procesadas, {errores} con error."))
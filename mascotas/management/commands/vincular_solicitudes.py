@@ -0,0 +1,80 @@
+# mascotas/management/commands/vincular_solicitudes.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models.functions import Lower
+
+from mascotas.models import SolicitudAdopcion
+from usuarios.models import Adoptante
+
+
+class Command(BaseCommand):
+    help = (
+        "Completa SolicitudAdopcion.adoptante en las solicitudes anteriores a "
+        "la columna, buscando al adoptante por el email de la solicitud "
+        "(si ya tiene otra solicitud vinculada para esa mascota, se omite). "
+        "Recorre por lotes ordenados por clave primaria y solo toca filas sin "
+        "adoptante, así que se puede interrumpir y volver a ejecutar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000,
+                            help='Cantidad de solicitudes por lote (por defecto 1000).')
+        parser.add_argument('--desde', type=int, default=0,
+                            help='Retomar a partir de esta clave primaria.')
+
+    def adoptantes_por_email(self, emails):
+        """email en minúsculas -> id del adoptante (se omiten emails repetidos)."""
+        candidatos = (Adoptante.objects
+                      .annotate(email=Lower('user__email'))
+                      .filter(email__in=emails)
+                      .values_list('email', 'pk'))
+        encontrados, repetidos = {}, set()
+        for email, pk in candidatos:
+            if email in encontrados:
+                repetidos.add(email)
+            encontrados[email] = pk
+        return {email: pk for email, pk in encontrados.items() if email not in repetidos}
+
+    def handle(self, *args, **options):
+        lote = options['lote']
+        ultimo_pk = options['desde']
+        vinculadas = sin_adoptante = 0
+
+        while True:
+            solicitudes = list(
+                SolicitudAdopcion.objects
+                .filter(pk__gt=ultimo_pk, adoptante__isnull=True)
+                .order_by('pk')
+                .only('pk', 'mascota', 'email')[:lote]
+            )
+            if not solicitudes:
+                break
+
+            adoptantes = self.adoptantes_por_email({s.email.lower() for s in solicitudes if s.email})
+            # Pares (mascota, adoptante) ya usados: la restricción única no admite repetirlos
+            ocupados = set(
+                SolicitudAdopcion.objects
+                .filter(mascota_id__in={s.mascota_id for s in solicitudes},
+                        adoptante_id__in=set(adoptantes.values()))
+                .values_list('mascota_id', 'adoptante_id')
+            )
+            cambiadas = []
+            for solicitud in solicitudes:
+                adoptante_id = adoptantes.get((solicitud.email or '').lower())
+                if adoptante_id is None or (solicitud.mascota_id, adoptante_id) in ocupados:
+                    sin_adoptante += 1
+                    continue
+                ocupados.add((solicitud.mascota_id, adoptante_id))
+                solicitud.adoptante_id = adoptante_id
+                cambiadas.append(solicitud)
+
+            with transaction.atomic():
+                SolicitudAdopcion.objects.bulk_update(cambiadas, ['adoptante'])
+
+            vinculadas += len(cambiadas)
+            ultimo_pk = solicitudes[-1].pk
+            self.stdout.write(f"Lote hasta pk={ultimo_pk}: {len(cambiadas)} vinculadas")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Listo. {vinculadas} solicitudes vinculadas, {sin_adoptante} sin adoptante reconocible."
+        ))
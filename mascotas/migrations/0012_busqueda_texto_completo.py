@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:30
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+
+
+def calcular_vectores(apps, schema_editor):
+    """Rellena el vector de búsqueda de las mascotas existentes."""
+    # Copia de mascotas.models.vector_busqueda tal como era en esta migración:
+    # si la función cambia después, esta migración no debe cambiar con ella
+    descripcion = models.Func(
+        models.F('descripcion'), models.Value(' '),
+        function='array_to_string', output_field=models.TextField(),
+    )
+    vector = (
+        SearchVector('nombre', weight='A', config='spanish')
+        + SearchVector('raza', 'especie', weight='B', config='spanish')
+        + SearchVector(descripcion, weight='C', config='spanish')
+    )
+    Mascota = apps.get_model('mascotas', 'Mascota')
+    Mascota._base_manager.update(busqueda=vector)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mascotas', '0011_alter_mascota_descripcion'),
+        ('usuarios', '0010_veterinario_apellido'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='mascota',
+            name='busqueda',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='mascota',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['busqueda'], name='mascota_busqueda_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='mascota',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['nombre'], name='mascota_nombre_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='mascota',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['raza'], name='mascota_raza_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.RunPython(calcular_vectores, reverse_code=migrations.RunPython.noop),
+    ]
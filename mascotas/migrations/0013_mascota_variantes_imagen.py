@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mascotas', '0012_busqueda_texto_completo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mascota',
+            name='imagen_alto',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='mascota',
+            name='imagen_ancho',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='mascota',
+            name='variantes',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mascotas', '0013_mascota_variantes_imagen'),
+        ('usuarios', '0013_estadisticas_refugio'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solicitudadopcion',
+            name='adoptante',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='solicitudes', to='usuarios.adoptante'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:43
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY no bloquea escrituras, pero no admite transacción
+    atomic = False
+
+    dependencies = [
+        ('mascotas', '0014_solicitudadopcion_adoptante'),
+        ('usuarios', '0013_estadisticas_refugio'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='mascota',
+            index=models.Index(condition=models.Q(('adoptada', False)), fields=['-fecha_ingreso', '-id'], name='mascota_disponible_fecha_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='mascota',
+            index=models.Index(fields=['refugio', '-fecha_ingreso'], name='mascota_refugio_fecha_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='solicitudadopcion',
+            index=models.Index(fields=['mascota', 'estado', '-fecha_solicitud'], name='solicitud_mascota_estado_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:46
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def desvincular_duplicadas(apps, schema_editor):
+    """
+    Deja vinculada solo la solicitud más antigua de cada (mascota, adoptante);
+    las repetidas quedan sin adoptante (no se borran) para poder crear la
+    restricción única.
+    """
+    SolicitudAdopcion = apps.get_model('mascotas', 'SolicitudAdopcion')
+    conservadas = (SolicitudAdopcion.objects
+                   .filter(adoptante__isnull=False)
+                   .values('mascota', 'adoptante')
+                   .annotate(primera=Min('pk'))
+                   .values('primera'))
+    (SolicitudAdopcion.objects
+     .filter(adoptante__isnull=False)
+     .exclude(pk__in=conservadas)
+     .update(adoptante=None))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mascotas', '0015_indices_consultas'),
+        ('usuarios', '0013_estadisticas_refugio'),
+    ]
+
+    operations = [
+        migrations.RunPython(desvincular_duplicadas, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='solicitudadopcion',
+            constraint=models.UniqueConstraint(fields=('mascota', 'adoptante'), name='solicitud_mascota_adoptante_unica'),
+        ),
+    ]
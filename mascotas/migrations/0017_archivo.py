@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:50
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mascotas', '0016_solicitud_unica_por_adoptante'),
+        ('usuarios', '0013_estadisticas_refugio'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SolicitudAdopcionArchivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('nombre_adoptante', models.CharField(max_length=100)),
+                ('apellido_adoptante', models.CharField(max_length=100)),
+                ('telefono', models.CharField(max_length=20)),
+                ('email', models.EmailField(max_length=254)),
+                ('direccion', models.CharField(max_length=200)),
+                ('fecha_solicitud', models.DateField()),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('aprobada', 'Aprobada'), ('rechazada', 'Rechazada')], max_length=10)),
+                ('archivada_en', models.DateTimeField(default=django.utils.timezone.now)),
+                ('adoptante', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='solicitudes_archivadas', to='usuarios.adoptante')),
+                ('mascota', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='mascotas.mascota')),
+            ],
+            options={
+                'verbose_name': 'solicitud de adopción archivada',
+                'verbose_name_plural': 'solicitudes de adopción archivadas',
+            },
+        ),
+    ]
@@ -1,10 +1,36 @@
 from django.db import models
-from usuarios.models import Refugio
+from usuarios.models import Adoptante, Refugio
+from usuarios.contadores import CAMPO_SOLICITUD, ContadoresRefugioMixin
 from django.contrib.postgres.fields import ArrayField # <-- ¡IMPORTACIÓN CLAVE!
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.utils import timezone
+
+# Configuración de texto de PostgreSQL usada para indexar y para buscar
+CONFIG_BUSQUEDA = 'spanish'
+
+# Campos que alimentan el vector de búsqueda (si cambian, hay que recalcularlo)
+CAMPOS_BUSQUEDA = {'nombre', 'raza', 'especie', 'descripcion'}
+
+
+def vector_busqueda():
+    """
+    Expresión del tsvector ponderado de Mascota:
+    nombre (A) > raza/especie (B) > descripcion (C).
+    """
+    descripcion = models.Func(
+        models.F('descripcion'), models.Value(' '),
+        function='array_to_string', output_field=models.TextField(),
+    )
+    return (
+        SearchVector('nombre', weight='A', config=CONFIG_BUSQUEDA)
+        + SearchVector('raza', 'especie', weight='B', config=CONFIG_BUSQUEDA)
+        + SearchVector(descripcion, weight='C', config=CONFIG_BUSQUEDA)
+    )
 
 
 # Modelo Mascota
-class Mascota(models.Model):
+class Mascota(ContadoresRefugioMixin, models.Model):
     # Opciones para Sexo de mascotas 
     SEXO_CHOICES = [
         ('M', 'Macho'),
@@ -23,13 +49,51 @@ class Mascota(models.Model):
     fecha_ingreso = models.DateField(auto_now_add=True)
     adoptada = models.BooleanField(default=False)
     imagen = models.ImageField(upload_to='mascotas/', blank=True, null=True)
+    # Medidas del original y variantes redimensionadas (ver mascotas/imagenes.py)
+    imagen_ancho = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    imagen_alto = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    variantes = models.JSONField(default=dict, blank=True, editable=False)
     refugio = models.ForeignKey(Refugio, on_delete=models.CASCADE, related_name='mascotas')
-    
+    # tsvector precalculado para la búsqueda de texto completo (ver vector_busqueda)
+    busqueda = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['busqueda'], name='mascota_busqueda_gin'),
+            # Índices de trigramas para tolerar errores de tipeo
+            GinIndex(fields=['nombre'], name='mascota_nombre_trgm', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['raza'], name='mascota_raza_trgm', opclasses=['gin_trgm_ops']),
+            # Catálogo público: solo disponibles, en el orden de la paginación
+            models.Index(
+                fields=['-fecha_ingreso', '-id'],
+                condition=models.Q(adoptada=False),
+                name='mascota_disponible_fecha_idx',
+            ),
+            # Listado y panel de cada refugio
+            models.Index(fields=['refugio', '-fecha_ingreso'], name='mascota_refugio_fecha_idx'),
+        ]
+
+    # Campos que alimentan EstadisticasRefugio (ver usuarios/contadores.py)
+    CAMPOS_APORTE = ('refugio', 'adoptada')
+
     def __str__(self):
         return f"{self.nombre} ({self.especie})"
 
+    def aporte_contadores(self, valores):
+        return valores['refugio_id'], {
+            'mascotas_total': 1,
+            'mascotas_disponibles': 0 if valores['adoptada'] else 1,
+        }
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Mantiene el vector al día; se omite si se guardaron solo otros campos
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or CAMPOS_BUSQUEDA.intersection(update_fields):
+            Mascota.objects.filter(pk=self.pk).update(busqueda=vector_busqueda())
+
 # Modelo Solicitud adopcion
-class SolicitudAdopcion(models.Model):
+class SolicitudAdopcion(ContadoresRefugioMixin, models.Model):
     ESTADOS = [
         ('pendiente', 'Pendiente'),
         ('aprobada', 'Aprobada'),
@@ -37,6 +101,11 @@ class SolicitudAdopcion(models.Model):
     ]
 
     mascota = models.ForeignKey(Mascota, on_delete=models.CASCADE)
+    # Adoptante que envió la solicitud; las filas anteriores se vinculan con
+    # ``manage.py vincular_solicitudes`` (por email)
+    adoptante = models.ForeignKey(
+        Adoptante, on_delete=models.SET_NULL, null=True, blank=True, related_name='solicitudes'
+    )
     nombre_adoptante = models.CharField(max_length=100)
     apellido_adoptante = models.CharField(max_length=100)
     telefono = models.CharField(max_length=20)
@@ -45,5 +114,50 @@ class SolicitudAdopcion(models.Model):
     fecha_solicitud = models.DateField(auto_now_add=True)
     estado = models.CharField(max_length=10, choices=ESTADOS, default='pendiente')
 
+    CAMPOS_APORTE = ('mascota', 'estado')
+
+    class Meta:
+        indexes = [
+            # Solicitudes de una mascota por estado (panel, aprobación, listados)
+            models.Index(fields=['mascota', 'estado', '-fecha_solicitud'], name='solicitud_mascota_estado_idx'),
+        ]
+        constraints = [
+            # Un adoptante no puede pedir dos veces la misma mascota
+            models.UniqueConstraint(fields=['mascota', 'adoptante'], name='solicitud_mascota_adoptante_unica'),
+        ]
+
+    def aporte_contadores(self, valores):
+        campo = CAMPO_SOLICITUD.get(valores['estado'])
+        return self._refugio_de_mascota(valores['mascota_id']), ({campo: 1} if campo else {})
+
     def __str__(self):
         return f"Solicitud de {self.nombre_adoptante} {self.apellido_adoptante} - {self.mascota.nombre}"
+
+
+class SolicitudAdopcionArchivada(models.Model):
+    """
+    Solicitud cerrada (aprobada o rechazada) que ``manage.py archivar_cerrados``
+    sacó de SolicitudAdopcion. Conserva el id original y las columnas en el
+    mismo orden, así se puede unir con la tabla activa (ver
+    ``historial_solicitudes``).
+    """
+    id = models.BigIntegerField(primary_key=True)
+    mascota = models.ForeignKey(Mascota, on_delete=models.CASCADE, related_name='+')
+    adoptante = models.ForeignKey(
+        Adoptante, on_delete=models.SET_NULL, null=True, blank=True, related_name='solicitudes_archivadas'
+    )
+    nombre_adoptante = models.CharField(max_length=100)
+    apellido_adoptante = models.CharField(max_length=100)
+    telefono = models.CharField(max_length=20)
+    email = models.EmailField()
+    direccion = models.CharField(max_length=200)
+    fecha_solicitud = models.DateField()
+    estado = models.CharField(max_length=10, choices=SolicitudAdopcion.ESTADOS)
+    archivada_en = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = 'solicitud de adopción archivada'
+        verbose_name_plural = 'solicitudes de adopción archivadas'
+
+    def __str__(self):
+        return f"Solicitud archivada de {self.nombre_adoptante} {self.apellido_adoptante} ({self.estado})"
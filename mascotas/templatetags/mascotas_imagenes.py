@@ -0,0 +1,62 @@
+# mascotas/templatetags/mascotas_imagenes.py
+from django import template
+from django.conf import settings
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+SIZES_TARJETA = '(max-width: 600px) 100vw, 400px'
+
+
+def _srcset(storage, variantes, clave):
+    # Con originales más angostos que la miniatura varias variantes quedan del
+    # mismo ancho: se publica un solo candidato por ancho (repetir el
+    # descriptor ``w`` hace inválido el srcset)
+    candidatos = {}
+    for v in variantes:
+        if v.get(clave):
+            candidatos.setdefault(v['ancho'], storage.url(v[clave]))
+    return ', '.join(f'{url} {ancho}w' for ancho, url in candidatos.items())
+
+
+@register.simple_tag
+def imagen_mascota(mascota, clase='', sizes=SIZES_TARJETA):
+    """
+    Etiqueta ``<img>`` con ``srcset``/``width``/``height`` a partir de las
+    variantes guardadas en la mascota. Solo arma URLs: no abre archivos.
+
+    Uso: ``{% imagen_mascota mascota 'card-img' %}``
+    """
+    variantes = sorted(mascota.variantes.values(), key=lambda v: v['ancho']) if mascota.variantes else []
+    storage = mascota.imagen.storage
+
+    if variantes:
+        menor = variantes[0]
+        img = format_html(
+            '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" class="{}" loading="lazy">',
+            storage.url(menor['ruta']), _srcset(storage, variantes, 'ruta'), sizes,
+            menor['ancho'], menor['alto'], mascota.nombre, clase,
+        )
+        webp = _srcset(storage, variantes, 'webp')
+        if not webp:
+            return img
+        return format_html(
+            '<picture><source type="image/webp" srcset="{}" sizes="{}">{}</picture>',
+            webp, sizes, img,
+        )
+
+    if mascota.imagen:
+        # Todavía sin variantes: se usa el original (con medidas si se conocen)
+        medidas = format_html_join(
+            '', ' {}="{}"',
+            ((k, v) for k, v in (('width', mascota.imagen_ancho), ('height', mascota.imagen_alto)) if v),
+        )
+        return format_html(
+            '<img src="{}"{} alt="{}" class="{}" loading="lazy">',
+            mascota.imagen.url, medidas, mascota.nombre, clase,
+        )
+
+    return format_html(
+        '<img src="{}mascotas/placeholder.png" alt="Mascota sin foto" class="{}">',
+        settings.MEDIA_URL, clase,
+    )
@@ -1,9 +1,33 @@
 from django.test import TestCase, Client
 from django.contrib.auth.models import User
 from django.urls import reverse
+from django.contrib.messages import get_messages
+from django.test import override_settings, TransactionTestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Template, Context
 from unittest.mock import patch
-from usuarios.models import Refugio, Adoptante
-from .models import Mascota, SolicitudAdopcion
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from django.core.management import call_command
+from django.db import connection
+from PIL import Image
+import json
+import os
+import shutil
+import tempfile
+import threading
+from usuarios.models import Refugio, Adoptante, EstadisticasRefugio
+from .models import Mascota, SolicitudAdopcion, SolicitudAdopcionArchivada
+from .adopciones import AdopcionNoDisponible, aprobar_solicitud, registrar_solicitud
+from .busqueda import buscar_mascotas, ORDEN_RELEVANCIA
+from .forms import MascotaForm
+from seguimiento.models import Seguimiento, SeguimientoArchivado
+from usuarios.paginacion import condicion_posterior
+from seguimiento.views import ORDEN_SEGUIMIENTOS, SEGUIMIENTOS_POR_PAGINA as SEGUIMIENTOS_REFUGIO_POR_PAGINA
+from usuarios.views import (
+    MASCOTAS_POR_PAGINA, ORDEN_CATALOGO, ORDEN_MIS_SEGUIMIENTOS, SEGUIMIENTOS_POR_PAGINA,
+    seguimientos_de_adoptante,
+)
 
 # ========================================================================
 # CÓDIGO DE SETUP
@@ -140,6 +164,7 @@ class SolicitudAdopcionViewTests(MascotaSetupMixin, TestCase):
 
         SolicitudAdopcion.objects.create(
             mascota=self.mascota,
+            adoptante=self.adoptante,
             nombre_adoptante='Test',
             apellido_adoptante='Test',
             telefono='000',
@@ -156,6 +181,47 @@ class SolicitudAdopcionViewTests(MascotaSetupMixin, TestCase):
         self.assertRedirects(response, reverse('mascotas:detalle_mascota', args=[self.mascota.id]))
         self.assertEqual(SolicitudAdopcion.objects.filter(mascota=self.mascota).count(), 1)
 
+    def test_registrar_solicitud_repetida_no_duplica(self):
+        def nueva():
+            return SolicitudAdopcion(
+                mascota=self.mascota, adoptante=self.adoptante, nombre_adoptante='Catherine',
+                apellido_adoptante='Test', telefono='000', email='catherine@adopt.com', direccion='X',
+            )
+
+        self.assertTrue(registrar_solicitud(nueva()))
+        self.assertFalse(registrar_solicitud(nueva()))
+        self.assertEqual(SolicitudAdopcion.objects.filter(mascota=self.mascota).count(), 1)
+        # El INSERT fallido no dejó contadores a medias
+        est = EstadisticasRefugio.objects.get(refugio=self.refugio)
+        self.assertEqual(est.solicitudes_pendientes, 1)
+
+    def test_solicitud_queda_vinculada_al_adoptante(self):
+        self.client.login(username='adoptante_test', password='adoptantepass')
+        self.client.post(
+            reverse('mascotas:solicitar_adopcion', args=[self.mascota.id]),
+            {'telefono': '123', 'direccion': '456'}
+        )
+        solicitud = SolicitudAdopcion.objects.get(mascota=self.mascota)
+        self.assertEqual(solicitud.adoptante, self.adoptante)
+
+    def test_vincular_solicitudes_por_email(self):
+        # Solicitud previa a la FK: solo conocía el email (con otras mayúsculas)
+        anterior = SolicitudAdopcion.objects.create(
+            mascota=self.mascota, nombre_adoptante='Catherine', apellido_adoptante='Test',
+            telefono='000', email='Catherine@Adopt.com', direccion='Test',
+        )
+        desconocida = SolicitudAdopcion.objects.create(
+            mascota=self.mascota, nombre_adoptante='Otro', apellido_adoptante='Test',
+            telefono='000', email='nadie@adopt.com', direccion='Test',
+        )
+
+        call_command('vincular_solicitudes', lote=1, stdout=StringIO())
+
+        anterior.refresh_from_db()
+        desconocida.refresh_from_db()
+        self.assertEqual(anterior.adoptante, self.adoptante)
+        self.assertIsNone(desconocida.adoptante)
+
 # ========================================================================
 # C. PRUEBAS DE GESTIÓN CRUD DE MASCOTAS
 # ========================================================================
@@ -203,3 +269,490 @@ class MascotaManagementTests(MascotaSetupMixin, TestCase):
         self.assertRedirects(response, reverse('mascotas:lista_mascotas_refugio'))
         self.assertContains(response, 'ha sido eliminada', html=False)
         self.assertFalse(Mascota.objects.filter(id=self.mascota.id).exists())
+
+
+# ========================================================================
+# D. PRUEBAS DE BÚSQUEDA (texto completo + trigramas)
+# ========================================================================
+
+class BusquedaMascotaTests(MascotaSetupMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        Mascota.objects.create(
+            nombre='Rocco', especie='Perro', raza='Labrador', edad=4,
+            descripcion=['Le encanta nadar en el arroyo.'], refugio=self.refugio
+        )
+        Mascota.objects.create(
+            nombre='Mishi', especie='Gato', raza='Persa', edad=2, refugio=self.refugio
+        )
+
+    def test_save_actualiza_vector(self):
+        self.mascota.refresh_from_db()
+        self.assertIsNotNone(self.mascota.busqueda)
+
+    def test_busca_en_descripcion(self):
+        nombres = list(buscar_mascotas(Mascota.objects.all(), 'nadar').values_list('nombre', flat=True))
+        self.assertEqual(nombres, ['Rocco'])
+
+    def test_nombre_pesa_mas_que_descripcion(self):
+        Mascota.objects.create(
+            nombre='Arroyo', especie='Perro', edad=1, refugio=self.refugio
+        )
+        resultados = buscar_mascotas(Mascota.objects.all(), 'arroyo').order_by(*ORDEN_RELEVANCIA)
+        self.assertEqual(resultados[0].nombre, 'Arroyo')
+
+    def test_tolera_errores_de_tipeo(self):
+        nombres = list(buscar_mascotas(Mascota.objects.all(), 'Labrdor').values_list('nombre', flat=True))
+        self.assertIn('Rocco', nombres)
+
+    def test_home_usa_busqueda(self):
+        response = self.client.get(reverse('usuarios:home'), {'q': 'persa'})
+        self.assertContains(response, 'Mishi')
+        self.assertNotContains(response, 'Rocco')
+
+    def test_admin_busca_por_nombre_de_refugio(self):
+        admin_user = User.objects.create_superuser(username='admin_busqueda', password='adminpass')
+        self.client.force_login(admin_user)
+        response = self.client.get(reverse('admin:mascotas_mascota_changelist'), {'q': 'Central'})
+        self.assertContains(response, 'Rocco')
+        self.assertContains(response, 'Mishi')
+
+
+# ========================================================================
+# E. PRUEBAS DE VARIANTES DE IMAGEN
+# ========================================================================
+
+def _imagen_jpeg(ancho=1200, alto=800, nombre='foto.jpg'):
+    buffer = BytesIO()
+    Image.new('RGB', (ancho, alto), 'orange').save(buffer, format='JPEG')
+    return SimpleUploadedFile(nombre, buffer.getvalue(), content_type='image/jpeg')
+
+
+class VariantesImagenTests(MascotaSetupMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media, TAREAS_EJECUTAR_EN_LINEA=True)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def _form(self, imagen):
+        datos = {
+            'nombre': 'Toby', 'especie': 'Perro', 'raza': '', 'edad': 2,
+            'sexo': 'M', 'descripcion': '', 'refugio': self.refugio.pk,
+        }
+        return MascotaForm(datos, {'imagen': imagen})
+
+    def test_form_genera_variantes(self):
+        form = self._form(_imagen_jpeg())
+        self.assertTrue(form.is_valid(), form.errors)
+        mascota = form.save()
+        mascota.refresh_from_db()
+
+        self.assertEqual((mascota.imagen_ancho, mascota.imagen_alto), (1200, 800))
+        self.assertEqual(mascota.variantes['miniatura']['ancho'], 400)
+        self.assertEqual(mascota.variantes['mediana']['alto'], 533)
+        with Image.open(os.path.join(self.media, mascota.variantes['miniatura']['ruta'])) as miniatura:
+            self.assertEqual(miniatura.size, (400, 267))
+            self.assertNotIn('exif', miniatura.info)
+
+    def test_no_agranda_imagenes_chicas(self):
+        form = self._form(_imagen_jpeg(300, 200))
+        self.assertTrue(form.is_valid(), form.errors)
+        mascota = form.save()
+        self.assertEqual(mascota.variantes['mediana']['ancho'], 300)
+
+    def test_template_tag_no_abre_archivos(self):
+        mascota = Mascota(nombre='Toby', imagen='mascotas/toby.jpg', variantes={
+            'miniatura': {'ruta': 'mascotas/variantes/toby_400w.jpg', 'ancho': 400, 'alto': 300},
+            'mediana': {'ruta': 'mascotas/variantes/toby_800w.jpg', 'ancho': 800, 'alto': 600},
+        })
+        html = Template('{% load mascotas_imagenes %}{% imagen_mascota m "card-img" %}').render(Context({'m': mascota}))
+        self.assertIn('srcset="/media/mascotas/variantes/toby_400w.jpg 400w, /media/mascotas/variantes/toby_800w.jpg 800w"', html)
+        self.assertIn('width="400" height="300"', html)
+
+    def test_srcset_sin_anchos_repetidos(self):
+        mascota = Mascota(nombre='Toby', imagen='mascotas/toby.jpg', variantes={
+            'miniatura': {'ruta': 'mascotas/variantes/toby_400w.jpg', 'ancho': 300, 'alto': 200},
+            'mediana': {'ruta': 'mascotas/variantes/toby_800w.jpg', 'ancho': 300, 'alto': 200},
+        })
+        html = Template('{% load mascotas_imagenes %}{% imagen_mascota m %}').render(Context({'m': mascota}))
+        self.assertIn('srcset="/media/mascotas/variantes/toby_400w.jpg 300w"', html)
+
+
+# ========================================================================
+# F. PRUEBAS DE PLANES DE CONSULTA (EXPLAIN)
+# ========================================================================
+
+def _nodos_plan(plan):
+    yield plan
+    for hijo in plan.get('Plans', []):
+        yield from _nodos_plan(hijo)
+
+
+class PlanesConsultaTests(TestCase):
+    """
+    Siembra un volumen de datos realista y verifica con EXPLAIN (FORMAT JSON)
+    que las consultas de las vistas más usadas lean por índice. Si un cambio
+    en las consultas o en Meta.indexes las lleva a un Seq Scan, estas pruebas
+    fallan.
+    """
+    REFUGIOS = 100
+    MASCOTAS_POR_REFUGIO = 60
+    SOLICITUDES_POR_MASCOTA = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        usuarios = User.objects.bulk_create(
+            [User(username=f'refugio_plan_{i}') for i in range(cls.REFUGIOS)]
+        )
+        cls.refugios = Refugio.objects.bulk_create([
+            Refugio(usuario=u, nombre=f'Refugio {i}', direccion='Calle 1, Asunción',
+                    telefono='0', email=f'plan{i}@test.com')
+            for i, u in enumerate(usuarios)
+        ])
+        # bulk_create no pasa por save(): no hay vector de búsqueda ni contadores
+        mascotas = Mascota.objects.bulk_create([
+            Mascota(nombre=f'M{r}-{i}', especie='Perro', edad=1, refugio=refugio,
+                    adoptada=i % 3 != 0)
+            for r, refugio in enumerate(cls.refugios)
+            for i in range(cls.MASCOTAS_POR_REFUGIO)
+        ], batch_size=2000)
+        SolicitudAdopcion.objects.bulk_create([
+            SolicitudAdopcion(mascota=mascota, nombre_adoptante='A', apellido_adoptante='B',
+                              telefono='0', email='a@test.com', direccion='X',
+                              estado=('pendiente', 'aprobada', 'rechazada')[i])
+            for mascota in mascotas
+            for i in range(cls.SOLICITUDES_POR_MASCOTA)
+        ], batch_size=2000)
+        Seguimiento.objects.bulk_create([
+            Seguimiento(mascota=mascota, fecha_revision=date(2025, 1, 1) + timedelta(days=n % 365))
+            for n, mascota in enumerate(mascotas[::3])
+        ], batch_size=2000)
+        cls.mascota = mascotas[0]
+        cls.mascota_intermedia = mascotas[len(mascotas) // 2]
+
+        # Estadísticas al día para que el planificador conozca el volumen
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE {}, {}, {}'.format(
+                Mascota._meta.db_table, SolicitudAdopcion._meta.db_table, Seguimiento._meta.db_table,
+            ))
+
+    def assertUsaIndice(self, queryset, modelo):
+        plan = json.loads(queryset.explain(format='json'))[0]['Plan']
+        tabla = modelo._meta.db_table
+        tipos = {n['Node Type'] for n in _nodos_plan(plan) if n.get('Relation Name') == tabla}
+        detalle = json.dumps(plan, indent=2)
+        self.assertNotIn('Seq Scan', tipos, f"{tabla} se lee completa:\n{detalle}")
+        self.assertTrue(
+            tipos & {'Index Scan', 'Index Only Scan', 'Bitmap Heap Scan'},
+            f"{tabla} no usa ningún índice:\n{detalle}",
+        )
+
+    def test_catalogo_primera_pagina(self):
+        qs = Mascota.objects.filter(adoptada=False).order_by(*ORDEN_CATALOGO)
+        self.assertUsaIndice(qs[:MASCOTAS_POR_PAGINA + 1], Mascota)
+
+    def test_catalogo_pagina_siguiente(self):
+        medio = self.mascota_intermedia
+        posicion = [medio.fecha_ingreso.isoformat(), medio.pk]
+        qs = (Mascota.objects
+              .filter(adoptada=False)
+              .filter(condicion_posterior(Mascota, ORDEN_CATALOGO, posicion))
+              .order_by(*ORDEN_CATALOGO))
+        self.assertUsaIndice(qs[:MASCOTAS_POR_PAGINA + 1], Mascota)
+
+    def test_mascotas_de_un_refugio(self):
+        qs = Mascota.objects.filter(refugio=self.refugios[0]).order_by('-fecha_ingreso')
+        self.assertUsaIndice(qs, Mascota)
+
+    def test_solicitudes_pendientes_del_refugio(self):
+        qs = (SolicitudAdopcion.objects
+              .filter(mascota__refugio=self.refugios[0], estado='pendiente')
+              .order_by('-fecha_solicitud'))
+        self.assertUsaIndice(qs, SolicitudAdopcion)
+        self.assertUsaIndice(qs, Mascota)
+
+    def test_control_de_solicitud_duplicada(self):
+        qs = SolicitudAdopcion.objects.filter(mascota=self.mascota, adoptante_id=1).values('pk')[:1]
+        self.assertUsaIndice(qs, SolicitudAdopcion)
+
+    def test_agenda_de_seguimientos(self):
+        qs = Seguimiento.objects.order_by('-fecha_revision', '-hora_revision')[:25]
+        self.assertUsaIndice(qs, Seguimiento)
+
+    def test_seguimientos_del_refugio(self):
+        # Como listar_seguimientos con filtro de estado y página siguiente
+        posicion = [date(2025, 6, 1).isoformat(), None, 10 ** 9]
+        qs = (Seguimiento.objects
+              .filter(mascota__refugio=self.refugios[0], estado='pendiente')
+              .filter(condicion_posterior(Seguimiento, ORDEN_SEGUIMIENTOS, posicion))
+              .order_by(*ORDEN_SEGUIMIENTOS))
+        self.assertUsaIndice(qs[:SEGUIMIENTOS_REFUGIO_POR_PAGINA + 1], Seguimiento)
+
+    def test_mis_seguimientos(self):
+        user = User.objects.create_user(username='adoptante_plan')
+        adoptante = Adoptante.objects.create(user=user, cedula='plan-1')
+        SolicitudAdopcion.objects.filter(mascota=self.mascota, estado='aprobada').update(adoptante=adoptante)
+        qs = seguimientos_de_adoptante(user).order_by(*ORDEN_MIS_SEGUIMIENTOS)[:SEGUIMIENTOS_POR_PAGINA + 1]
+        self.assertUsaIndice(qs, SolicitudAdopcion)
+        self.assertUsaIndice(qs, Seguimiento)
+
+    def test_orden_de_seguimientos_sale_del_indice(self):
+        # El orden (fecha, hora NULLS LAST, id) es el del índice: sin nodo Sort
+        qs = (Seguimiento.objects.filter(mascota=self.mascota)
+              .order_by(*ORDEN_MIS_SEGUIMIENTOS)[:SEGUIMIENTOS_POR_PAGINA + 1])
+        plan = json.loads(qs.explain(format='json'))[0]['Plan']
+        tipos = {n['Node Type'] for n in _nodos_plan(plan)}
+        self.assertFalse(tipos & {'Sort', 'Incremental Sort'}, json.dumps(plan, indent=2))
+        self.assertUsaIndice(qs, Seguimiento)
+
+    def test_mis_seguimientos_pagina_siguiente(self):
+        user = User.objects.create_user(username='adoptante_plan_2')
+        adoptante = Adoptante.objects.create(user=user, cedula='plan-2')
+        SolicitudAdopcion.objects.filter(mascota=self.mascota, estado='aprobada').update(adoptante=adoptante)
+        posicion = [date(2025, 6, 1).isoformat(), None, 1]
+        qs = (seguimientos_de_adoptante(user)
+              .filter(condicion_posterior(Seguimiento, ORDEN_MIS_SEGUIMIENTOS, posicion))
+              .order_by(*ORDEN_MIS_SEGUIMIENTOS)[:SEGUIMIENTOS_POR_PAGINA + 1])
+        self.assertUsaIndice(qs, Seguimiento)
+        # La posición del cursor acota la lectura dentro del índice
+        plan = json.loads(qs.explain(format='json'))[0]['Plan']
+        condiciones = [n.get('Index Cond', '') for n in _nodos_plan(plan)
+                       if n.get('Index Name', '').startswith('seguimiento_mascota')]
+        self.assertTrue(any('fecha_revision' in c for c in condiciones), json.dumps(plan, indent=2))
+
+# ========================================================================
+# G. PRUEBAS DE APROBACIÓN DE SOLICITUDES
+# ========================================================================
+
+class AprobacionSetupMixin(MascotaSetupMixin):
+    def crear_solicitud(self, nombre):
+        return SolicitudAdopcion.objects.create(
+            mascota=self.mascota, nombre_adoptante=nombre, apellido_adoptante='Test',
+            telefono='000', email=f'{nombre.lower()}@adopt.com', direccion='Test',
+        )
+
+
+class AprobacionSolicitudTests(AprobacionSetupMixin, TestCase):
+
+    def test_aprobar_rechaza_las_demas_pendientes(self):
+        elegida = self.crear_solicitud('Ana')
+        otra = self.crear_solicitud('Beto')
+
+        rechazadas = aprobar_solicitud(elegida.pk)
+
+        self.assertEqual(rechazadas, 1)
+        elegida.refresh_from_db()
+        otra.refresh_from_db()
+        self.mascota.refresh_from_db()
+        self.assertEqual(elegida.estado, 'aprobada')
+        self.assertEqual(otra.estado, 'rechazada')
+        self.assertTrue(self.mascota.adoptada)
+
+        # Los contadores del refugio quedan igual que recalculados desde cero
+        est = EstadisticasRefugio.objects.get(refugio=self.refugio)
+        self.assertEqual(
+            (est.mascotas_disponibles, est.solicitudes_pendientes,
+             est.solicitudes_aprobadas, est.solicitudes_rechazadas),
+            (0, 0, 1, 1),
+        )
+
+    def test_no_se_aprueba_una_mascota_ya_adoptada(self):
+        primera = self.crear_solicitud('Ana')
+        tardia = self.crear_solicitud('Beto')
+        aprobar_solicitud(primera.pk)
+
+        with self.assertRaises(AdopcionNoDisponible):
+            aprobar_solicitud(tardia.pk)
+        tardia.refresh_from_db()
+        self.assertEqual(tardia.estado, 'rechazada')
+
+    def test_vista_del_refugio_usa_la_aprobacion(self):
+        elegida = self.crear_solicitud('Ana')
+        self.crear_solicitud('Beto')
+        self.client.login(username='refugio_test', password='refugiopass')
+
+        response = self.client.post(
+            reverse('mascotas:detalle_solicitud_refugio', args=[elegida.pk]),
+            {'estado': 'aprobada'}
+        )
+
+        self.assertRedirects(response, reverse('mascotas:gestion_solicitudes_refugio'))
+        self.assertEqual(
+            SolicitudAdopcion.objects.filter(mascota=self.mascota, estado='pendiente').count(), 0
+        )
+        self.mascota.refresh_from_db()
+        self.assertTrue(self.mascota.adoptada)
+
+
+class AccionMasivaSolicitudesTests(AprobacionSetupMixin, TestCase):
+    """Aprobación y rechazo de varias solicitudes desde el listado del refugio."""
+
+    def setUp(self):
+        super().setUp()
+        self.otra_mascota = Mascota.objects.create(
+            nombre='Rocco', especie='Perro', edad=2, refugio=self.refugio
+        )
+        self.client.login(username='refugio_test', password='refugiopass')
+
+    def post(self, accion, solicitudes):
+        return self.client.post(
+            reverse('mascotas:accion_masiva_solicitudes'),
+            {'accion': accion, 'solicitudes': [s.pk for s in solicitudes]}
+        )
+
+    def test_aprobar_una_por_mascota(self):
+        ana = self.crear_solicitud('Ana')
+        beto = self.crear_solicitud('Beto')
+        carla = SolicitudAdopcion.objects.create(
+            mascota=self.otra_mascota, nombre_adoptante='Carla', apellido_adoptante='Test',
+            telefono='000', email='carla@adopt.com', direccion='Test',
+        )
+
+        response = self.post('aprobar', [ana, beto, carla])
+
+        self.assertRedirects(response, reverse('mascotas:gestion_solicitudes_refugio'))
+        mensajes = [str(m) for m in get_messages(response.wsgi_request)]
+        self.assertEqual(mensajes, ["Se aprobaron 2 solicitudes. Se rechazaron 1 solicitudes pendientes de las mismas mascotas."])
+        estados = dict(SolicitudAdopcion.objects.values_list('nombre_adoptante', 'estado'))
+        self.assertEqual(estados, {'Ana': 'aprobada', 'Beto': 'rechazada', 'Carla': 'aprobada'})
+        self.assertEqual(Mascota.objects.filter(adoptada=True).count(), 2)
+
+    def test_rechazar_una_aprobada_libera_la_mascota(self):
+        ana = self.crear_solicitud('Ana')
+        aprobar_solicitud(ana.pk)
+
+        self.post('rechazar', [ana])
+
+        ana.refresh_from_db()
+        self.mascota.refresh_from_db()
+        self.assertEqual(ana.estado, 'rechazada')
+        self.assertFalse(self.mascota.adoptada)
+        est = EstadisticasRefugio.objects.get(refugio=self.refugio)
+        self.assertEqual((est.mascotas_disponibles, est.solicitudes_rechazadas), (2, 1))
+
+    def test_no_toca_solicitudes_de_otro_refugio(self):
+        otro_user = User.objects.create_user(username='otro_refugio', password='x')
+        otro = Refugio.objects.create(
+            usuario=otro_user, nombre='Otro', direccion='X', telefono='1', email='otro@test.com'
+        )
+        ajena = SolicitudAdopcion.objects.create(
+            mascota=Mascota.objects.create(nombre='Ajena', especie='Gato', edad=1, refugio=otro),
+            nombre_adoptante='Dario', apellido_adoptante='Test',
+            telefono='000', email='dario@adopt.com', direccion='Test',
+        )
+
+        self.post('rechazar', [ajena])
+
+        ajena.refresh_from_db()
+        self.assertEqual(ajena.estado, 'pendiente')
+
+    def test_ignora_ids_invalidos(self):
+        ana = self.crear_solicitud('Ana')
+
+        response = self.client.post(
+            reverse('mascotas:accion_masiva_solicitudes'),
+            {'accion': 'rechazar', 'solicitudes': [ana.pk, '9' * 30, str(2 ** 63), '²', 'x']}
+        )
+
+        self.assertRedirects(response, reverse('mascotas:gestion_solicitudes_refugio'))
+        ana.refresh_from_db()
+        self.assertEqual(ana.estado, 'rechazada')
+
+
+class AprobacionConcurrenteTests(AprobacionSetupMixin, TransactionTestCase):
+    """Varios aprobadores en paralelo: solo una aprobación sobrevive."""
+
+    def test_un_solo_aprobador_gana(self):
+        solicitudes = [self.crear_solicitud(nombre) for nombre in ('Ana', 'Beto', 'Carla', 'Dario')]
+        barrera = threading.Barrier(len(solicitudes))
+        resultados = []
+
+        def aprobar(pk):
+            try:
+                barrera.wait()
+                aprobar_solicitud(pk)
+                resultados.append('aprobada')
+            except AdopcionNoDisponible:
+                resultados.append('sin_mascota')
+            finally:
+                connection.close()  # cada hilo abre su propia conexión
+
+        hilos = [threading.Thread(target=aprobar, args=(s.pk,)) for s in solicitudes]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(resultados.count('aprobada'), 1)
+        self.assertEqual(resultados.count('sin_mascota'), len(solicitudes) - 1)
+        estados = list(SolicitudAdopcion.objects.filter(mascota=self.mascota).values_list('estado', flat=True))
+        self.assertEqual(estados.count('aprobada'), 1)
+        self.assertEqual(estados.count('rechazada'), len(solicitudes) - 1)
+
+
+# ========================================================================
+# H. PRUEBAS DEL ARCHIVO DE SOLICITUDES Y SEGUIMIENTOS CERRADOS
+# ========================================================================
+
+class ArchivoCerradosTests(MascotaSetupMixin, TestCase):
+    """Verifica archivar_cerrados y el historial de mis_solicitudes."""
+
+    def setUp(self):
+        super().setUp()
+        hace_dos_anios = date.today() - timedelta(days=730)
+        self.vieja = SolicitudAdopcion.objects.create(
+            mascota=self.mascota, adoptante=self.adoptante, nombre_adoptante='Catherine',
+            apellido_adoptante='Test', telefono='000', email='catherine@adopt.com',
+            direccion='Test', estado='rechazada',
+        )
+        otra = Mascota.objects.create(nombre='Rocco', especie='Perro', edad=2, refugio=self.refugio)
+        self.pendiente = SolicitudAdopcion.objects.create(
+            mascota=otra, adoptante=self.adoptante, nombre_adoptante='Catherine',
+            apellido_adoptante='Test', telefono='000', email='catherine@adopt.com', direccion='Test',
+        )
+        # La aprobada es el vínculo adoptante -> mascota: no se archiva aunque sea vieja
+        adoptada = Mascota.objects.create(nombre='Bruno', especie='Perro', edad=4, refugio=self.refugio)
+        self.aprobada = SolicitudAdopcion.objects.create(
+            mascota=adoptada, adoptante=self.adoptante, nombre_adoptante='Catherine',
+            apellido_adoptante='Test', telefono='000', email='catherine@adopt.com',
+            direccion='Test', estado='aprobada',
+        )
+        SolicitudAdopcion.objects.update(fecha_solicitud=hace_dos_anios)
+        self.finalizado = Seguimiento.objects.create(
+            mascota=self.mascota, fecha_revision=hace_dos_anios, estado='finalizado'
+        )
+        self.proximo = Seguimiento.objects.create(mascota=self.mascota, fecha_revision=date.today())
+
+    def test_mueve_solo_las_filas_cerradas_y_antiguas(self):
+        call_command('archivar_cerrados', lote=1, stdout=StringIO())
+
+        self.assertEqual(set(SolicitudAdopcion.objects.values_list('pk', flat=True)),
+                         {self.pendiente.pk, self.aprobada.pk})
+        self.assertEqual(list(SolicitudAdopcionArchivada.objects.values_list('pk', 'estado')),
+                         [(self.vieja.pk, 'rechazada')])
+        self.assertEqual(list(Seguimiento.objects.values_list('pk', flat=True)), [self.proximo.pk])
+        self.assertTrue(SeguimientoArchivado.objects.filter(pk=self.finalizado.pk).exists())
+        # Los contadores del refugio se recalculan tras el DELETE
+        self.assertEqual(EstadisticasRefugio.objects.get(refugio=self.refugio).solicitudes_rechazadas, 0)
+
+    def test_respeta_la_antiguedad(self):
+        call_command('archivar_cerrados', dias=1000, stdout=StringIO())
+        self.assertFalse(SolicitudAdopcionArchivada.objects.exists())
+        self.assertFalse(SeguimientoArchivado.objects.exists())
+
+    def test_mis_solicitudes_con_historial(self):
+        call_command('archivar_cerrados', stdout=StringIO())
+        self.client.login(username='adoptante_test', password='adoptantepass')
+
+        recientes = self.client.get(reverse('usuarios:mis_solicitudes'))
+        self.assertEqual({s.pk for s in recientes.context['solicitudes']}, {self.pendiente.pk, self.aprobada.pk})
+
+        historial = self.client.get(reverse('usuarios:mis_solicitudes'), {'historial': '1'})
+        solicitudes = historial.context['solicitudes']
+        self.assertEqual({s.pk for s in solicitudes}, {self.pendiente.pk, self.aprobada.pk, self.vieja.pk})
+        self.assertContains(historial, 'Lulú')
@@ -12,6 +12,7 @@ urlpatterns = [
     path('gestion/editar-mascota/<int:pk>/', views.editar_mascota, name='editar_mascota_refugio'),
     path('gestion/eliminar-mascota/<int:pk>/', views.eliminar_mascota, name='eliminar_mascota_refugio'),
     path('gestion/solicitudes/', views.gestion_solicitudes_refugio, name='gestion_solicitudes_refugio'),
+    path('gestion/solicitudes/accion-masiva/', views.accion_masiva_solicitudes, name='accion_masiva_solicitudes'),
     path('gestion/solicitud/<int:pk>/', views.detalle_solicitud_refugio, name='detalle_solicitud_refugio'),
 
 ]
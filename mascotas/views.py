@@ -2,11 +2,12 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from .models import Mascota, SolicitudAdopcion, Refugio
+from .models import Mascota, SolicitudAdopcion
 from .forms import SolicitudAdopcionForm, EstadoSolicitudForm, MascotaForm
-from usuarios.models import Adoptante
-from django.contrib.auth.decorators import user_passes_test
-from usuarios.models import Refugio
+from .adopciones import (
+    AdopcionNoDisponible, aprobar_solicitud, aprobar_solicitudes, rechazar_solicitudes, registrar_solicitud,
+)
+from usuarios.roles import perfil_adoptante, refugio_requerido
 from django import forms
 from django.views.decorators.http import require_http_methods
 
@@ -16,29 +17,32 @@ def solicitar_adopcion(request, mascota_id):
     mascota = get_object_or_404(Mascota, id=mascota_id)
 
     # obtener el adoptante logueado
-    adoptante = get_object_or_404(Adoptante, user=request.user)
-
-    # verificar si ya hizo una solicitud para esa mascota
-    if SolicitudAdopcion.objects.filter(mascota=mascota, email=adoptante.user.email).exists():
-        messages.warning(request, "Ya has enviado una solicitud para esta mascota.")
-        return redirect('mascotas:detalle_mascota', mascota_id=mascota.id)
+    adoptante = perfil_adoptante(request)
 
     if request.method == "POST":
         form = SolicitudAdopcionForm(request.POST)
         if form.is_valid():
             solicitud = form.save(commit=False)
             solicitud.mascota = mascota
+            solicitud.adoptante = adoptante
             solicitud.nombre_adoptante = adoptante.user.first_name
             solicitud.apellido_adoptante = adoptante.user.last_name
             solicitud.telefono = form.cleaned_data['telefono']
             solicitud.email = adoptante.user.email
             solicitud.direccion = form.cleaned_data['direccion']
-            solicitud.save()
+            # La restricción única (mascota, adoptante) detecta el duplicado en el mismo INSERT
+            if not registrar_solicitud(solicitud):
+                messages.warning(request, "Ya has enviado una solicitud para esta mascota.")
+                return redirect('mascotas:detalle_mascota', mascota_id=mascota.id)
             messages.success(request, "Tu solicitud de adopción fue enviada con éxito.")
             return redirect('usuarios:solicitud_enviada')
     else:
+        # Al mostrar el formulario se avisa si ya había pedido esta mascota
+        if SolicitudAdopcion.objects.filter(mascota=mascota, adoptante=adoptante).exists():
+            messages.warning(request, "Ya has enviado una solicitud para esta mascota.")
+            return redirect('mascotas:detalle_mascota', mascota_id=mascota.id)
         form = SolicitudAdopcionForm(initial={'telefono': adoptante.telefono, 'direccion': adoptante.direccion})
-        
+
 
     return render(request, 'mascotas/solicitar_adopcion.html', {'form': form, 'mascota': mascota, 'adoptante': adoptante})
 
@@ -50,25 +54,13 @@ def detalle_mascota(request, mascota_id):
     }
     return render(request, 'mascotas/detalle_mascota.html', context)
 
-def es_refugio(user):
-    """Verifica si el usuario logueado está asociado a un perfil Refugio."""
-    if user.is_authenticated:
-        try:
-            # Accede al perfil Refugio del usuario y verifica el campo
-            return user.refugio.es_refugio
-        except Refugio.DoesNotExist:
-            return False
-        except AttributeError:
-            return False
-    return False
-
 @login_required
-@user_passes_test(es_refugio, login_url='/usuarios/login/')
+@refugio_requerido
 def lista_mascotas_refugio(request):
     """
     Muestra la lista de mascotas que pertenecen al refugio del usuario logueado.
     """
-    refugio_usuario = request.user.refugio
+    refugio_usuario = request.profile
     
     # Filtra de forma SEGURA solo las mascotas de este refugio
     mascotas = Mascota.objects.filter(refugio=refugio_usuario).order_by('-fecha_ingreso')
@@ -80,9 +72,9 @@ def lista_mascotas_refugio(request):
     return render(request, 'mascotas/lista_mascotas_refugio.html', contexto)
 
 @login_required
-@user_passes_test(es_refugio, login_url='/usuarios/login/')
+@refugio_requerido
 def agregar_mascota_refugio(request):
-    refugio_usuario = request.user.refugio
+    refugio_usuario = request.profile
     
     if request.method == 'POST':
         form = MascotaForm(request.POST, request.FILES)
@@ -90,6 +82,7 @@ def agregar_mascota_refugio(request):
             mascota = form.save(commit=False)
             mascota.refugio = refugio_usuario  # Asignar el refugio automáticamente
             mascota.save()
+            form.procesar_imagen()
             messages.success(request, f"La mascota '{mascota.nombre}' ha sido registrada con éxito.")
             return redirect('mascotas:lista_mascotas_refugio')
     else:
@@ -101,9 +94,9 @@ def agregar_mascota_refugio(request):
     return render(request, 'mascotas/agregar_mascota.html', contexto)
 
 @login_required
-@user_passes_test(es_refugio, login_url='/usuarios/login/')
+@refugio_requerido
 def editar_mascota(request, pk):
-    refugio_usuario = request.user.refugio
+    refugio_usuario = request.profile
     
     # CLAVE DE SEGURIDAD: Solo permite editar mascotas del refugio del usuario
     mascota = get_object_or_404(Mascota, pk=pk, refugio=refugio_usuario)
@@ -125,9 +118,9 @@ def editar_mascota(request, pk):
     return render(request, 'mascotas/editar_mascota.html', contexto)
 
 @login_required
-@user_passes_test(es_refugio, login_url='/usuarios/login/')
+@refugio_requerido
 def gestion_solicitudes_refugio(request):
-    refugio_usuario = request.user.refugio
+    refugio_usuario = request.profile
     
     # 1. Obtener IDs de las mascotas que pertenecen al refugio logueado
     mascota_ids = Mascota.objects.filter(refugio=refugio_usuario).values_list('id', flat=True)
@@ -144,10 +137,55 @@ def gestion_solicitudes_refugio(request):
     return render(request, 'mascotas/gestion_solicitudes_refugio.html', contexto)
 
 
+# Mayor valor de un BigAutoField (bigint de PostgreSQL)
+MAX_ID = 2 ** 63 - 1
+
+
+def _ids_solicitudes(valores):
+    """
+    Ids enteros de la lista posteada; descarta lo que no sea un número que
+    entre en un bigint (un id enorme haría fallar la consulta con un 500).
+    """
+    # isascii(): isdigit() también acepta dígitos como '²', que int() rechaza
+    return [
+        int(v) for v in valores
+        if v.isascii() and v.isdigit() and len(v) <= len(str(MAX_ID)) and int(v) <= MAX_ID
+    ]
+
+
+@require_http_methods(["POST"])
 @login_required
-@user_passes_test(es_refugio, login_url='/usuarios/login/')
+@refugio_requerido
+def accion_masiva_solicitudes(request):
+    """Aprueba o rechaza de una vez las solicitudes marcadas en el listado."""
+    refugio_usuario = request.profile
+    ids = _ids_solicitudes(request.POST.getlist('solicitudes'))
+    accion = request.POST.get('accion')
+
+    if not ids or accion not in ('aprobar', 'rechazar'):
+        messages.error(request, "Seleccioná al menos una solicitud y una acción.")
+        return redirect('mascotas:gestion_solicitudes_refugio')
+
+    # CLAVE DE SEGURIDAD: los servicios solo tocan solicitudes de mascotas de este refugio
+    if accion == 'aprobar':
+        aprobadas, rechazadas, omitidas = aprobar_solicitudes(refugio_usuario, ids)
+        mensaje = f"Se aprobaron {aprobadas} solicitudes."
+        if rechazadas:
+            mensaje += f" Se rechazaron {rechazadas} solicitudes pendientes de las mismas mascotas."
+        if omitidas:
+            mensaje += f" {omitidas} no se aprobaron porque su mascota ya tenía otra solicitud aprobada."
+    else:
+        rechazadas = rechazar_solicitudes(refugio_usuario, ids)
+        mensaje = f"Se rechazaron {rechazadas} solicitudes."
+
+    messages.success(request, mensaje)
+    return redirect('mascotas:gestion_solicitudes_refugio')
+
+
+@login_required
+@refugio_requerido
 def detalle_solicitud_refugio(request, pk):
-    refugio_usuario = request.user.refugio
+    refugio_usuario = request.profile
     
     # CLAVE DE SEGURIDAD: Solo permite acceder a solicitudes de sus propias mascotas
     solicitud = get_object_or_404(
@@ -157,16 +195,23 @@ def detalle_solicitud_refugio(request, pk):
     )
 
     if request.method == "POST":
+        estado_actual = solicitud.estado  # is_valid() ya modifica la instancia
         form = EstadoSolicitudForm(request.POST, instance=solicitud)
         if form.is_valid():
+            if form.cleaned_data['estado'] == 'aprobada' and estado_actual != 'aprobada':
+                # Aprobar: una transacción que adopta la mascota y rechaza las demás pendientes
+                try:
+                    rechazadas = aprobar_solicitud(solicitud.pk)
+                except AdopcionNoDisponible:
+                    messages.error(request, f"{solicitud.mascota.nombre} ya fue adoptada con otra solicitud.")
+                    return redirect('mascotas:detalle_solicitud_refugio', pk=solicitud.pk)
+                mensaje = f"Solicitud de {solicitud.nombre_adoptante} aprobada."
+                if rechazadas:
+                    mensaje += f" Se rechazaron {rechazadas} solicitudes pendientes para {solicitud.mascota.nombre}."
+                messages.success(request, mensaje)
+                return redirect('mascotas:gestion_solicitudes_refugio')
+
             nueva_solicitud = form.save()
-            
-            # Lógica extra al aprobar: si se aprueba, marca la mascota como adoptada
-            if nueva_solicitud.estado == 'aprobada':
-                mascota = nueva_solicitud.mascota
-                mascota.adoptada = True
-                mascota.save()
-            
             messages.success(request, f"Estado de la solicitud de {solicitud.nombre_adoptante} actualizado a '{nueva_solicitud.get_estado_display()}'")
             return redirect('mascotas:gestion_solicitudes_refugio')
     else:
@@ -180,9 +225,9 @@ def detalle_solicitud_refugio(request, pk):
 
 @require_http_methods(["POST"]) # Solo permite acceso vía POST
 @login_required
-@user_passes_test(es_refugio, login_url='/usuarios/login/')
+@refugio_requerido
 def eliminar_mascota(request, pk):
-    refugio_usuario = request.user.refugio
+    refugio_usuario = request.profile
     
     # CLAVE DE SEGURIDAD: Solo permite eliminar si la mascota pertenece al refugio del usuario
     mascota = get_object_or_404(Mascota, pk=pk, refugio=refugio_usuario)
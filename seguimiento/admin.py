@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Veterinario, Seguimiento
+from usuarios.contadores import eliminar_y_recalcular
 from usuarios.models import Veterinario
 
 
@@ -15,3 +16,7 @@ class SeguimientoAdmin(admin.ModelAdmin):
     list_display = ('id', 'mascota', 'veterinario', 'fecha_revision', 'hora_revision', 'estado')
     list_filter = ('estado', 'veterinario', 'fecha_revision')
     search_fields = ('mascota__nombre', 'veterinario__nombre', 'motivo')
+
+    def delete_queryset(self, request, queryset):
+        # El borrado en bloque no pasa por delete() de cada revisión
+        eliminar_y_recalcular(queryset, 'mascota__refugio_id')
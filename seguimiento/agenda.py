@@ -0,0 +1,142 @@
+# seguimiento/agenda.py
+"""
+Agenda de revisiones por veterinario.
+
+Cada revisión con hora ocupa al veterinario ``DURACION_REVISION`` minutos a
+partir de ``hora_revision``. :class:`Agenda` carga los turnos de un
+veterinario para un rango de fechas con **una consulta** (índice
+``seguimiento_vet_agenda_idx``) y los guarda como una lista ordenada de
+inicios. Como todos los turnos duran lo mismo, para saber si un horario choca
+alcanza con mirar sus dos vecinos en la lista (``bisect``, O(log n)), y los
+próximos huecos libres salen recorriendo la grilla de la jornada contra esa
+misma lista.
+
+Las revisiones canceladas o sin hora no ocupan la agenda.
+
+Validar y guardar no es atómico por sí solo: quien reserve un turno debe
+llamar a :func:`bloquear_veterinario` dentro de la transacción, volver a
+validar y recién entonces guardar, para que dos reservas simultáneas del
+mismo veterinario se atiendan de a una.
+"""
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+
+from django.conf import settings
+
+from usuarios.models import Veterinario
+from .models import Seguimiento
+
+DURACION_REVISION = 30
+# Jornada de atención (horas en punto) sobre la que se ofrecen turnos
+INICIO_JORNADA = 8
+FIN_JORNADA = 18
+# Días hacia adelante en los que se buscan huecos libres
+DIAS_BUSQUEDA = 14
+
+
+class RevisionNoDisponible(Exception):
+    """El horario se ocupó entre la validación del formulario y el guardado."""
+
+
+def bloquear_veterinario(veterinario):
+    """Bloquea la fila del veterinario hasta el fin de la transacción (``SELECT ... FOR UPDATE``)."""
+    if veterinario is not None:
+        Veterinario.objects.select_for_update().filter(pk=veterinario.pk).first()
+
+
+def duracion_revision():
+    return timedelta(minutes=getattr(settings, 'SEGUIMIENTO_DURACION_MINUTOS', DURACION_REVISION))
+
+
+class Agenda:
+    """Turnos ocupados de un veterinario entre ``desde`` y ``hasta`` (fechas incluidas)."""
+
+    def __init__(self, desde, hasta, turnos=(), duracion=None):
+        self.desde = desde
+        self.hasta = hasta
+        self.duracion = duracion or duracion_revision()
+        turnos = sorted(turnos)
+        self._inicios = [inicio for inicio, _ in turnos]
+        self._ids = [pk for _, pk in turnos]
+
+    @classmethod
+    def cargar(cls, veterinario, desde, hasta, excluir=None, excluir_serie=None):
+        """
+        Lee los turnos del veterinario en el rango (una sola consulta). Se
+        pueden dejar afuera un seguimiento (``excluir``) o toda una serie
+        (``excluir_serie``), por ejemplo al editarlos.
+        """
+        turnos = (Seguimiento.objects
+                  .filter(veterinario=veterinario,
+                          fecha_revision__range=(desde, hasta),
+                          hora_revision__isnull=False)
+                  .exclude(estado='cancelado')
+                  .order_by('fecha_revision', 'hora_revision')
+                  .values_list('fecha_revision', 'hora_revision', 'pk'))
+        if excluir is not None:
+            turnos = turnos.exclude(pk=excluir)
+        if excluir_serie is not None:
+            turnos = turnos.exclude(serie=excluir_serie)
+        return cls(desde, hasta, [(datetime.combine(fecha, hora), pk) for fecha, hora, pk in turnos])
+
+    def __len__(self):
+        return len(self._inicios)
+
+    def conflicto(self, inicio):
+        """Id del turno que se superpone con uno que empieza en ``inicio``, o None."""
+        i = bisect_right(self._inicios, inicio)
+        # Último turno que empieza antes (o a la vez): choca si todavía no terminó
+        if i and self._inicios[i - 1] + self.duracion > inicio:
+            return self._ids[i - 1]
+        # Primer turno que empieza después: choca si empieza antes de que termine este
+        if i < len(self._inicios) and self._inicios[i] < inicio + self.duracion:
+            return self._ids[i]
+        return None
+
+    def reservar(self, inicio, pk=None):
+        """Agrega el turno si está libre. Devuelve False si se superpone."""
+        if self.conflicto(inicio) is not None:
+            return False
+        i = bisect_left(self._inicios, inicio)
+        self._inicios.insert(i, inicio)
+        self._ids.insert(i, pk)
+        return True
+
+    def huecos_libres(self, cantidad, desde=None):
+        """
+        Próximos ``cantidad`` inicios libres de la grilla de la jornada a partir
+        de ``desde`` (un ``datetime``; por defecto, el comienzo del rango).
+        """
+        if desde is None:
+            desde = datetime.combine(self.desde, datetime.min.time())
+        libres = []
+        dia = max(desde.date(), self.desde)
+        while dia <= self.hasta and len(libres) < cantidad:
+            apertura = datetime.combine(dia, datetime.min.time()) + timedelta(hours=INICIO_JORNADA)
+            cierre = apertura + timedelta(hours=FIN_JORNADA - INICIO_JORNADA)
+            candidato = apertura if desde <= apertura else _alinear(desde, apertura, self.duracion)
+            # Primer turno que puede seguir ocupando al veterinario en ``candidato``
+            i = bisect_right(self._inicios, candidato - self.duracion)
+            while candidato + self.duracion <= cierre and len(libres) < cantidad:
+                while i < len(self._inicios) and self._inicios[i] + self.duracion <= candidato:
+                    i += 1
+                if i < len(self._inicios) and self._inicios[i] < candidato + self.duracion:
+                    # Ocupado: se salta al primer horario de la grilla después de ese turno
+                    candidato = _alinear(self._inicios[i] + self.duracion, apertura, self.duracion)
+                else:
+                    libres.append(candidato)
+                    candidato += self.duracion
+            dia += timedelta(days=1)
+        return libres
+
+
+def _alinear(momento, apertura, duracion):
+    """Redondea ``momento`` hacia arriba a la grilla que empieza en ``apertura``."""
+    pasos = -(-(momento - apertura) // duracion)
+    return apertura + pasos * duracion
+
+
+def proximos_huecos(veterinario, desde, cantidad=5, dias=DIAS_BUSQUEDA, excluir=None):
+    """Próximos ``cantidad`` turnos libres del veterinario desde ``desde`` (un ``datetime``)."""
+    agenda = Agenda.cargar(veterinario, desde.date(), desde.date() + timedelta(days=dias), excluir=excluir)
+    return agenda.huecos_libres(cantidad, desde=desde)
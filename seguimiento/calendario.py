@@ -0,0 +1,191 @@
+# seguimiento/calendario.py
+"""
+Calendarios iCalendar (.ics) de revisiones, por refugio y por veterinario.
+
+Las aplicaciones de calendario consultan el feed cada pocos minutos y casi
+nunca hay cambios. Por eso, antes de armar nada se calcula con **una consulta
+agregada** ``max(actualizado_en)`` y la cantidad de revisiones del feed: de
+ahí sale el ``ETag``, y si el cliente ya tiene esa versión se responde
+``304 Not Modified`` sin generar el calendario. La cantidad entra en el ETag
+porque borrar una revisión no mueve el máximo; por lo mismo no se envía
+``Last-Modified``, que no cambiaría al borrar.
+
+El calendario también muestra datos de otras tablas (nombre de la mascota,
+nombre y dirección del refugio, nombre del veterinario). Editarlos no toca
+``actualizado_en``: las señales de ``usuarios/signals.py`` llaman a
+:func:`invalidar_calendarios`, que cambia la generación que también entra en
+el ETag.
+
+El cuerpo se genera en streaming a partir de las filas (``.iterator()``) y se
+guarda en el caché con el ETag en la clave: sirve hasta que cambie alguna
+revisión del feed, sin necesidad de invalidarlo a mano.
+
+Los feeds no usan la sesión (los calendarios no pueden iniciar sesión): la URL
+lleva un token firmado con ``django.core.signing`` que identifica el feed.
+"""
+import hashlib
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from usuarios.models import Refugio, Veterinario
+from .agenda import duracion_revision
+from .models import Seguimiento
+
+SALT_CALENDARIO = 'seguimiento.calendario'
+# Días hacia atrás que se publican (las revisiones futuras van todas)
+DIAS_HISTORIAL = 180
+DURACION_CACHE = 24 * 60 * 60
+TIPOS_FEED = ('refugio', 'veterinario')
+
+ESTADO_ICS = {'cancelado': 'CANCELLED'}
+
+CLAVE_GENERACION = 'seguimiento:calendario:generacion'
+# Campos de otras tablas que aparecen en el .ics
+CAMPOS_MASCOTA = {'nombre', 'refugio'}
+CAMPOS_REFUGIO = {'nombre', 'direccion'}
+CAMPOS_VETERINARIO = {'nombre', 'apellido'}
+
+
+def token_calendario(tipo, pk):
+    """Token firmado que identifica el feed en la URL (siempre el mismo para cada feed)."""
+    return signing.Signer(salt=SALT_CALENDARIO).sign_object([tipo, pk])
+
+
+def leer_token(token):
+    """``(tipo, pk)`` del token, o None si no es válido."""
+    try:
+        tipo, pk = signing.Signer(salt=SALT_CALENDARIO).unsign_object(token)
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+    if tipo not in TIPOS_FEED or not isinstance(pk, int):
+        return None
+    return tipo, pk
+
+
+def revisiones_feed(tipo, pk):
+    """Revisiones que publica el feed (desde ``DIAS_HISTORIAL`` días atrás)."""
+    desde = timezone.localdate() - timedelta(days=DIAS_HISTORIAL)
+    filtro = {'mascota__refugio_id': pk} if tipo == 'refugio' else {'veterinario_id': pk}
+    return Seguimiento.objects.filter(fecha_revision__gte=desde, **filtro)
+
+
+def invalidar_calendarios():
+    """Nueva generación de todos los feeds (cambió un dato que muestran)."""
+    generacion = uuid.uuid4().hex
+    cache.set(CLAVE_GENERACION, generacion, None)
+    return generacion
+
+
+def generacion_calendarios():
+    # Si el caché se vació se empieza una generación nueva: nunca se repite una vieja
+    return cache.get(CLAVE_GENERACION) or invalidar_calendarios()
+
+
+def version_feed(tipo, pk):
+    """ETag del feed, con una sola consulta agregada."""
+    resumen = revisiones_feed(tipo, pk).aggregate(ultima=Max('actualizado_en'), total=Count('id'))
+    # La ventana se corre cada día: la fecha de inicio también forma parte de la versión
+    clave = (f"{tipo}:{pk}:{timezone.localdate()}:{resumen['ultima']}:{resumen['total']}:"
+             f"{generacion_calendarios()}")
+    return hashlib.sha1(clave.encode()).hexdigest()
+
+
+def nombre_feed(tipo, pk):
+    if tipo == 'refugio':
+        nombre = Refugio.objects.filter(pk=pk).values_list('nombre', flat=True).first()
+        return f"Revisiones - {nombre or 'Refugio'}"
+    veterinario = Veterinario.objects.filter(pk=pk).values('nombre', 'apellido').first() or {}
+    return f"Revisiones - {veterinario.get('nombre', '')} {veterinario.get('apellido', '')}".strip()
+
+
+def _escapar(texto):
+    return (str(texto or '').replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _plegar(linea):
+    """Parte las líneas largas en trozos de 75 octetos (RFC 5545, 3.1)."""
+    datos = linea.encode('utf-8')
+    partes = []
+    while len(datos) > 75:
+        corte = 75 if not partes else 74
+        # No cortar en medio de un carácter UTF-8
+        while corte and (datos[corte] & 0xC0) == 0x80:
+            corte -= 1
+        partes.append(datos[:corte])
+        datos = datos[corte:]
+    partes.append(datos)
+    return b'\r\n '.join(partes) + b'\r\n'
+
+
+def _utc(momento):
+    return momento.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def lineas_evento(seguimiento, duracion):
+    yield 'BEGIN:VEVENT'
+    yield f'UID:seguimiento-{seguimiento.pk}@sistema-adopcion'
+    yield f'DTSTAMP:{_utc(seguimiento.actualizado_en)}'
+    yield f'LAST-MODIFIED:{_utc(seguimiento.actualizado_en)}'
+    if seguimiento.hora_revision:
+        inicio = timezone.make_aware(datetime.combine(seguimiento.fecha_revision, seguimiento.hora_revision))
+        yield f'DTSTART:{_utc(inicio)}'
+        yield f'DTEND:{_utc(inicio + duracion)}'
+    else:
+        yield f"DTSTART;VALUE=DATE:{seguimiento.fecha_revision.strftime('%Y%m%d')}"
+        yield f"DTEND;VALUE=DATE:{(seguimiento.fecha_revision + timedelta(days=1)).strftime('%Y%m%d')}"
+    yield f'SUMMARY:{_escapar(f"Revisión de {seguimiento.mascota.nombre}")}'
+    detalle = [seguimiento.motivo, seguimiento.observaciones]
+    if seguimiento.veterinario:
+        detalle.insert(0, f"Veterinario: {seguimiento.veterinario.nombre} {seguimiento.veterinario.apellido}")
+    yield f"DESCRIPTION:{_escapar(chr(10).join(d for d in detalle if d))}"
+    yield f'LOCATION:{_escapar(seguimiento.mascota.refugio.direccion)}'
+    yield f"STATUS:{ESTADO_ICS.get(seguimiento.estado, 'CONFIRMED')}"
+    yield 'END:VEVENT'
+
+
+def generar_calendario(tipo, pk):
+    """Generador de los bytes del .ics, un evento por revisión."""
+    duracion = duracion_revision()
+    nombre = nombre_feed(tipo, pk)
+    cabecera = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Sistema de Adopcion//Seguimientos//ES',
+        'CALSCALE:GREGORIAN',
+        f'X-WR-CALNAME:{_escapar(nombre)}',
+    ]
+    yield b''.join(_plegar(linea) for linea in cabecera)
+    revisiones = (revisiones_feed(tipo, pk)
+                  .select_related('mascota__refugio', 'veterinario')
+                  .order_by('fecha_revision', 'id')
+                  .iterator(chunk_size=500))
+    for seguimiento in revisiones:
+        yield b''.join(_plegar(linea) for linea in lineas_evento(seguimiento, duracion))
+    yield _plegar('END:VCALENDAR')
+
+
+def clave_cache(tipo, pk, etag):
+    return f'seguimiento:calendario:{tipo}:{pk}:{etag}'
+
+
+def contenido_calendario(tipo, pk, etag):
+    """
+    Trozos del .ics: del caché si esta versión ya se generó; si no, se
+    generan en streaming y al terminar se guardan para los próximos pedidos.
+    """
+    clave = clave_cache(tipo, pk, etag)
+    guardado = cache.get(clave)
+    if guardado is not None:
+        yield guardado
+        return
+    partes = []
+    for trozo in generar_calendario(tipo, pk):
+        partes.append(trozo)
+        yield trozo
+    cache.set(clave, b''.join(partes), DURACION_CACHE)
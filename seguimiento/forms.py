@@ -1,5 +1,11 @@
 from django import forms
+from django.db import transaction
+from datetime import datetime, timedelta
+
+from .agenda import Agenda, DIAS_BUSQUEDA, RevisionNoDisponible, bloquear_veterinario
 from .models import Seguimiento
+from .series import MESES_POR_DEFECTO, conflictos_serie, expandir_serie
+from mascotas.models import Mascota
 from usuarios.models import Veterinario
 
 
@@ -25,6 +31,116 @@ class SeguimientoForm(forms.ModelForm):
             # En caso de no haber refugio (seguridad)
             self.fields['veterinario'].queryset = Veterinario.objects.none()
 
+    # Turnos libres sugeridos cuando el horario elegido ya está ocupado
+    CANTIDAD_SUGERENCIAS = 5
+
+    def clean(self):
+        cleaned_data = super().clean()
+        self._validar_agenda(cleaned_data)
+        return cleaned_data
+
+    def _validar_agenda(self, cleaned_data):
+        """Agrega el error (con sugerencias) si el horario choca. Devuelve False en ese caso."""
+        veterinario = cleaned_data.get('veterinario')
+        fecha = cleaned_data.get('fecha_revision')
+        hora = cleaned_data.get('hora_revision')
+        if not (veterinario and fecha and hora) or cleaned_data.get('estado') == 'cancelado':
+            return True
+
+        # Una consulta trae la agenda del día y de los siguientes (para sugerir)
+        agenda = Agenda.cargar(veterinario, fecha, fecha + timedelta(days=DIAS_BUSQUEDA),
+                               excluir=self.instance.pk)
+        inicio = datetime.combine(fecha, hora)
+        if agenda.conflicto(inicio) is None:
+            return True
+        self.sugerencias = agenda.huecos_libres(self.CANTIDAD_SUGERENCIAS, desde=inicio)
+        libres = ', '.join(h.strftime('%d/%m %H:%M') for h in self.sugerencias)
+        self.add_error('hora_revision', f"{veterinario} ya tiene una revisión en ese horario."
+                       + (f" Próximos turnos libres: {libres}." if libres else ""))
+        return False
+
+    def save(self, commit=True):
+        """
+        Guarda con el veterinario bloqueado, después de volver a validar su
+        agenda: lo validado en ``clean()`` pudo ocuparse mientras tanto. Lanza
+        :class:`~seguimiento.agenda.RevisionNoDisponible` (con el error ya
+        agregado al formulario) si el horario se ocupó.
+        """
+        if not commit:
+            return super().save(commit=False)
+        with transaction.atomic():
+            bloquear_veterinario(self.cleaned_data.get('veterinario'))
+            if not self._validar_agenda(self.cleaned_data):
+                raise RevisionNoDisponible(self.errors['hora_revision'][0])
+            return super().save()
+
+
+class SerieSeguimientoForm(forms.Form):
+    """Serie de revisiones: una fecha base y los meses después de ella."""
+    mascota = forms.ModelChoiceField(queryset=Mascota.objects.none(),
+                                     widget=forms.Select(attrs={'class': 'form-control'}))
+    veterinario = forms.ModelChoiceField(queryset=Veterinario.objects.none(), required=False,
+                                         widget=forms.Select(attrs={'class': 'form-control'}))
+    fecha_base = forms.DateField(label='Fecha de adopción',
+                                 widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+    hora_revision = forms.TimeField(required=False,
+                                    widget=forms.TimeInput(attrs={'type': 'time', 'class': 'form-control'}))
+    meses = forms.CharField(initial=', '.join(str(n) for n in MESES_POR_DEFECTO),
+                            help_text='Meses después de la fecha base, separados por comas.',
+                            widget=forms.TextInput(attrs={'class': 'form-control'}))
+    motivo = forms.CharField(max_length=200, required=False, initial='Control post-adopción',
+                             widget=forms.TextInput(attrs={'class': 'form-control'}))
+    observaciones = forms.CharField(required=False,
+                                    widget=forms.Textarea(attrs={'rows': 3, 'class': 'form-control'}))
+
+    MAXIMO_REVISIONES = 24
+
+    def __init__(self, *args, **kwargs):
+        refugio = kwargs.pop('refugio', None)
+        super().__init__(*args, **kwargs)
+        if refugio:
+            self.fields['mascota'].queryset = Mascota.objects.filter(refugio=refugio)
+            self.fields['veterinario'].queryset = Veterinario.objects.filter(refugio=refugio)
+
+    def clean_meses(self):
+        try:
+            meses = sorted({int(valor) for valor in self.cleaned_data['meses'].split(',') if valor.strip()})
+        except ValueError:
+            raise forms.ValidationError('Escribe los meses como números separados por comas (por ejemplo 1, 3, 6, 12).')
+        if not meses or meses[0] < 0 or len(meses) > self.MAXIMO_REVISIONES:
+            raise forms.ValidationError(f'Indica entre 1 y {self.MAXIMO_REVISIONES} meses, sin valores negativos.')
+        return meses
+
+    def clean(self):
+        cleaned_data = super().clean()
+        fecha_base = cleaned_data.get('fecha_base')
+        meses = cleaned_data.get('meses')
+        if fecha_base and meses:
+            cleaned_data['fechas'] = expandir_serie(fecha_base, meses)
+            # Todas las fechas se validan contra una sola carga de la agenda
+            conflictos = conflictos_serie(cleaned_data.get('veterinario'), cleaned_data['fechas'],
+                                          cleaned_data.get('hora_revision'))
+            if conflictos:
+                fechas = ', '.join(f.strftime('%d/%m/%Y') for f in conflictos)
+                self.add_error('hora_revision', f"El veterinario ya tiene revisiones a esa hora el {fechas}.")
+        return cleaned_data
+
+
+class EditarSerieForm(forms.Form):
+    """Cambios que se aplican a todas las revisiones abiertas de una serie."""
+    veterinario = forms.ModelChoiceField(queryset=Veterinario.objects.none(), required=False,
+                                         widget=forms.Select(attrs={'class': 'form-control'}))
+    hora_revision = forms.TimeField(required=False,
+                                    widget=forms.TimeInput(attrs={'type': 'time', 'class': 'form-control'}))
+    motivo = forms.CharField(max_length=200, required=False,
+                             widget=forms.TextInput(attrs={'class': 'form-control'}))
+
+    def __init__(self, *args, **kwargs):
+        refugio = kwargs.pop('refugio', None)
+        super().__init__(*args, **kwargs)
+        if refugio:
+            self.fields['veterinario'].queryset = Veterinario.objects.filter(refugio=refugio)
+
 
 class VeterinarioForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,36 @@
+# seguimiento/management/commands/enviar_recordatorios.py
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from seguimiento.recordatorios import TAMANO_LOTE, enviar_recordatorios
+
+
+class Command(BaseCommand):
+    help = (
+        "Envía por email los recordatorios de las revisiones pendientes de "
+        "mañana al veterinario y al adoptante, por lotes y sobre una sola "
+        "conexión. Registra cada envío, así que se puede ejecutar varias veces "
+        "(por ejemplo desde cron) sin repetir avisos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha', default=None,
+                            help='Fecha de las revisiones (AAAA-MM-DD); por defecto, mañana.')
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE,
+                            help=f'Mensajes por lote (por defecto {TAMANO_LOTE}).')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError("--lote debe ser al menos 1.")
+        fecha = None
+        if options['fecha']:
+            try:
+                fecha = date.fromisoformat(options['fecha'])
+            except ValueError:
+                raise CommandError("La fecha debe tener el formato AAAA-MM-DD.")
+
+        enviados, fallidos = enviar_recordatorios(fecha=fecha, lote=options['lote'])
+        if fallidos:
+            self.stderr.write(f"{fallidos} recordatorios no se pudieron enviar; se reintentarán.")
+        self.stdout.write(self.style.SUCCESS(f"Listo. {enviados} recordatorios enviados."))
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:43
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY no bloquea escrituras, pero no admite transacción
+    atomic = False
+
+    dependencies = [
+        ('mascotas', '0015_indices_consultas'),
+        ('seguimiento', '0003_alter_seguimiento_veterinario_delete_veterinario'),
+        ('usuarios', '0013_estadisticas_refugio'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='seguimiento',
+            index=models.Index(fields=['fecha_revision', 'hora_revision'], name='seguimiento_fecha_hora_idx'),
+        ),
+    ]
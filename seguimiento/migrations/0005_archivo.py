@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:50
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mascotas', '0017_archivo'),
+        ('seguimiento', '0004_indices_consultas'),
+        ('usuarios', '0013_estadisticas_refugio'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeguimientoArchivado',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('fecha_revision', models.DateField()),
+                ('hora_revision', models.TimeField(blank=True, null=True)),
+                ('motivo', models.CharField(blank=True, max_length=200, null=True)),
+                ('observaciones', models.TextField(blank=True, null=True)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_curso', 'En curso'), ('finalizado', 'Finalizado'), ('cancelado', 'Cancelado')], max_length=20)),
+                ('creado_en', models.DateTimeField()),
+                ('actualizado_en', models.DateTimeField()),
+                ('archivado_en', models.DateTimeField(default=django.utils.timezone.now)),
+                ('mascota', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='mascotas.mascota')),
+                ('veterinario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='usuarios.veterinario')),
+            ],
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:20
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY no bloquea escrituras, pero no admite transacción
+    atomic = False
+
+    dependencies = [
+        ('seguimiento', '0005_archivo'),
+        ('usuarios', '0013_estadisticas_refugio'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='seguimiento',
+            index=models.Index(fields=['veterinario', 'fecha_revision', 'hora_revision'], name='seguimiento_vet_agenda_idx'),
+        ),
+    ]
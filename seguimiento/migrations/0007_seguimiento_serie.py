@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seguimiento', '0006_indice_agenda'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='seguimiento',
+            name='serie',
+            field=models.UUIDField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='seguimientoarchivado',
+            name='serie',
+            field=models.UUIDField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:05
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY no bloquea escrituras, pero no admite transacción
+    atomic = False
+
+    dependencies = [
+        ('mascotas', '0017_archivo'),
+        ('seguimiento', '0007_seguimiento_serie'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='seguimiento',
+            index=models.Index(fields=['mascota', 'fecha_revision', 'hora_revision'], name='seguimiento_mascota_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seguimiento', '0008_indice_listado_refugio'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='seguimiento',
+            name='recordatorio_adoptante_en',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='seguimiento',
+            name='recordatorio_veterinario_en',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='seguimientoarchivado',
+            name='recordatorio_adoptante_en',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='seguimientoarchivado',
+            name='recordatorio_veterinario_en',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
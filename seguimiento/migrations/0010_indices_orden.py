@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:11
+
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY no bloquea escrituras, pero no admite transacción
+    atomic = False
+
+    dependencies = [
+        ('seguimiento', '0009_recordatorios'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='seguimiento',
+            index=models.Index(fields=['mascota', 'fecha_revision', 'hora_revision', 'id'], name='seguimiento_mascota_orden_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='seguimiento',
+            index=models.Index(fields=['mascota', 'estado', 'fecha_revision', 'hora_revision', 'id'], name='seguimiento_mascota_estado_idx'),
+        ),
+        # Se quita después de crear el reemplazo: nunca queda el listado sin índice
+        RemoveIndexConcurrently(
+            model_name='seguimiento',
+            name='seguimiento_mascota_fecha_idx',
+        ),
+    ]
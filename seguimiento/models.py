@@ -1,8 +1,10 @@
 from django.db import models
+from django.utils import timezone
 from usuarios.models import Refugio, Veterinario
+from usuarios.contadores import ESTADOS_SEGUIMIENTO_PENDIENTE, ContadoresRefugioMixin
 from mascotas.models import Mascota  # ajustar si el modelo Mascotas tiene otro nombre
 
-class Seguimiento(models.Model):
+class Seguimiento(ContadoresRefugioMixin, models.Model):
     ESTADOS = [
         ('pendiente', 'Pendiente'),
         ('en_curso', 'En curso'),
@@ -19,7 +21,57 @@ class Seguimiento(models.Model):
     estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente')
     creado_en = models.DateTimeField(auto_now_add=True)
     actualizado_en = models.DateTimeField(auto_now=True)
+    # Revisiones generadas juntas como serie (ver seguimiento/series.py)
+    serie = models.UUIDField(blank=True, null=True, editable=False, db_index=True)
+    # Cuándo se envió el recordatorio a cada destinatario (ver seguimiento/recordatorios.py)
+    recordatorio_veterinario_en = models.DateTimeField(blank=True, null=True, editable=False)
+    recordatorio_adoptante_en = models.DateTimeField(blank=True, null=True, editable=False)
+
+    CAMPOS_APORTE = ('mascota', 'estado')
+
+    class Meta:
+        indexes = [
+            # Agenda ordenada por fecha y hora de revisión
+            models.Index(fields=['fecha_revision', 'hora_revision'], name='seguimiento_fecha_hora_idx'),
+            # Agenda de un veterinario en un rango de fechas (ver seguimiento/agenda.py)
+            models.Index(fields=['veterinario', 'fecha_revision', 'hora_revision'], name='seguimiento_vet_agenda_idx'),
+            # Revisiones de una mascota en el orden de los listados (fecha, hora, id);
+            # el listado del refugio y mis_seguimientos llegan por acá mascota por mascota
+            models.Index(fields=['mascota', 'fecha_revision', 'hora_revision', 'id'],
+                         name='seguimiento_mascota_orden_idx'),
+            # Igual, para el listado del refugio filtrado por estado
+            models.Index(fields=['mascota', 'estado', 'fecha_revision', 'hora_revision', 'id'],
+                         name='seguimiento_mascota_estado_idx'),
+        ]
+
+    def aporte_contadores(self, valores):
+        pendiente = 1 if valores['estado'] in ESTADOS_SEGUIMIENTO_PENDIENTE else 0
+        return self._refugio_de_mascota(valores['mascota_id']), {'seguimientos_pendientes': pendiente}
 
     def __str__(self):
         return f"Seguimiento #{self.id} - {self.mascota.nombre} - {self.fecha_revision}"
-    
\ No newline at end of file
+    
+
+
+class SeguimientoArchivado(models.Model):
+    """
+    Seguimiento finalizado o cancelado que ``manage.py archivar_cerrados``
+    sacó de Seguimiento. Conserva el id original y las mismas columnas.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    mascota = models.ForeignKey(Mascota, on_delete=models.CASCADE, related_name='+')
+    veterinario = models.ForeignKey(Veterinario, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    fecha_revision = models.DateField()
+    hora_revision = models.TimeField(blank=True, null=True)
+    motivo = models.CharField(max_length=200, blank=True, null=True)
+    observaciones = models.TextField(blank=True, null=True)
+    estado = models.CharField(max_length=20, choices=Seguimiento.ESTADOS)
+    creado_en = models.DateTimeField()
+    actualizado_en = models.DateTimeField()
+    serie = models.UUIDField(blank=True, null=True)
+    recordatorio_veterinario_en = models.DateTimeField(blank=True, null=True)
+    recordatorio_adoptante_en = models.DateTimeField(blank=True, null=True)
+    archivado_en = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Seguimiento archivado #{self.id} - {self.fecha_revision}"
@@ -0,0 +1,139 @@
+# seguimiento/recordatorios.py
+"""
+Recordatorios por email de las revisiones del día siguiente.
+
+:func:`enviar_recordatorios` (lo usa ``manage.py enviar_recordatorios``):
+
+- trae las revisiones pendientes de la fecha con **una consulta** sobre el
+  índice ``seguimiento_fecha_hora_idx``, con ``select_related`` de mascota,
+  refugio y veterinario y el email del adoptante (solicitud aprobada) como
+  subconsulta;
+- arma cada mensaje con una plantilla que se compila una sola vez;
+- envía por lotes con ``send_messages`` sobre **una única conexión** de
+  ``get_connection()`` (con SMTP, una sola sesión para todo el envío);
+- después de cada lote marca ``recordatorio_veterinario_en`` /
+  ``recordatorio_adoptante_en`` con un ``UPDATE``, así volver a ejecutarlo no
+  repite los avisos ya enviados.
+
+Si un lote falla no se marca: esos avisos se reintentan en la próxima
+ejecución (entrega "al menos una vez"). Si después del fallo tampoco se puede
+reabrir la conexión, el resto de la ejecución se cuenta como fallido. Funciona con cualquier backend de
+email, incluidos ``console`` y ``locmem``.
+"""
+import logging
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import OuterRef, Subquery
+from django.template.loader import get_template
+from django.utils import timezone
+
+from mascotas.models import SolicitudAdopcion
+from .models import Seguimiento
+
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE = 100
+
+# destinatario -> campo que registra el envío
+CAMPOS_ENVIO = {
+    'veterinario': 'recordatorio_veterinario_en',
+    'adoptante': 'recordatorio_adoptante_en',
+}
+
+
+@lru_cache(maxsize=None)
+def plantillas():
+    """(asunto, cuerpo) compiladas una vez por proceso."""
+    return (get_template('seguimiento/email/recordatorio_asunto.txt'),
+            get_template('seguimiento/email/recordatorio.txt'))
+
+
+def revisiones_del_dia(fecha):
+    """Revisiones pendientes de ``fecha`` con todo lo necesario para los mensajes."""
+    email_adoptante = (SolicitudAdopcion.objects
+                       .filter(mascota=OuterRef('mascota'), estado='aprobada')
+                       .values('email')[:1])
+    return (Seguimiento.objects
+            .filter(fecha_revision=fecha, estado='pendiente')
+            .select_related('mascota__refugio', 'veterinario')
+            .annotate(email_adoptante=Subquery(email_adoptante))
+            .order_by('hora_revision', 'id'))
+
+
+def avisos_pendientes(revisiones):
+    """Genera ``(seguimiento, destinatario, email)`` de los avisos todavía no enviados."""
+    for seguimiento in revisiones:
+        if (seguimiento.recordatorio_veterinario_en is None
+                and seguimiento.veterinario and seguimiento.veterinario.email):
+            yield seguimiento, 'veterinario', seguimiento.veterinario.email
+        if seguimiento.recordatorio_adoptante_en is None and seguimiento.email_adoptante:
+            yield seguimiento, 'adoptante', seguimiento.email_adoptante
+
+
+def armar_mensaje(seguimiento, destinatario, email, connection):
+    asunto, cuerpo = plantillas()
+    contexto = {
+        'seguimiento': seguimiento,
+        'mascota': seguimiento.mascota,
+        'refugio': seguimiento.mascota.refugio,
+        'veterinario': seguimiento.veterinario,
+        'destinatario': destinatario,
+    }
+    return EmailMessage(
+        subject=' '.join(asunto.render(contexto).split()),
+        body=cuerpo.render(contexto),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[email],
+        connection=connection,
+    )
+
+
+def _marcar_enviados(avisos):
+    ahora = timezone.now()
+    for destinatario, campo in CAMPOS_ENVIO.items():
+        ids = [seguimiento.pk for seguimiento, tipo, _ in avisos if tipo == destinatario]
+        if ids:
+            # update() directo: no toca actualizado_en ni los contadores
+            Seguimiento.objects.filter(pk__in=ids).update(**{campo: ahora})
+
+
+def enviar_recordatorios(fecha=None, lote=TAMANO_LOTE, connection=None):
+    """
+    Envía los recordatorios de las revisiones de ``fecha`` (por defecto,
+    mañana). Devuelve ``(enviados, fallidos)``.
+    """
+    if lote < 1:
+        raise ValueError("El tamaño de lote debe ser al menos 1.")
+    if fecha is None:
+        fecha = timezone.localdate() + timedelta(days=1)
+    avisos = list(avisos_pendientes(revisiones_del_dia(fecha)))
+    if not avisos:
+        return 0, 0
+
+    enviados = fallidos = 0
+    connection = connection or get_connection()
+    with connection:  # abre la conexión una vez y la cierra al final
+        for inicio in range(0, len(avisos), lote):
+            bloque = avisos[inicio:inicio + lote]
+            mensajes = [armar_mensaje(s, destinatario, email, connection) for s, destinatario, email in bloque]
+            try:
+                connection.send_messages(mensajes)
+            except Exception:
+                logger.exception("Falló el envío de un lote de %d recordatorios", len(bloque))
+                fallidos += len(bloque)
+                # La sesión puede haber quedado inservible: se abre otra para el resto
+                try:
+                    connection.close()
+                    connection.open()
+                except Exception:
+                    restantes = len(avisos) - inicio - len(bloque)
+                    logger.exception("No se pudo reabrir la conexión; quedan %d recordatorios sin enviar", restantes)
+                    fallidos += restantes
+                    break
+                continue
+            _marcar_enviados(bloque)
+            enviados += len(bloque)
+    return enviados, fallidos
@@ -0,0 +1,133 @@
+# seguimiento/series.py
+"""
+Series de revisiones (seguimiento post-adopción).
+
+Una serie es una regla de recurrencia: una fecha base y una lista de meses
+después de ella (por defecto 1, 3, 6 y 12). :func:`crear_serie` la expande en
+todas sus fechas, valida la disponibilidad del veterinario para todas de una
+vez contra una sola carga de su agenda (ver ``seguimiento/agenda.py``) e
+inserta las revisiones con un único ``bulk_create`` dentro de una transacción.
+Todas comparten el mismo ``Seguimiento.serie``, así que editar o cancelar la
+serie completa es un solo ``UPDATE``.
+
+``bulk_create`` y ``update()`` no pasan por ``save()``: los contadores del
+refugio se ajustan acá con ``aplicar_diferencia``.
+"""
+import calendar
+import uuid
+from datetime import date, datetime
+
+from django.db import transaction
+from django.utils import timezone
+
+from usuarios.contadores import ESTADOS_SEGUIMIENTO_PENDIENTE, aplicar_diferencia
+from usuarios.models import Veterinario
+from .agenda import Agenda, bloquear_veterinario
+from .models import Seguimiento
+
+MESES_POR_DEFECTO = (1, 3, 6, 12)
+# Campos que se pueden cambiar para toda la serie de una vez
+CAMPOS_EDITABLES = ('veterinario', 'hora_revision', 'motivo', 'observaciones')
+
+
+class SerieNoDisponible(Exception):
+    """Alguna fecha de la serie choca con otra revisión del veterinario."""
+
+    def __init__(self, conflictos):
+        self.conflictos = conflictos
+        fechas = ', '.join(f.strftime('%d/%m/%Y') for f in conflictos)
+        super().__init__(f"El veterinario ya tiene revisiones en: {fechas}.")
+
+
+def sumar_meses(fecha, meses):
+    """``fecha`` más ``meses`` meses; si el día no existe se usa el último del mes."""
+    indice = fecha.year * 12 + fecha.month - 1 + meses
+    anio, mes = divmod(indice, 12)
+    mes += 1
+    return date(anio, mes, min(fecha.day, calendar.monthrange(anio, mes)[1]))
+
+
+def expandir_serie(fecha_base, meses=MESES_POR_DEFECTO):
+    """Fechas de la serie, ordenadas y sin repetir."""
+    return sorted({sumar_meses(fecha_base, n) for n in meses})
+
+
+def conflictos_serie(veterinario, fechas, hora, serie=None):
+    """
+    Fechas de ``fechas`` en las que ``veterinario`` no está libre a ``hora``.
+    Carga la agenda del rango completo una sola vez y reserva sobre ella, así
+    también se detectan choques entre las mismas fechas de la serie.
+    """
+    if veterinario is None or hora is None or not fechas:
+        return []
+    agenda = Agenda.cargar(veterinario, fechas[0], fechas[-1], excluir_serie=serie)
+    return [fecha for fecha in fechas if not agenda.reservar(datetime.combine(fecha, hora))]
+
+
+def crear_serie(mascota, fecha_base, meses=MESES_POR_DEFECTO, veterinario=None, hora=None,
+                motivo='', observaciones=''):
+    """
+    Crea todas las revisiones de la serie y devuelve la lista creada.
+    Lanza :class:`SerieNoDisponible` si alguna fecha choca con la agenda del
+    veterinario (no se crea ninguna).
+    """
+    fechas = expandir_serie(fecha_base, meses)
+    serie = uuid.uuid4()
+    with transaction.atomic():
+        bloquear_veterinario(veterinario)
+        conflictos = conflictos_serie(veterinario, fechas, hora)
+        if conflictos:
+            raise SerieNoDisponible(conflictos)
+
+        creados = Seguimiento.objects.bulk_create([
+            Seguimiento(mascota=mascota, veterinario=veterinario, fecha_revision=fecha,
+                        hora_revision=hora, motivo=motivo, observaciones=observaciones,
+                        serie=serie)
+            for fecha in fechas
+        ])
+        aplicar_diferencia(None, (mascota.refugio_id, {'seguimientos_pendientes': len(creados)}))
+    return creados
+
+
+def revisiones_abiertas(serie):
+    """Revisiones de la serie que todavía no se hicieron ni se cancelaron."""
+    return Seguimiento.objects.filter(serie=serie, estado__in=ESTADOS_SEGUIMIENTO_PENDIENTE)
+
+
+def editar_serie(serie, **cambios):
+    """
+    Aplica ``cambios`` (campos de :data:`CAMPOS_EDITABLES`) a las revisiones
+    abiertas de la serie con un solo ``UPDATE``. Si cambia el veterinario o la
+    hora se vuelve a validar la agenda. Devuelve la cantidad actualizada.
+    """
+    invalidos = set(cambios) - set(CAMPOS_EDITABLES)
+    if invalidos:
+        raise ValueError(f"Campos no editables en una serie: {', '.join(sorted(invalidos))}")
+
+    with transaction.atomic():
+        abiertas = revisiones_abiertas(serie)
+        if {'veterinario', 'hora_revision'} & set(cambios):
+            actual = abiertas.values('veterinario_id', 'hora_revision').first()
+            if actual is None:
+                return 0
+            veterinario = cambios.get('veterinario', actual['veterinario_id'])
+            if veterinario is not None and not isinstance(veterinario, Veterinario):
+                veterinario = Veterinario.objects.get(pk=veterinario)
+            hora = cambios.get('hora_revision', actual['hora_revision'])
+            bloquear_veterinario(veterinario)
+            fechas = sorted(abiertas.values_list('fecha_revision', flat=True))
+            conflictos = conflictos_serie(veterinario, fechas, hora, serie=serie)
+            if conflictos:
+                raise SerieNoDisponible(conflictos)
+        return abiertas.update(actualizado_en=timezone.now(), **cambios)
+
+
+def cancelar_serie(serie):
+    """Cancela las revisiones abiertas de la serie (un ``UPDATE``). Devuelve cuántas."""
+    with transaction.atomic():
+        abiertas = revisiones_abiertas(serie)
+        refugio_id = abiertas.values_list('mascota__refugio_id', flat=True).first()
+        canceladas = abiertas.update(estado='cancelado', actualizado_en=timezone.now())
+        if canceladas:
+            aplicar_diferencia(None, (refugio_id, {'seguimientos_pendientes': -canceladas}))
+    return canceladas
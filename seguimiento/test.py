@@ -1,11 +1,23 @@
 from django.test import TestCase, Client
 from django.contrib.auth.models import User
 from django.urls import reverse
-from datetime import date, time
+from unittest.mock import patch
+from io import StringIO
+from django.core import mail
+from django.core.management import call_command, CommandError
+from django.test import override_settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from datetime import date, datetime, time, timedelta
 
-from usuarios.models import Refugio, Veterinario, Adoptante
-from mascotas.models import Mascota
+from usuarios.models import Refugio, Veterinario, Adoptante, EstadisticasRefugio
+from mascotas.models import Mascota, SolicitudAdopcion
 from seguimiento.models import Seguimiento
+from seguimiento.agenda import Agenda, RevisionNoDisponible
+from seguimiento.forms import SeguimientoForm
+from seguimiento.calendario import token_calendario
+from seguimiento.recordatorios import enviar_recordatorios
+from seguimiento.series import SerieNoDisponible, crear_serie, editar_serie, expandir_serie
 
 
 # ===========================================================
@@ -186,3 +198,362 @@ def test_mis_seguimientos_view_adoptante(self):
     self.assertEqual(response.status_code, 200)
     self.assertTemplateUsed(response, 'usuarios/mis_seguimientos.html')
     self.assertContains(response, self.mascota.nombre)
+
+
+# ===========================================================
+# C. TESTS DE LA AGENDA DE VETERINARIOS
+# ===========================================================
+class AgendaVeterinarioTests(TestCase):
+    """Prueba la detección de superposiciones y la búsqueda de turnos libres."""
+
+    def setUp(self):
+        self.user_refugio = User.objects.create_user(username='refugio_agenda', password='12345')
+        self.refugio = Refugio.objects.create(
+            usuario=self.user_refugio, nombre='Refugio Agenda', direccion='Ruta 2',
+            telefono='021111222', email='agenda@test.com', es_refugio=True
+        )
+        self.vet = Veterinario.objects.create(nombre='Pablo', refugio=self.refugio)
+        self.mascota = Mascota.objects.create(nombre='Nube', especie='Perro', edad=1, refugio=self.refugio)
+        self.dia = date.today() + timedelta(days=1)
+        for hora in (time(8, 0), time(8, 30), time(10, 0)):
+            Seguimiento.objects.create(mascota=self.mascota, veterinario=self.vet,
+                                       fecha_revision=self.dia, hora_revision=hora)
+        # Las canceladas no ocupan la agenda
+        Seguimiento.objects.create(mascota=self.mascota, veterinario=self.vet, fecha_revision=self.dia,
+                                   hora_revision=time(9, 0), estado='cancelado')
+
+    def momento(self, hora, minuto=0):
+        return datetime.combine(self.dia, time(hora, minuto))
+
+    def test_conflictos(self):
+        agenda = Agenda.cargar(self.vet, self.dia, self.dia)
+        self.assertEqual(len(agenda), 3)
+        self.assertIsNotNone(agenda.conflicto(self.momento(8, 45)))
+        self.assertIsNotNone(agenda.conflicto(self.momento(9, 45)))
+        self.assertIsNone(agenda.conflicto(self.momento(9, 0)))
+        self.assertIsNone(agenda.conflicto(self.momento(10, 30)))
+
+    def test_huecos_libres_saltan_los_turnos(self):
+        agenda = Agenda.cargar(self.vet, self.dia, self.dia)
+        huecos = agenda.huecos_libres(3)
+        self.assertEqual(huecos, [self.momento(9, 0), self.momento(9, 30), self.momento(10, 30)])
+
+    def test_formulario_rechaza_horario_ocupado(self):
+        self.client.login(username='refugio_agenda', password='12345')
+        response = self.client.post(reverse('seguimiento:agendar_revision'), data={
+            'mascota': self.mascota.id, 'veterinario': self.vet.id,
+            'fecha_revision': self.dia.isoformat(), 'hora_revision': '08:15', 'estado': 'pendiente',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('hora_revision', response.context['form'].errors)
+        self.assertEqual(Seguimiento.objects.filter(hora_revision=time(8, 15)).count(), 0)
+
+    def test_guardar_revalida_la_agenda(self):
+        # Otra reserva ocupa el horario entre is_valid() y save()
+        form = SeguimientoForm(data={
+            'mascota': self.mascota.id, 'veterinario': self.vet.id,
+            'fecha_revision': self.dia.isoformat(), 'hora_revision': '11:00', 'estado': 'pendiente',
+        }, refugio=self.refugio)
+        self.assertTrue(form.is_valid(), form.errors)
+        Seguimiento.objects.create(mascota=self.mascota, veterinario=self.vet,
+                                   fecha_revision=self.dia, hora_revision=time(11, 0))
+
+        with self.assertRaises(RevisionNoDisponible):
+            form.save()
+        self.assertIn('hora_revision', form.errors)
+        self.assertEqual(Seguimiento.objects.filter(hora_revision=time(11, 0)).count(), 1)
+
+    def test_api_huecos(self):
+        self.client.login(username='refugio_agenda', password='12345')
+        response = self.client.get(
+            reverse('seguimiento:huecos_veterinario', args=[self.vet.pk]),
+            {'desde': f'{self.dia.isoformat()}T08:00', 'cantidad': 2}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([h['hora'] for h in response.json()['huecos']], ['09:00', '09:30'])
+
+    def test_api_huecos_con_zona_horaria(self):
+        # Un 'desde' con offset se pasa a la hora local en lugar de dar un 500
+        self.client.login(username='refugio_agenda', password='12345')
+        response = self.client.get(
+            reverse('seguimiento:huecos_veterinario', args=[self.vet.pk]),
+            {'desde': f'{self.dia.isoformat()}T08:00Z', 'cantidad': 2}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([h['hora'] for h in response.json()['huecos']], ['09:00', '09:30'])
+
+
+# ===========================================================
+# D. TESTS DE SERIES DE REVISIONES
+# ===========================================================
+class SerieSeguimientoTests(TestCase):
+    """Prueba la creación, edición y cancelación de series de revisiones."""
+
+    def setUp(self):
+        self.user_refugio = User.objects.create_user(username='refugio_serie', password='12345')
+        self.refugio = Refugio.objects.create(
+            usuario=self.user_refugio, nombre='Refugio Series', direccion='Ruta 3',
+            telefono='021333444', email='series@test.com', es_refugio=True
+        )
+        self.vet = Veterinario.objects.create(nombre='Sara', refugio=self.refugio)
+        self.mascota = Mascota.objects.create(nombre='Toto', especie='Perro', edad=2, refugio=self.refugio)
+        self.client.login(username='refugio_serie', password='12345')
+
+    def test_expandir_serie_ajusta_fin_de_mes(self):
+        self.assertEqual(expandir_serie(date(2030, 1, 31), (1, 3, 12)),
+                         [date(2030, 2, 28), date(2030, 4, 30), date(2031, 1, 31)])
+
+    def test_crear_serie_con_un_bulk_create(self):
+        with CaptureQueriesContext(connection) as consultas:
+            creados = crear_serie(self.mascota, date(2030, 1, 10), veterinario=self.vet, hora=time(9, 0))
+        inserts = [c['sql'] for c in consultas if c['sql'].startswith('INSERT INTO "seguimiento_seguimiento"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(len(creados), 4)
+        self.assertEqual(Seguimiento.objects.filter(serie=creados[0].serie).count(), 4)
+        self.assertEqual(EstadisticasRefugio.objects.get(refugio=self.refugio).seguimientos_pendientes, 4)
+
+    def test_serie_rechaza_horario_ocupado(self):
+        Seguimiento.objects.create(mascota=self.mascota, veterinario=self.vet,
+                                   fecha_revision=date(2030, 4, 10), hora_revision=time(9, 15))
+        with self.assertRaises(SerieNoDisponible) as contexto:
+            crear_serie(self.mascota, date(2030, 1, 10), veterinario=self.vet, hora=time(9, 0))
+        self.assertEqual(contexto.exception.conflictos, [date(2030, 4, 10)])
+        self.assertEqual(Seguimiento.objects.count(), 1)
+
+    def test_vista_agendar_serie(self):
+        response = self.client.post(reverse('seguimiento:agendar_serie'), data={
+            'mascota': self.mascota.pk, 'veterinario': self.vet.pk, 'fecha_base': '2030-01-10',
+            'hora_revision': '10:00', 'meses': '1, 6', 'motivo': 'Control',
+        })
+        self.assertRedirects(response, reverse('seguimiento:listar_seguimientos'))
+        self.assertEqual(sorted(Seguimiento.objects.values_list('fecha_revision', flat=True)),
+                         [date(2030, 2, 10), date(2030, 7, 10)])
+
+    def test_editar_y_cancelar_la_serie(self):
+        creados = crear_serie(self.mascota, date(2030, 1, 10), veterinario=self.vet, hora=time(9, 0))
+        serie = creados[0].serie
+        Seguimiento.objects.filter(pk=creados[0].pk).update(estado='finalizado')
+
+        self.assertEqual(editar_serie(serie, hora_revision=time(11, 0)), 3)
+        self.assertEqual(Seguimiento.objects.get(pk=creados[0].pk).hora_revision, time(9, 0))
+
+        response = self.client.post(reverse('seguimiento:cancelar_serie', args=[serie]))
+        self.assertRedirects(response, reverse('seguimiento:listar_seguimientos'))
+        self.assertEqual(Seguimiento.objects.filter(serie=serie, estado='cancelado').count(), 3)
+        self.assertEqual(Seguimiento.objects.get(pk=creados[0].pk).estado, 'finalizado')
+
+    def test_vista_editar_serie_solo_aplica_lo_cambiado(self):
+        creados = crear_serie(self.mascota, date(2030, 1, 10), meses=(1, 3),
+                              veterinario=self.vet, hora=time(9, 0), motivo='Control')
+        Seguimiento.objects.filter(pk=creados[1].pk).update(motivo='Vacuna')
+
+        # El formulario llega con los valores iniciales salvo la hora
+        response = self.client.post(reverse('seguimiento:editar_serie', args=[creados[0].serie]), data={
+            'veterinario': self.vet.pk, 'hora_revision': '11:00', 'motivo': 'Control',
+        })
+
+        self.assertRedirects(response, reverse('seguimiento:listar_seguimientos'))
+        revisiones = Seguimiento.objects.order_by('fecha_revision').values_list('hora_revision', 'motivo')
+        self.assertEqual(list(revisiones), [(time(11, 0), 'Control'), (time(11, 0), 'Vacuna')])
+
+
+# ===========================================================
+# E. TESTS DEL LISTADO POR REFUGIO
+# ===========================================================
+class ListadoSeguimientosRefugioTests(TestCase):
+    """Prueba el alcance por refugio, los filtros y la paginación por cursor."""
+
+    def setUp(self):
+        self.user_refugio = User.objects.create_user(username='refugio_lista', password='12345')
+        self.refugio = Refugio.objects.create(
+            usuario=self.user_refugio, nombre='Refugio Lista', direccion='Ruta 4',
+            telefono='021555666', email='lista@test.com', es_refugio=True
+        )
+        otro_user = User.objects.create_user(username='refugio_otro', password='12345')
+        otro = Refugio.objects.create(
+            usuario=otro_user, nombre='Refugio Otro', direccion='Ruta 5',
+            telefono='021777888', email='otro@test.com', es_refugio=True
+        )
+        mascota = Mascota.objects.create(nombre='Pipa', especie='Gato', edad=1, refugio=self.refugio)
+        ajena = Mascota.objects.create(nombre='Ajena', especie='Gato', edad=1, refugio=otro)
+        self.dia = date(2030, 5, 10)
+        self.sin_hora = Seguimiento.objects.create(mascota=mascota, fecha_revision=self.dia)
+        self.tarde = Seguimiento.objects.create(mascota=mascota, fecha_revision=self.dia,
+                                                hora_revision=time(16, 0), estado='finalizado')
+        self.manana = Seguimiento.objects.create(mascota=mascota, fecha_revision=self.dia,
+                                                 hora_revision=time(9, 0))
+        self.anterior = Seguimiento.objects.create(mascota=mascota, fecha_revision=date(2030, 5, 1),
+                                                   hora_revision=time(9, 0))
+        Seguimiento.objects.create(mascota=ajena, fecha_revision=self.dia, hora_revision=time(10, 0))
+        self.client.login(username='refugio_lista', password='12345')
+
+    def ids(self, response):
+        return [s.pk for s in response.context['seguimientos']]
+
+    def test_solo_el_refugio_y_en_orden(self):
+        response = self.client.get(reverse('seguimiento:listar_seguimientos'))
+        self.assertEqual(self.ids(response),
+                         [self.sin_hora.pk, self.tarde.pk, self.manana.pk, self.anterior.pk])
+        self.assertNotContains(response, 'Ajena')
+
+    def test_paginacion_por_cursor_conserva_filtros(self):
+        url = reverse('seguimiento:listar_seguimientos')
+        with patch('seguimiento.views.SEGUIMIENTOS_POR_PAGINA', 1):
+            primera = self.client.get(url, {'desde': '2030-05-05', 'estado': 'pendiente'})
+            self.assertEqual(self.ids(primera), [self.sin_hora.pk])
+            cursor = primera.context['pagina'].cursor_siguiente
+            segunda = self.client.get(url, {'cursor': cursor})
+        self.assertEqual(self.ids(segunda), [self.manana.pk])
+        self.assertFalse(segunda.context['pagina'].hay_siguiente)
+
+    def test_adoptante_no_accede(self):
+        User.objects.create_user(username='curioso', password='12345')
+        self.client.login(username='curioso', password='12345')
+        response = self.client.get(reverse('seguimiento:listar_seguimientos'))
+        self.assertEqual(response.status_code, 302)
+
+
+# ===========================================================
+# F. TESTS DE RECORDATORIOS POR EMAIL
+# ===========================================================
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class RecordatoriosTests(TestCase):
+    """Prueba el envío por lotes y que volver a ejecutar no repita avisos."""
+
+    def setUp(self):
+        user = User.objects.create_user(username='refugio_aviso', password='12345')
+        refugio = Refugio.objects.create(
+            usuario=user, nombre='Refugio Avisos', direccion='Ruta 6',
+            telefono='021999000', email='avisos@test.com', es_refugio=True
+        )
+        vet = Veterinario.objects.create(nombre='Iris', email='iris@vet.com', refugio=refugio)
+        mascota = Mascota.objects.create(nombre='Milo', especie='Perro', edad=3, refugio=refugio)
+        SolicitudAdopcion.objects.create(
+            mascota=mascota, nombre_adoptante='Ana', apellido_adoptante='Paz', telefono='1',
+            email='ana@adopta.com', direccion='X', estado='aprobada',
+        )
+        self.manana = date.today() + timedelta(days=1)
+        for hora in (time(9, 0), time(11, 0)):
+            Seguimiento.objects.create(mascota=mascota, veterinario=vet,
+                                       fecha_revision=self.manana, hora_revision=hora)
+        # No se avisa de las canceladas ni de otros días
+        Seguimiento.objects.create(mascota=mascota, veterinario=vet, fecha_revision=self.manana,
+                                   estado='cancelado')
+        Seguimiento.objects.create(mascota=mascota, veterinario=vet,
+                                   fecha_revision=self.manana + timedelta(days=1))
+
+    def test_envia_a_veterinario_y_adoptante_una_sola_vez(self):
+        call_command('enviar_recordatorios', lote=3, stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 4)
+        self.assertEqual(sorted({m.to[0] for m in mail.outbox}), ['ana@adopta.com', 'iris@vet.com'])
+        self.assertIn('Milo', mail.outbox[0].subject)
+        self.assertFalse(Seguimiento.objects.filter(fecha_revision=self.manana, estado='pendiente',
+                                                    recordatorio_adoptante_en__isnull=True).exists())
+
+        call_command('enviar_recordatorios', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 4)
+
+    def test_una_sola_conexion(self):
+        with patch('django.core.mail.backends.locmem.EmailBackend.open') as abrir:
+            enviados, fallidos = enviar_recordatorios(self.manana, lote=1)
+        self.assertEqual((enviados, fallidos), (4, 0))
+        self.assertEqual(abrir.call_count, 1)
+
+    def test_lote_fallido_no_se_marca(self):
+        with patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError):
+            enviados, fallidos = enviar_recordatorios(self.manana)
+        self.assertEqual((enviados, fallidos), (0, 4))
+        self.assertEqual(enviar_recordatorios(self.manana), (4, 0))
+
+    def test_sin_reconexion_el_resto_cuenta_como_fallido(self):
+        backend = 'django.core.mail.backends.locmem.EmailBackend'
+        # La primera apertura funciona; después del lote fallido ya no se puede reabrir
+        with patch(f'{backend}.send_messages', side_effect=OSError), \
+                patch(f'{backend}.open', side_effect=[None, OSError]):
+            enviados, fallidos = enviar_recordatorios(self.manana, lote=1)
+        self.assertEqual((enviados, fallidos), (0, 4))
+
+    def test_lote_invalido(self):
+        with self.assertRaises(CommandError):
+            call_command('enviar_recordatorios', lote=0, stdout=StringIO())
+
+
+# ===========================================================
+# G. TESTS DEL CALENDARIO ICS
+# ===========================================================
+class CalendarioIcsTests(TestCase):
+    """Prueba el contenido del feed, el alcance y las respuestas 304."""
+
+    def setUp(self):
+        user = User.objects.create_user(username='refugio_ics', password='12345')
+        self.refugio = Refugio.objects.create(
+            usuario=user, nombre='Refugio Ics', direccion='Ruta 7, Luque',
+            telefono='021111222', email='ics@test.com', es_refugio=True
+        )
+        self.vet = Veterinario.objects.create(nombre='Olga', apellido='Ruiz', refugio=self.refugio)
+        mascota = Mascota.objects.create(nombre='Toby', especie='Perro', edad=2, refugio=self.refugio)
+        manana = date.today() + timedelta(days=1)
+        self.con_hora = Seguimiento.objects.create(mascota=mascota, veterinario=self.vet,
+                                                   fecha_revision=manana, hora_revision=time(10, 0),
+                                                   motivo='Control; vacunas')
+        Seguimiento.objects.create(mascota=mascota, fecha_revision=manana, estado='cancelado')
+        otro_user = User.objects.create_user(username='refugio_ics2', password='12345')
+        otro = Refugio.objects.create(
+            usuario=otro_user, nombre='Otro Ics', direccion='Ruta 8',
+            telefono='021333444', email='ics2@test.com', es_refugio=True
+        )
+        ajena = Mascota.objects.create(nombre='Ajena', especie='Gato', edad=1, refugio=otro)
+        Seguimiento.objects.create(mascota=ajena, fecha_revision=manana)
+        self.url = reverse('seguimiento:calendario_ics', args=[token_calendario('refugio', self.refugio.pk)])
+
+    def test_feed_del_refugio(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/calendar'))
+        contenido = b''.join(response.streaming_content).decode()
+        self.assertEqual(contenido.count('BEGIN:VEVENT'), 2)
+        self.assertIn(f'UID:seguimiento-{self.con_hora.pk}@sistema-adopcion', contenido)
+        self.assertIn(r'Control\; vacunas', contenido)
+        self.assertIn('STATUS:CANCELLED', contenido)
+        self.assertNotIn('Ajena', contenido)
+        self.assertTrue(contenido.endswith('END:VCALENDAR\r\n'))
+
+    def test_feed_del_veterinario(self):
+        url = reverse('seguimiento:calendario_ics', args=[token_calendario('veterinario', self.vet.pk)])
+        contenido = b''.join(self.client.get(url).streaming_content).decode()
+        self.assertEqual(contenido.count('BEGIN:VEVENT'), 1)
+
+    def test_no_modificado_con_una_consulta(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # Un cambio en una revisión del feed cambia la versión
+        self.con_hora.motivo = 'Otro motivo'
+        self.con_hora.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Otro motivo', b''.join(response.streaming_content).decode())
+
+    def test_cambiar_datos_relacionados_cambia_la_version(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertNotIn('Last-Modified', response)
+
+        self.vet.apellido = 'Ruiz Díaz'
+        self.vet.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Ruiz Díaz', b''.join(response.streaming_content).decode())
+
+        etag = response['ETag']
+        self.refugio.direccion = 'Ruta 9, Luque'
+        self.refugio.save(update_fields=['direccion'])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(r'Ruta 9\, Luque', b''.join(response.streaming_content).decode())
+
+    def test_token_invalido(self):
+        url = reverse('seguimiento:calendario_ics', args=['no-es-un-token'])
+        self.assertEqual(self.client.get(url).status_code, 404)
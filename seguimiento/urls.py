@@ -5,6 +5,9 @@ app_name = 'seguimiento'
 
 urlpatterns = [
     path('agendar/', views.agendar_revision, name='agendar_revision'),
+    path('series/agendar/', views.agendar_serie, name='agendar_serie'),
+    path('series/<uuid:serie>/editar/', views.editar_serie_view, name='editar_serie'),
+    path('series/<uuid:serie>/cancelar/', views.cancelar_serie_view, name='cancelar_serie'),
     path('editar/<int:pk>/', views.editar_seguimiento, name='editar_seguimiento'),
     path('detalle/<int:pk>/', views.detalle_seguimiento, name='detalle_seguimiento'),
     path('registrar/', views.registrar_seguimiento, name='registrar_seguimiento'),
@@ -13,5 +16,7 @@ urlpatterns = [
     path('veterinarios/agregar/', views.agregar_veterinario_refugio, name='agregar_veterinario_refugio'),
     path('veterinarios/editar/<int:pk>/', views.editar_veterinario_refugio, name='editar_veterinario_refugio'),
     path('veterinarios/eliminar/<int:pk>/', views.eliminar_veterinario_refugio, name='eliminar_veterinario_refugio'),
+    path('calendario/<str:token>.ics', views.calendario_ics, name='calendario_ics'),
+    path('veterinarios/<int:pk>/huecos/', views.huecos_veterinario, name='huecos_veterinario'),
     path('veterinarios/', views.lista_veterinarios_refugio, name='lista_veterinarios_refugio'),
 ]
\ No newline at end of file
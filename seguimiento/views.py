@@ -1,22 +1,29 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from .models import Seguimiento, Veterinario
-from .forms import SeguimientoForm
+from .forms import EditarSerieForm, SeguimientoForm, SerieSeguimientoForm
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth.decorators import login_required, user_passes_test
+from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from .models import Veterinario
 from .forms import VeterinarioForm
-from usuarios.models import Refugio
+from usuarios.roles import ROL_REFUGIO, refugio_requerido, rol_requerido
+from usuarios.paginacion import decodificar_cursor, paginar_keyset
+from datetime import date, datetime
+from django.db.models import F
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_http_methods
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from .agenda import RevisionNoDisponible, proximos_huecos
+from .calendario import contenido_calendario, leer_token, token_calendario, version_feed
+from .series import SerieNoDisponible, cancelar_serie, crear_serie, editar_serie, revisiones_abiertas
 
-def listar_seguimientos(request):
-    seguimientos = Seguimiento.objects.select_related('mascota','veterinario').order_by('-fecha_revision','-hora_revision')
-    return render(request, 'seguimiento/listar_seguimientos.html', {'seguimientos': seguimientos})
 
 def agendar_revision(request):
     if request.method == 'POST':
         form = SeguimientoForm(request.POST)
-        if form.is_valid():
-            form.save()
+        if form.is_valid() and _guardar_revision(form):
             return redirect('seguimiento:listar_seguimientos')
     else:
         form = SeguimientoForm()
@@ -26,13 +33,20 @@ def editar_seguimiento(request, pk):
     seguimiento = get_object_or_404(Seguimiento, pk=pk)
     if request.method == 'POST':
         form = SeguimientoForm(request.POST, instance=seguimiento)
-        if form.is_valid():
-            form.save()
+        if form.is_valid() and _guardar_revision(form):
             return redirect('seguimiento:listar_seguimientos')
     else:
         form = SeguimientoForm(instance=seguimiento)
     return render(request, 'seguimiento/editar_seguimiento.html', {'form': form, 'seguimiento': seguimiento})
 
+def _guardar_revision(form):
+    """Guarda el ``SeguimientoForm``; False si el horario se ocupó (el error queda en el form)."""
+    try:
+        form.save()
+    except RevisionNoDisponible:
+        return False
+    return True
+
 def detalle_seguimiento(request, pk):
     seguimiento = get_object_or_404(Seguimiento, pk=pk)
     return render(request, 'seguimiento/detalle_seguimiento.html', {'seguimiento': seguimiento})
@@ -40,40 +54,93 @@ def detalle_seguimiento(request, pk):
 def registrar_seguimiento(request):
     if request.method == 'POST':
         form = SeguimientoForm(request.POST)
-        if form.is_valid():
-            form.save()
+        if form.is_valid() and _guardar_revision(form):
             return redirect('listar_seguimientos')
     else:
         form = SeguimientoForm()
     return render(request, 'seguimiento/registrar.html', {'form': form})
 
 def listar_veterinarios_refugio(request):
-    refugio = request.user.refugio
+    refugio = request.profile
     veterinarios = Veterinario.objects.filter(refugio=refugio)
     return render(request, 'seguimiento/listar_veterinarios_refugio.html', {'veterinarios': veterinarios})
 
 
-def es_refugio(user):
-    if user.is_authenticated:
-        try:
-            return user.refugio.es_refugio
-        except Refugio.DoesNotExist:
-            return False
-        except AttributeError:
-            return False
-    return False
+# Sobre las columnas reales y con los NULL donde los deja el índice btree (al
+# recorrerlo hacia atrás, las revisiones sin hora quedan primero en su día)
+ORDEN_SEGUIMIENTOS = ('-fecha_revision', F('hora_revision').desc(nulls_first=True), '-id')
+SEGUIMIENTOS_POR_PAGINA = 50
+FILTROS_SEGUIMIENTOS = ('desde', 'hasta', 'estado')
+
+
+def _fecha_filtro(valor):
+    try:
+        return date.fromisoformat(valor) if valor else None
+    except ValueError:
+        return None
+
+
+@login_required
+@rol_requerido(ROL_REFUGIO, permitir_staff=True)
+def listar_seguimientos(request):
+    """
+    Revisiones de las mascotas del refugio logueado (el staff ve todas), por
+    fecha y hora, con paginación por cursor y filtros de rango de fechas y
+    estado.
+
+    El filtro por refugio pasa por el JOIN con la mascota, así que ningún
+    índice da el orden de todo el refugio: las filas se buscan mascota por
+    mascota en ``seguimiento_mascota_orden_idx`` (o en
+    ``seguimiento_mascota_estado_idx`` si se filtra por estado), con el rango
+    de fechas y la posición del cursor como condición del índice, y después
+    se ordenan solo esas filas para cortar la página. El costo depende de las
+    revisiones del refugio en el rango pedido, no del tamaño de la tabla.
+    """
+    # Si llega un cursor válido, los filtros salen de él (así se conservan al paginar)
+    cursor = decodificar_cursor(request.GET.get('cursor'))
+    if cursor:
+        filtros = {k: str(cursor['filtros'].get(k, '')) for k in FILTROS_SEGUIMIENTOS}
+    else:
+        filtros = {k: request.GET.get(k, '').strip() for k in FILTROS_SEGUIMIENTOS}
+
+    seguimientos = Seguimiento.objects.select_related('mascota', 'veterinario')
+    es_refugio = request.role == ROL_REFUGIO
+    if es_refugio:
+        seguimientos = seguimientos.filter(mascota__refugio=request.profile)
+    desde = _fecha_filtro(filtros['desde'])
+    hasta = _fecha_filtro(filtros['hasta'])
+    if desde:
+        seguimientos = seguimientos.filter(fecha_revision__gte=desde)
+    if hasta:
+        seguimientos = seguimientos.filter(fecha_revision__lte=hasta)
+    if filtros['estado'] in dict(Seguimiento.ESTADOS):
+        seguimientos = seguimientos.filter(estado=filtros['estado'])
+
+    pagina = paginar_keyset(seguimientos, ORDEN_SEGUIMIENTOS, cursor,
+                            por_pagina=SEGUIMIENTOS_POR_PAGINA, filtros=filtros)
+    return render(request, 'seguimiento/listar_seguimientos.html', {
+        'seguimientos': pagina.objetos,
+        'pagina': pagina,
+        'filtros': filtros,
+        'estados': Seguimiento.ESTADOS,
+        'es_primera_pagina': cursor is None,
+        'token_calendario': token_calendario('refugio', request.profile.pk) if es_refugio else None,
+    })
+
 
 @login_required
-@user_passes_test(es_refugio)
+@refugio_requerido
 def lista_veterinarios_refugio(request):
-    refugio_usuario = request.user.refugio
-    veterinarios = Veterinario.objects.filter(refugio=refugio_usuario)
+    refugio_usuario = request.profile
+    veterinarios = list(Veterinario.objects.filter(refugio=refugio_usuario))
+    for veterinario in veterinarios:
+        veterinario.token_calendario = token_calendario('veterinario', veterinario.pk)
     return render(request, 'seguimiento/lista_veterinarios.html', {'veterinarios': veterinarios, 'refugio': refugio_usuario})
 
 @login_required
-@user_passes_test(es_refugio)
+@refugio_requerido
 def agregar_veterinario_refugio(request):
-    refugio_usuario = request.user.refugio
+    refugio_usuario = request.profile
     if request.method == 'POST':
         form = VeterinarioForm(request.POST)
         if form.is_valid():
@@ -87,9 +154,9 @@ def agregar_veterinario_refugio(request):
     return render(request, 'seguimiento/agregar_veterinario.html', {'form': form})
 
 @login_required
-@user_passes_test(es_refugio)
+@refugio_requerido
 def editar_veterinario_refugio(request, pk):
-    refugio_usuario = request.user.refugio
+    refugio_usuario = request.profile
     veterinario = get_object_or_404(Veterinario, pk=pk, refugio=refugio_usuario)
     if request.method == 'POST':
         form = VeterinarioForm(request.POST, instance=veterinario)
@@ -102,9 +169,9 @@ def editar_veterinario_refugio(request, pk):
     return render(request, 'seguimiento/editar_veterinario.html', {'form': form, 'veterinario': veterinario})
 
 @login_required
-@user_passes_test(es_refugio)
+@refugio_requerido
 def eliminar_veterinario_refugio(request, pk):
-    refugio_usuario = request.user.refugio
+    refugio_usuario = request.profile
     veterinario = get_object_or_404(Veterinario, pk=pk, refugio=refugio_usuario)
     nombre = veterinario.nombre
     veterinario.delete()
@@ -112,13 +179,12 @@ def eliminar_veterinario_refugio(request, pk):
     return redirect('seguimiento:lista_veterinarios_refugio')
 
 @login_required
-@user_passes_test(es_refugio)
+@refugio_requerido
 def agendar_revision(request):
-    refugio = request.user.refugio
+    refugio = request.profile
     if request.method == 'POST':
         form = SeguimientoForm(request.POST, refugio=refugio)
-        if form.is_valid():
-            form.save()
+        if form.is_valid() and _guardar_revision(form):
             return redirect('seguimiento:listar_seguimientos')
     else:
         form = SeguimientoForm(refugio=refugio)
@@ -126,4 +192,119 @@ def agendar_revision(request):
     return render(request, 'seguimiento/agendar_revision.html', {'form': form})
 
 
+@login_required
+@refugio_requerido
+def huecos_veterinario(request, pk):
+    """
+    Próximos turnos libres de un veterinario del refugio, en JSON, para el
+    formulario de agendar. Parámetros: ``desde`` (AAAA-MM-DDTHH:MM, por
+    defecto ahora; si trae zona horaria se pasa a la hora local) y
+    ``cantidad`` (1 a 20, por defecto 5).
+    """
+    veterinario = get_object_or_404(Veterinario, pk=pk, refugio=request.profile)
+    try:
+        desde = datetime.fromisoformat(request.GET['desde']) if request.GET.get('desde') else None
+        cantidad = min(max(int(request.GET.get('cantidad', 5)), 1), 20)
+    except ValueError:
+        return JsonResponse({'error': 'Parámetros inválidos.'}, status=400)
+    if desde is not None and timezone.is_aware(desde):
+        # La agenda trabaja en hora local sin zona: se convierte y se quita el offset
+        desde = timezone.localtime(desde).replace(tzinfo=None)
+    if desde is None:
+        desde = timezone.localtime().replace(tzinfo=None, second=0, microsecond=0)
+
+    huecos = proximos_huecos(veterinario, desde, cantidad)
+    return JsonResponse({
+        'veterinario': veterinario.pk,
+        'huecos': [{'fecha': h.date().isoformat(), 'hora': h.strftime('%H:%M')} for h in huecos],
+    })
+
+
+@login_required
+@refugio_requerido
+def agendar_serie(request):
+    """Agenda de una vez todas las revisiones de una serie (p. ej. a 1, 3, 6 y 12 meses)."""
+    refugio = request.profile
+    form = SerieSeguimientoForm(request.POST or None, refugio=refugio)
+    if request.method == 'POST' and form.is_valid():
+        datos = form.cleaned_data
+        try:
+            creados = crear_serie(
+                datos['mascota'], datos['fecha_base'], datos['meses'],
+                veterinario=datos['veterinario'], hora=datos['hora_revision'],
+                motivo=datos['motivo'], observaciones=datos['observaciones'],
+            )
+        except SerieNoDisponible as error:
+            # Otra reserva ocupó el horario entre la validación y el guardado
+            form.add_error('hora_revision', str(error))
+        else:
+            messages.success(request, f"Se agendaron {len(creados)} revisiones para {datos['mascota'].nombre}.")
+            return redirect('seguimiento:listar_seguimientos')
+    return render(request, 'seguimiento/agendar_serie.html', {'form': form})
+
+
+def _serie_del_refugio(request, serie):
+    """Revisiones abiertas de la serie; 404 si no es del refugio logueado."""
+    abiertas = revisiones_abiertas(serie).filter(mascota__refugio=request.profile)
+    if not abiertas.exists():
+        raise Http404("La serie no existe o no tiene revisiones pendientes.")
+    return abiertas
+
+
+@login_required
+@refugio_requerido
+def editar_serie_view(request, serie):
+    abiertas = _serie_del_refugio(request, serie)
+    primera = abiertas.order_by('fecha_revision').first()
+    inicial = {'veterinario': primera.veterinario_id, 'hora_revision': primera.hora_revision,
+               'motivo': primera.motivo}
+    form = EditarSerieForm(request.POST or None, initial=inicial, refugio=request.profile)
+    if request.method == 'POST' and form.is_valid():
+        # Solo lo que el usuario cambió: el resto conserva el valor de cada revisión
+        cambios = {campo: form.cleaned_data[campo] for campo in form.changed_data}
+        try:
+            actualizadas = editar_serie(serie, **cambios) if cambios else 0
+        except SerieNoDisponible as error:
+            form.add_error('hora_revision', str(error))
+        else:
+            messages.success(request, f"Se actualizaron {actualizadas} revisiones de la serie.")
+            return redirect('seguimiento:listar_seguimientos')
+    return render(request, 'seguimiento/editar_serie.html', {
+        'form': form, 'serie': serie, 'revisiones': abiertas.select_related('mascota').order_by('fecha_revision'),
+    })
+
+
+@require_http_methods(["POST"])
+@login_required
+@refugio_requerido
+def cancelar_serie_view(request, serie):
+    _serie_del_refugio(request, serie)
+    canceladas = cancelar_serie(serie)
+    messages.success(request, f"Se cancelaron {canceladas} revisiones de la serie.")
+    return redirect('seguimiento:listar_seguimientos')
+
+
+@require_http_methods(["GET", "HEAD"])
+def calendario_ics(request, token):
+    """
+    Feed iCalendar de un refugio o de un veterinario (ver
+    ``seguimiento/calendario.py``). Sin sesión: el token firmado de la URL
+    identifica el feed. Responde 304 si el cliente ya tiene la versión actual.
+    """
+    feed = leer_token(token)
+    if feed is None:
+        raise Http404("Calendario inexistente.")
+    tipo, pk = feed
+    etag = quote_etag(version_feed(tipo, pk))
+
+    no_modificado = get_conditional_response(request, etag=etag)
+    if no_modificado is not None:
+        return no_modificado
 
+    response = StreamingHttpResponse(contenido_calendario(tipo, pk, etag.strip('"')),
+                                     content_type='text/calendar; charset=utf-8')
+    response['ETag'] = etag
+    # Que el cliente vuelva a preguntar siempre: la respuesta habitual es un 304
+    response['Cache-Control'] = 'private, no-cache'
+    response['Content-Disposition'] = f'inline; filename="{tipo}-{pk}.ics"'
+    return response
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -37,10 +38,13 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'mascotas',
     'usuarios',
     'admin_panel',
     'seguimiento',
+    'tareas',
+    'almacenamiento',
 ]
 
 # Configuración de email (modo desarrollo: imprime correos en consola)
@@ -52,6 +56,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'usuarios.roles.RolMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -84,7 +89,8 @@ WSGI_APPLICATION = 'sistema_adopcion.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'sistema_adopcion',
+        # Se puede cambiar por entorno (los procesos de procesar_tareas heredan el entorno)
+        'NAME': os.environ.get('SISTEMA_ADOPCION_DB_NAME', 'sistema_adopcion'),
         'USER': 'postgres',
         'PASSWORD': '0908',
         'HOST': 'localhost',
@@ -93,6 +99,16 @@ DATABASES = {
 }
 
 
+# Caché (facetas del catálogo, estadísticas, etc.)
+# En producción con varios procesos conviene un backend compartido (Redis/Memcached)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sistema_adopcion',
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -142,10 +158,44 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Los archivos subidos se guardan por hash de contenido (sin duplicados)
+STORAGES = {
+    'default': {
+        'BACKEND': 'almacenamiento.storage.AlmacenamientoPorContenido',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
 LOGIN_REDIRECT_URL = 'usuarios:perfil'
 
 LOGOUT_REDIRECT_URL = 'usuarios:home'
 
-LOGIN_URL = 'usuarios:login'
\ No newline at end of file
+LOGIN_URL = 'usuarios:login'
+
+# Carga el usuario con su perfil (Refugio/Adoptante) en una sola consulta (ver usuarios/roles.py).
+# Es el único backend: con ModelBackend detrás, cada login fallido se autenticaba dos
+# veces (dos búsquedas y dos hashes). Las sesiones abiertas con ModelBackend se cierran
+# una vez y el usuario vuelve a iniciar sesión.
+AUTHENTICATION_BACKENDS = [
+    'usuarios.roles.BackendPerfiles',
+]
+
+# Cola de tareas en segundo plano (manage.py procesar_tareas).
+# En True las tareas se ejecutan en el momento, sin worker (útil en pruebas).
+TAREAS_EJECUTAR_EN_LINEA = False
+# Días que se conservan las tareas completadas o fallidas antes de que procesar_tareas las borre.
+TAREAS_RETENCION_DIAS = 7
+
+# Dashboard del admin: estimar totales con pg_class/pg_stats en vez de contar filas.
+DASHBOARD_ESTADISTICAS_ESTIMADAS = False
+
+# Antigüedad (días) a partir de la cual manage.py archivar_cerrados mueve
+# solicitudes y seguimientos cerrados a las tablas de archivo.
+ARCHIVO_ANTIGUEDAD_DIAS = 365
+
+# Duración (minutos) de cada revisión en la agenda de los veterinarios.
+SEGUIMIENTO_DURACION_MINUTOS = 30
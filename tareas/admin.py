@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import Tarea
+
+
+@admin.register(Tarea)
+class TareaAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tipo', 'objeto_id', 'estado', 'intentos', 'disponible_en', 'actualizada_en')
+    list_filter = ('estado', 'tipo')
+    search_fields = ('tipo', 'ultimo_error')
@@ -0,0 +1,121 @@
+# tareas/cola.py
+"""
+Cola de trabajos respaldada por la tabla ``Tarea``.
+
+Las vistas llaman a :func:`encolar` y responden enseguida; el comando
+``procesar_tareas`` toma lotes con ``SELECT ... FOR UPDATE SKIP LOCKED`` (así
+varios workers pueden convivir sin pisarse) y ejecuta cada tarea en un pool
+de procesos.
+
+Las tareas completadas o fallidas solo sirven para revisar errores: al
+arrancar, ``procesar_tareas`` borra las que tienen más de
+``TAREAS_RETENCION_DIAS`` días (:func:`purgar_terminadas`).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Tarea
+
+# tipo de tarea -> función que recibe el id del objeto
+TAREAS = {
+    'variantes_mascota': 'mascotas.imagenes.procesar_variantes_mascota',
+    'miniatura_perfil': 'usuarios.imagenes.procesar_miniatura_perfil',
+}
+
+# Espera antes de reintentar: ESPERA_BASE * 2 ** (intentos - 1), con tope
+ESPERA_BASE = timedelta(seconds=30)
+ESPERA_MAXIMA = timedelta(hours=1)
+
+
+def ejecutar(tipo, objeto_id):
+    """Ejecuta directamente la función asociada al tipo de tarea."""
+    return import_string(TAREAS[tipo])(objeto_id)
+
+
+def encolar(tipo, objeto_id):
+    """
+    Agrega una tarea pendiente. Si ya había una pendiente para el mismo
+    objeto no se duplica (índice único parcial + ON CONFLICT DO NOTHING).
+
+    Con ``TAREAS_EJECUTAR_EN_LINEA = True`` (pruebas, desarrollo) se ejecuta
+    en el momento, sin pasar por la cola.
+    """
+    if tipo not in TAREAS:
+        raise ValueError(f"Tipo de tarea desconocido: {tipo}")
+    if getattr(settings, 'TAREAS_EJECUTAR_EN_LINEA', False):
+        ejecutar(tipo, objeto_id)
+        return
+    Tarea.objects.bulk_create([Tarea(tipo=tipo, objeto_id=objeto_id)], ignore_conflicts=True)
+
+
+def tomar_lote(cantidad):
+    """Marca como 'en_proceso' hasta ``cantidad`` tareas listas y las devuelve."""
+    with transaction.atomic():
+        tareas = list(
+            Tarea.objects
+            .select_for_update(skip_locked=True)
+            .filter(estado='pendiente', disponible_en__lte=timezone.now())
+            .order_by('disponible_en', 'id')[:cantidad]
+        )
+        if tareas:
+            Tarea.objects.filter(pk__in=[t.pk for t in tareas]).update(
+                estado='en_proceso', actualizada_en=timezone.now()
+            )
+    return tareas
+
+
+def marcar_completada(tarea):
+    Tarea.objects.filter(pk=tarea.pk).update(
+        estado='completada', intentos=tarea.intentos + 1,
+        ultimo_error='', actualizada_en=timezone.now(),
+    )
+
+
+def marcar_error(tarea, error):
+    """Reprograma la tarea con espera exponencial o la da por fallida."""
+    intentos = tarea.intentos + 1
+    cambios = {'intentos': intentos, 'ultimo_error': str(error)[:2000], 'actualizada_en': timezone.now()}
+    if intentos >= tarea.max_intentos:
+        cambios['estado'] = 'fallida'
+    else:
+        espera = min(ESPERA_BASE * 2 ** (intentos - 1), ESPERA_MAXIMA)
+        cambios['estado'] = 'pendiente'
+        cambios['disponible_en'] = timezone.now() + espera
+    try:
+        with transaction.atomic():
+            Tarea.objects.filter(pk=tarea.pk).update(**cambios)
+    except IntegrityError:
+        # Mientras tanto se encoló otra pendiente para el mismo objeto: esa hará el trabajo
+        Tarea.objects.filter(pk=tarea.pk).delete()
+
+
+def recuperar_colgadas(antiguedad=timedelta(minutes=15)):
+    """
+    Devuelve a 'pendiente' las tareas que quedaron 'en_proceso' por un worker
+    que se cortó. Se considera colgada si no se tocó en ``antiguedad``.
+    """
+    limite = timezone.now() - antiguedad
+    recuperadas = 0
+    for tarea in Tarea.objects.filter(estado='en_proceso', actualizada_en__lt=limite):
+        marcar_error(tarea, 'El worker se interrumpió durante la ejecución.')
+        recuperadas += 1
+    return recuperadas
+
+
+def purgar_terminadas(antiguedad, lote=1000):
+    """
+    Borra por lotes las tareas completadas o fallidas que no se tocan hace
+    más de ``antiguedad``. Devuelve cuántas borró.
+    """
+    limite = timezone.now() - antiguedad
+    terminadas = Tarea.objects.filter(estado__in=('completada', 'fallida'), actualizada_en__lt=limite)
+    borradas = 0
+    while True:
+        ids = list(terminadas.values_list('pk', flat=True)[:lote])
+        if not ids:
+            return borradas
+        borradas += Tarea.objects.filter(pk__in=ids).delete()[0]
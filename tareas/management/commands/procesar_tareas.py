@@ -0,0 +1,107 @@
+# tareas/management/commands/procesar_tareas.py
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from tareas.cola import (
+    ejecutar, marcar_completada, marcar_error, purgar_terminadas, recuperar_colgadas, tomar_lote,
+)
+# Lo que corre en los hijos vive en un módulo sin modelos: 'spawn' lo importa antes de django.setup()
+from tareas.proceso import ejecutar_en_proceso, inicializar_proceso
+
+# Un worker que queda corriendo vuelve a purgar como mucho una vez por hora
+INTERVALO_PURGA = 60 * 60
+
+
+class Command(BaseCommand):
+    help = (
+        "Consume la cola de tareas (procesamiento de imágenes, etc.) usando un "
+        "pool de procesos del tamaño de la cantidad de núcleos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1,
+                            help='Procesos del pool (por defecto, la cantidad de núcleos).')
+        parser.add_argument('--lote', type=int, default=None,
+                            help='Tareas tomadas por vuelta (por defecto, 2 por proceso).')
+        parser.add_argument('--espera', type=float, default=2.0,
+                            help='Segundos de espera cuando la cola está vacía.')
+        parser.add_argument('--una-vez', action='store_true',
+                            help='Vacía la cola una vez y termina (útil para cron o pruebas).')
+        parser.add_argument('--en-linea', action='store_true',
+                            help='Ejecuta las tareas en este mismo proceso, sin pool (depuración y pruebas).')
+        parser.add_argument('--retencion', type=int, default=None,
+                            help='Días que se conservan las tareas terminadas '
+                                 '(por defecto TAREAS_RETENCION_DIAS; 0 no borra nada).')
+
+    def handle(self, *args, **options):
+        procesos = max(1, options['procesos'])
+        lote = options['lote'] or procesos * 2
+
+        recuperadas = recuperar_colgadas()
+        if recuperadas:
+            self.stdout.write(f"{recuperadas} tareas colgadas vueltas a la cola.")
+
+        if options['retencion'] is None:
+            options['retencion'] = getattr(settings, 'TAREAS_RETENCION_DIAS', 7)
+        self._proxima_purga = 0
+        self._purgar(options)
+
+        if options['en_linea']:
+            self._procesar(None, lote, options)
+        else:
+            contexto = multiprocessing.get_context('spawn')
+            settings_module = os.environ.get('DJANGO_SETTINGS_MODULE', 'sistema_adopcion.settings')
+            self.stdout.write(f"Worker iniciado con {procesos} procesos.")
+            with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto,
+                                     initializer=inicializar_proceso,
+                                     initargs=(settings_module,)) as pool:
+                self._procesar(pool, lote, options)
+
+        self.stdout.write(self.style.SUCCESS("Cola vacía. Worker detenido."))
+
+    def _procesar(self, pool, lote, options):
+        while True:
+            close_old_connections()
+            tareas = tomar_lote(lote)
+            if not tareas:
+                if options['una_vez']:
+                    return
+                self._purgar(options)
+                time.sleep(options['espera'])
+                continue
+
+            if pool is None:
+                resultados = ((t, self._en_linea(t)) for t in tareas)
+            else:
+                futuros = {pool.submit(ejecutar_en_proceso, t.tipo, t.objeto_id): t for t in tareas}
+                resultados = ((futuros[f], f.exception()) for f in as_completed(futuros))
+
+            for tarea, error in resultados:
+                if error is None:
+                    marcar_completada(tarea)
+                else:
+                    marcar_error(tarea, error)
+                    self.stderr.write(f"{tarea}: {error}")
+
+    def _purgar(self, options):
+        """Borra las tareas terminadas más viejas que ``--retencion`` días."""
+        if options['retencion'] <= 0 or time.monotonic() < self._proxima_purga:
+            return
+        self._proxima_purga = time.monotonic() + INTERVALO_PURGA
+        borradas = purgar_terminadas(timedelta(days=options['retencion']))
+        if borradas:
+            self.stdout.write(f"{borradas} tareas terminadas borradas.")
+
+    def _en_linea(self, tarea):
+        try:
+            ejecutar(tarea.tipo, tarea.objeto_id)
+        except Exception as e:
+            return e
+        return None
@@ -0,0 +1,43 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Tarea(models.Model):
+    """
+    Trabajo en segundo plano guardado en la base de datos.
+    Lo consume el comando ``manage.py procesar_tareas``.
+    """
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('en_proceso', 'En proceso'),
+        ('completada', 'Completada'),
+        ('fallida', 'Fallida'),
+    ]
+
+    tipo = models.CharField(max_length=50)
+    objeto_id = models.PositiveBigIntegerField()
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente')
+    intentos = models.PositiveSmallIntegerField(default=0)
+    max_intentos = models.PositiveSmallIntegerField(default=5)
+    # No se toma antes de esta fecha (se usa para el reintento con espera)
+    disponible_en = models.DateTimeField(default=timezone.now)
+    ultimo_error = models.TextField(blank=True)
+    creada_en = models.DateTimeField(auto_now_add=True)
+    actualizada_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['estado', 'disponible_en'], name='tarea_estado_disponible_idx'),
+        ]
+        constraints = [
+            # Una sola tarea pendiente por objeto: encolar dos veces no duplica trabajo
+            models.UniqueConstraint(
+                fields=['tipo', 'objeto_id'],
+                condition=Q(estado='pendiente'),
+                name='tarea_pendiente_unica',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Tarea #{self.id} {self.tipo}({self.objeto_id}) - {self.estado}"
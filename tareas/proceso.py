@@ -0,0 +1,28 @@
+# tareas/proceso.py
+"""
+Funciones que corren dentro de los procesos del pool de ``procesar_tareas``.
+
+Con el contexto 'spawn' cada proceso arranca un intérprete nuevo e importa
+este módulo para deshacer el pickle de las funciones *antes* de que corra
+``django.setup()``. Por eso acá no se importan modelos a nivel de módulo:
+``tareas.cola`` se importa recién dentro de :func:`ejecutar_en_proceso`.
+"""
+import os
+
+import django
+
+
+def inicializar_proceso(settings_module):
+    """Setup de Django en el proceso hijo."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    django.setup()
+
+
+def ejecutar_en_proceso(tipo, objeto_id):
+    from django.db import connections
+    from tareas.cola import ejecutar
+
+    try:
+        ejecutar(tipo, objeto_id)
+    finally:
+        connections.close_all()
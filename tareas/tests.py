@@ -0,0 +1,106 @@
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+import os
+
+from usuarios.models import Refugio
+from mascotas.models import Mascota
+from .cola import encolar, tomar_lote, marcar_error, ESPERA_BASE
+from .models import Tarea
+
+
+# ========================================================================
+# PRUEBAS DE LA COLA DE TAREAS
+# ========================================================================
+
+class ColaTareasTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user(username='refugio_tareas', password='x')
+        self.refugio = Refugio.objects.create(usuario=user, nombre='Refugio Tareas', email='t@test.com')
+        self.mascota = Mascota.objects.create(nombre='Kira', especie='Perro', edad=1, refugio=self.refugio)
+
+    def test_encolar_no_duplica_pendientes(self):
+        encolar('variantes_mascota', self.mascota.pk)
+        encolar('variantes_mascota', self.mascota.pk)
+        self.assertEqual(Tarea.objects.filter(estado='pendiente').count(), 1)
+
+    def test_encolar_tipo_desconocido(self):
+        with self.assertRaises(ValueError):
+            encolar('no_existe', 1)
+
+    def test_tomar_lote_marca_en_proceso(self):
+        encolar('variantes_mascota', self.mascota.pk)
+        tareas = tomar_lote(10)
+        self.assertEqual(len(tareas), 1)
+        self.assertEqual(Tarea.objects.get().estado, 'en_proceso')
+        self.assertEqual(tomar_lote(10), [])
+
+    def test_error_reprograma_con_espera(self):
+        encolar('variantes_mascota', self.mascota.pk)
+        tarea = tomar_lote(1)[0]
+        antes = timezone.now()
+        marcar_error(tarea, 'falló')
+
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, 'pendiente')
+        self.assertEqual(tarea.intentos, 1)
+        self.assertGreaterEqual(tarea.disponible_en, antes + ESPERA_BASE)
+        # Todavía no está disponible
+        self.assertEqual(tomar_lote(1), [])
+
+    def test_error_en_el_ultimo_intento_la_da_por_fallida(self):
+        encolar('variantes_mascota', self.mascota.pk)
+        Tarea.objects.update(max_intentos=1)
+        tarea = tomar_lote(1)[0]
+        marcar_error(tarea, 'falló')
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, 'fallida')
+
+    @patch('mascotas.imagenes.generar_variantes')
+    def test_comando_procesa_la_cola(self, mock_generar):
+        encolar('variantes_mascota', self.mascota.pk)
+        call_command('procesar_tareas', en_linea=True, una_vez=True, stdout=StringIO())
+
+        mock_generar.assert_called_once()
+        self.assertEqual(Tarea.objects.get().estado, 'completada')
+
+    @override_settings(TAREAS_EJECUTAR_EN_LINEA=True)
+    @patch('mascotas.imagenes.generar_variantes')
+    def test_ejecucion_en_linea(self, mock_generar):
+        encolar('variantes_mascota', self.mascota.pk)
+        mock_generar.assert_called_once()
+        self.assertFalse(Tarea.objects.exists())
+
+    def test_purga_las_terminadas_viejas(self):
+        vieja = timezone.now() - timedelta(days=30)
+        Tarea.objects.bulk_create([
+            Tarea(tipo='variantes_mascota', objeto_id=1, estado='completada'),
+            Tarea(tipo='variantes_mascota', objeto_id=2, estado='fallida'),
+            Tarea(tipo='variantes_mascota', objeto_id=3, estado='completada'),
+            Tarea(tipo='variantes_mascota', objeto_id=4, estado='pendiente'),
+        ])
+        # auto_now no deja fijar la fecha en el alta
+        Tarea.objects.exclude(objeto_id=3).update(actualizada_en=vieja)
+
+        call_command('procesar_tareas', en_linea=True, una_vez=True, retencion=7, stdout=StringIO())
+
+        self.assertEqual(sorted(Tarea.objects.values_list('objeto_id', flat=True)), [3, 4])
+
+
+class PoolProcesosTests(TransactionTestCase):
+    """Corre el comando con el pool real ('spawn'): los hijos importan y configuran Django solos."""
+
+    def test_una_vez_con_el_pool(self):
+        # La mascota ya no existe: la tarea se completa sin generar nada
+        encolar('variantes_mascota', 999999)
+        # Los hijos heredan el entorno: así usan la base de pruebas y no la configurada
+        base_de_pruebas = connection.settings_dict['NAME']
+        with patch.dict(os.environ, {'SISTEMA_ADOPCION_DB_NAME': base_de_pruebas}):
+            call_command('procesar_tareas', una_vez=True, procesos=1, stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(Tarea.objects.get().estado, 'completada')
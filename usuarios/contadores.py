@@ -0,0 +1,224 @@
+# usuarios/contadores.py
+"""
+Mantenimiento incremental de ``EstadisticasRefugio``.
+
+Los modelos que suman a los contadores del panel (Mascota, SolicitudAdopcion y
+Seguimiento) heredan de :class:`ContadoresRefugioMixin` y definen
+``aporte_contadores(valores)``: a qué refugio y cuánto suma una fila con esos
+valores. Al guardar se resta el aporte anterior y se suma el nuevo con
+expresiones ``F()`` dentro de la misma transacción.
+
+Los borrados no usan ``post_delete``: un receptor por fila obliga a Django a
+cargar cada fila de las cascadas (sin borrado rápido) y a descontarlas de a
+una. ``delete()`` de la instancia recalcula una sola vez el refugio afectado
+(cascadas incluidas) y :func:`eliminar_y_recalcular` hace lo mismo para un
+QuerySet.
+
+Los cambios hechos con ``QuerySet.update()``, ``bulk_create()`` o
+``QuerySet.delete()`` no pasan por aquí: quien los haga debe llamar a
+:func:`recalcular_estadisticas`.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import EstadisticasRefugio, Refugio
+
+CAMPOS_CONTADORES = (
+    'mascotas_total',
+    'mascotas_disponibles',
+    'solicitudes_pendientes',
+    'solicitudes_aprobadas',
+    'solicitudes_rechazadas',
+    'seguimientos_pendientes',
+)
+
+# estado de SolicitudAdopcion -> contador
+CAMPO_SOLICITUD = {
+    'pendiente': 'solicitudes_pendientes',
+    'aprobada': 'solicitudes_aprobadas',
+    'rechazada': 'solicitudes_rechazadas',
+}
+
+# Estados de Seguimiento que cuentan como revisión por realizar
+ESTADOS_SEGUIMIENTO_PENDIENTE = ('pendiente', 'en_curso')
+
+
+def aplicar_diferencia(anterior, actual, crear=True):
+    """
+    Resta el aporte ``anterior`` y suma el ``actual`` (tuplas
+    ``(refugio_id, {contador: cantidad})`` o ``None``) con un UPDATE por
+    refugio afectado. Si el refugio todavía no tiene fila y ``crear`` es True,
+    se arma contando desde cero.
+    """
+    deltas = defaultdict(Counter)
+    for aporte, signo in ((anterior, -1), (actual, 1)):
+        if aporte is None:
+            continue
+        refugio_id, contadores = aporte
+        for campo, cantidad in contadores.items():
+            deltas[refugio_id][campo] += signo * cantidad
+
+    for refugio_id, cambios in deltas.items():
+        cambios = {campo: F(campo) + n for campo, n in cambios.items() if n}
+        if refugio_id is None or not cambios:
+            continue
+        actualizadas = EstadisticasRefugio.objects.filter(refugio_id=refugio_id).update(
+            actualizado_en=timezone.now(), **cambios
+        )
+        if not actualizadas and crear:
+            recalcular_estadisticas([refugio_id])
+
+
+class ContadoresRefugioMixin:
+    """
+    Mantiene ``EstadisticasRefugio`` al día en cada ``save()``.
+
+    Las subclases indican en ``CAMPOS_APORTE`` los campos de los que depende
+    su aporte y deben definir ``aporte_contadores(valores)``, donde
+    ``valores`` tiene esos campos por su ``attname`` (``refugio_id``,
+    ``mascota_id``...) y el resultado es ``(refugio_id, {contador: cantidad})``.
+    """
+    CAMPOS_APORTE = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Se recuerda lo cargado para calcular la diferencia sin releer la fila
+        instancia._valores_guardados = instancia._valores_aporte()
+        return instancia
+
+    def _attnames_aporte(self):
+        return [self._meta.get_field(nombre).attname for nombre in self.CAMPOS_APORTE]
+
+    def _valores_aporte(self):
+        """Valores actuales de los campos de aporte, o None si alguno está diferido."""
+        valores = {}
+        for attname in self._attnames_aporte():
+            if attname not in self.__dict__:
+                return None
+            valores[attname] = self.__dict__[attname]
+        return valores
+
+    def _aporte_previo(self):
+        if self._state.adding:
+            return None
+        valores = getattr(self, '_valores_guardados', None)
+        if valores is None:
+            valores = type(self)._base_manager.filter(pk=self.pk).values(*self._attnames_aporte()).first()
+            if valores is None:
+                return None
+        return self.aporte_contadores(valores)
+
+    def _refugio_de_mascota(self, mascota_id):
+        """Refugio de ``mascota_id``, usando la mascota ya cargada si coincide."""
+        if mascota_id is None:
+            return None
+        mascota = self._state.fields_cache.get('mascota')
+        if mascota is not None and mascota.pk == mascota_id:
+            return mascota.refugio_id
+        from mascotas.models import Mascota  # mascotas.models importa este módulo
+        return Mascota.objects.filter(pk=mascota_id).values_list('refugio_id', flat=True).first()
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not set(self.CAMPOS_APORTE).intersection(update_fields):
+            return super().save(*args, **kwargs)
+
+        diferidos = [nombre for nombre, attname in zip(self.CAMPOS_APORTE, self._attnames_aporte())
+                     if attname not in self.__dict__]
+        if diferidos:
+            # No se modificaron (siguen diferidos): se leen para conocer el aporte
+            self.refresh_from_db(fields=diferidos)
+
+        with transaction.atomic():
+            anterior = self._aporte_previo()
+            super().save(*args, **kwargs)
+            valores = self._valores_aporte()
+            aplicar_diferencia(anterior, self.aporte_contadores(valores))
+        self._valores_guardados = valores
+
+    def delete(self, *args, **kwargs):
+        """Borra la fila y recalcula una vez su refugio (las cascadas quedan en el mismo)."""
+        with transaction.atomic():
+            aporte = self._aporte_previo()
+            resultado = super().delete(*args, **kwargs)
+            if aporte is not None and aporte[0] is not None:
+                recalcular_estadisticas([aporte[0]])
+        return resultado
+
+
+def eliminar_y_recalcular(queryset, campo_refugio):
+    """
+    ``queryset.delete()`` y un único recálculo de los refugios afectados
+    (``campo_refugio`` es la ruta al refugio, p. ej. ``'mascota__refugio_id'``).
+    """
+    with transaction.atomic():
+        refugio_ids = set(queryset.order_by().values_list(campo_refugio, flat=True).distinct())
+        resultado = queryset.delete()
+        if refugio_ids:
+            recalcular_estadisticas(refugio_ids)
+    return resultado
+
+
+def recalcular_estadisticas(refugio_ids=None):
+    """
+    Recalcula desde cero los contadores de ``refugio_ids`` (o de todos los
+    refugios) con una consulta agrupada por tabla y un único upsert.
+    Devuelve la cantidad de refugios procesados.
+    """
+    from mascotas.models import Mascota, SolicitudAdopcion  # evita el import circular
+    from seguimiento.models import Seguimiento
+
+    refugios = Refugio.objects.all()
+    if refugio_ids is not None:
+        refugios = refugios.filter(pk__in=refugio_ids)
+    filas = {pk: EstadisticasRefugio(refugio_id=pk) for pk in refugios.values_list('pk', flat=True)}
+    if not filas:
+        return 0
+    ids = list(filas)
+
+    mascotas = (Mascota.objects
+                .filter(refugio_id__in=ids)
+                .order_by()
+                .values('refugio_id')
+                .annotate(total=Count('id'), disponibles=Count('id', filter=Q(adoptada=False))))
+    for fila in mascotas:
+        filas[fila['refugio_id']].mascotas_total = fila['total']
+        filas[fila['refugio_id']].mascotas_disponibles = fila['disponibles']
+
+    solicitudes = (SolicitudAdopcion.objects
+                   .filter(mascota__refugio_id__in=ids)
+                   .order_by()
+                   .values_list('mascota__refugio_id', 'estado')
+                   .annotate(total=Count('id')))
+    for refugio_id, estado, total in solicitudes:
+        if estado in CAMPO_SOLICITUD:
+            setattr(filas[refugio_id], CAMPO_SOLICITUD[estado], total)
+
+    seguimientos = (Seguimiento.objects
+                    .filter(mascota__refugio_id__in=ids, estado__in=ESTADOS_SEGUIMIENTO_PENDIENTE)
+                    .order_by()
+                    .values_list('mascota__refugio_id')
+                    .annotate(total=Count('id')))
+    for refugio_id, total in seguimientos:
+        filas[refugio_id].seguimientos_pendientes = total
+
+    EstadisticasRefugio.objects.bulk_create(
+        filas.values(),
+        update_conflicts=True,
+        unique_fields=['refugio'],
+        update_fields=CAMPOS_CONTADORES + ('actualizado_en',),
+    )
+    return len(filas)
+
+
+def obtener_estadisticas_refugio(refugio):
+    """Fila de contadores del refugio; si todavía no existe se calcula."""
+    try:
+        return EstadisticasRefugio.objects.get(refugio=refugio)
+    except EstadisticasRefugio.DoesNotExist:
+        recalcular_estadisticas([refugio.pk])
+        return EstadisticasRefugio.objects.get(refugio=refugio)
@@ -0,0 +1,136 @@
+# usuarios/datos_personales.py
+"""
+Exportación completa de los datos personales de un adoptante en un ZIP.
+
+El ZIP se arma de a poco con ``zipfile`` sobre un búfer que el generador
+vacía después de cada bloque, así que se envía con un ``StreamingHttpResponse``
+sin tener nunca el archivo entero en memoria. Las tablas se leen con
+``.iterator(chunk_size=...)`` y la foto de perfil se copia por trozos desde el
+storage.
+
+Contenido:
+
+- ``perfil.json``: datos de la cuenta y del perfil.
+- ``solicitudes.jsonl``: solicitudes de adopción enviadas.
+- ``mascotas_adoptadas.jsonl``: mascotas de las solicitudes aprobadas.
+- ``seguimientos.jsonl``: revisiones veterinarias de esas mascotas.
+- ``foto_perfil/<archivo>``: la foto original, si tiene.
+"""
+import io
+import json
+import os
+import zipfile
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from mascotas.models import Mascota, SolicitudAdopcion
+from seguimiento.models import Seguimiento
+
+TAMANO_LOTE = 500
+# Se entrega un bloque al cliente cada vez que el búfer supera este tamaño
+TAMANO_BLOQUE = 64 * 1024
+
+
+class BufferZip(io.RawIOBase):
+    """
+    Destino de ``zipfile`` que solo acumula lo escrito hasta que se lo vacía.
+    Informa la posición (``tell``) pero no permite ``seek``: así ``zipfile``
+    escribe en modo streaming, con descriptores de datos después de cada
+    archivo.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._partes = []
+        self._pendiente = 0
+        self._posicion = 0
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        datos = bytes(datos)
+        self._partes.append(datos)
+        self._pendiente += len(datos)
+        self._posicion += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self._posicion
+
+    @property
+    def pendiente(self):
+        return self._pendiente
+
+    def vaciar(self):
+        datos = b''.join(self._partes)
+        self._partes.clear()
+        self._pendiente = 0
+        return datos
+
+
+def _json(valor):
+    return json.dumps(valor, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+def datos_perfil(adoptante):
+    user = adoptante.user
+    return {
+        'usuario': user.username,
+        'nombre': user.first_name,
+        'apellido': user.last_name,
+        'cedula': adoptante.cedula,
+        'email': user.email,
+        'telefono': adoptante.telefono,
+        'direccion': adoptante.direccion,
+        'fecha_registro': adoptante.fecha_registro,
+        'ultimo_acceso': user.last_login,
+    }
+
+
+def _consultas(adoptante):
+    """(nombre del archivo, consulta de diccionarios) de cada tabla exportada."""
+    solicitudes = SolicitudAdopcion.objects.filter(adoptante=adoptante)
+    adoptadas = solicitudes.filter(estado='aprobada').values('mascota_id')
+    return [
+        ('solicitudes.jsonl', solicitudes.order_by('pk').values(
+            'id', 'mascota_id', 'mascota__nombre', 'nombre_adoptante', 'apellido_adoptante',
+            'telefono', 'email', 'direccion', 'fecha_solicitud', 'estado',
+        )),
+        ('mascotas_adoptadas.jsonl', Mascota.objects.filter(pk__in=adoptadas).order_by('pk').values(
+            'id', 'nombre', 'especie', 'raza', 'edad', 'sexo', 'descripcion',
+            'fecha_ingreso', 'refugio__nombre',
+        )),
+        ('seguimientos.jsonl', Seguimiento.objects.filter(mascota_id__in=adoptadas).order_by('pk').values(
+            'id', 'mascota_id', 'mascota__nombre', 'fecha_revision', 'hora_revision', 'motivo',
+            'observaciones', 'estado', 'veterinario__nombre', 'veterinario__apellido',
+        )),
+    ]
+
+
+def generar_zip(adoptante):
+    """Generador de los bytes del ZIP con todos los datos de ``adoptante``."""
+    salida = BufferZip()
+    with zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_DEFLATED) as archivo_zip:
+        archivo_zip.writestr('perfil.json', _json(datos_perfil(adoptante)))
+        yield salida.vaciar()
+
+        for nombre, consulta in _consultas(adoptante):
+            with archivo_zip.open(nombre, 'w') as destino:
+                for fila in consulta.iterator(chunk_size=TAMANO_LOTE):
+                    destino.write((_json(fila) + '\n').encode('utf-8'))
+                    if salida.pendiente >= TAMANO_BLOQUE:
+                        yield salida.vaciar()
+            yield salida.vaciar()
+
+        foto = adoptante.foto_perfil
+        if foto and foto.storage.exists(foto.name):
+            nombre = f'foto_perfil/{os.path.basename(foto.name)}'
+            with foto.storage.open(foto.name, 'rb') as origen, archivo_zip.open(nombre, 'w') as destino:
+                for trozo in origen.chunks():
+                    destino.write(trozo)
+                    if salida.pendiente >= TAMANO_BLOQUE:
+                        yield salida.vaciar()
+
+    # Al cerrarse el ZIP se escribe el directorio central
+    yield salida.vaciar()
@@ -0,0 +1,65 @@
+# usuarios/facetas.py
+"""
+Listas de filtros (facetas) del catálogo público con su conteo de mascotas.
+
+Las opciones de especie, raza y ciudad cambian muy poco, así que se guardan
+en el caché de Django y solo se recalculan cuando se modifica una Mascota o un
+Refugio (ver ``usuarios/signals.py``). Al recalcular se hace una única
+consulta agrupada sobre las mascotas disponibles y los totales por valor se
+suman en Python.
+"""
+from collections import Counter
+
+from django.core.cache import cache
+from django.db.models import Count
+
+from mascotas.models import Mascota
+
+CLAVE_FACETAS = 'usuarios:facetas_catalogo'
+# Tope de seguridad por si algún cambio no pasa por las señales (ej. .update())
+DURACION_FACETAS = 60 * 60
+
+# Campos de Mascota / Refugio que afectan a las facetas
+CAMPOS_MASCOTA = {'especie', 'raza', 'adoptada', 'refugio'}
+CAMPOS_REFUGIO = {'direccion', 'ciudad'}
+
+
+def _ordenar(contador):
+    return sorted(contador.items(), key=lambda par: par[0].lower())
+
+
+def calcular_facetas():
+    """Calcula las facetas con una sola consulta ``GROUP BY``."""
+    filas = (Mascota.objects
+             .filter(adoptada=False)
+             .order_by()
+             .values_list('especie', 'raza', 'refugio__ciudad')
+             .annotate(total=Count('id')))
+
+    especies, razas, ciudades = Counter(), Counter(), Counter()
+    for especie, raza, ciudad, total in filas:
+        if especie:
+            especies[especie] += total
+        if raza:
+            razas[raza] += total
+        if ciudad:
+            ciudades[ciudad] += total
+
+    return {
+        'especies': _ordenar(especies),
+        'razas': _ordenar(razas),
+        'ciudades': _ordenar(ciudades),
+    }
+
+
+def obtener_facetas():
+    """Devuelve las facetas desde el caché, recalculándolas si hace falta."""
+    facetas = cache.get(CLAVE_FACETAS)
+    if facetas is None:
+        facetas = calcular_facetas()
+        cache.set(CLAVE_FACETAS, facetas, DURACION_FACETAS)
+    return facetas
+
+
+def invalidar_facetas():
+    cache.delete(CLAVE_FACETAS)
@@ -1,6 +1,7 @@
 from django import forms
 from django.contrib.auth.models import User
 from .models import Adoptante, Refugio
+from tareas.cola import encolar
 
 class RegistroForm(forms.ModelForm):
     # campos extra para crear el Useraaa
@@ -38,6 +39,16 @@ class AdoptanteForm(forms.ModelForm):
     class Meta:
         model = Adoptante
         fields = ['cedula', 'telefono', 'direccion', 'foto_perfil']
+
+    def save(self, commit=True):
+        adoptante = super().save(commit=commit)
+        if commit and 'foto_perfil' in self.changed_data:
+            # La miniatura se genera en segundo plano; mientras tanto se usa la original
+            Adoptante.objects.filter(pk=adoptante.pk).update(foto_miniatura='')
+            adoptante.foto_miniatura = ''
+            if adoptante.foto_perfil:
+                encolar('miniatura_perfil', adoptante.pk)
+        return adoptante
         
 class RegistroRefugioForm(forms.ModelForm):
     # Campos para crear el User, idénticos al RegistroForm de Adoptante
@@ -0,0 +1,28 @@
+# usuarios/imagenes.py
+"""Miniatura de la foto de perfil del adoptante (se genera en la cola de tareas)."""
+import os
+
+from mascotas.imagenes import CALIDAD_JPEG, abrir_imagen, codificar
+from PIL import ImageOps
+
+from .models import Adoptante
+
+LADO_MINIATURA = 300
+CARPETA_MINIATURAS = 'profiles/miniaturas'
+
+
+def procesar_miniatura_perfil(adoptante_id):
+    """Punto de entrada de la cola de tareas (tipo 'miniatura_perfil')."""
+    adoptante = Adoptante.objects.filter(pk=adoptante_id).only('pk', 'foto_perfil').first()
+    if adoptante is None or not adoptante.foto_perfil:
+        return
+
+    storage = adoptante.foto_perfil.storage
+    original = abrir_imagen(storage, adoptante.foto_perfil.name)
+    # Recorte cuadrado centrado: la foto se muestra en un círculo
+    miniatura = ImageOps.fit(original, (LADO_MINIATURA, LADO_MINIATURA))
+    base = os.path.splitext(os.path.basename(adoptante.foto_perfil.name))[0]
+    ruta = storage.save(f'{CARPETA_MINIATURAS}/{base}_{LADO_MINIATURA}.jpg',
+                        codificar(miniatura, 'JPEG', CALIDAD_JPEG))
+
+    Adoptante.objects.filter(pk=adoptante.pk, foto_perfil=adoptante.foto_perfil.name).update(foto_miniatura=ruta)
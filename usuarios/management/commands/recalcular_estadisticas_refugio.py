@@ -0,0 +1,37 @@
+# usuarios/management/commands/recalcular_estadisticas_refugio.py
+from django.core.management.base import BaseCommand
+
+from usuarios.contadores import recalcular_estadisticas
+from usuarios.models import Refugio
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula desde cero los contadores de EstadisticasRefugio para "
+        "corregir desajustes (cambios hechos con update(), cargas masivas...). "
+        "Procesa los refugios por lotes ordenados por clave primaria."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('refugios', nargs='*', type=int,
+                            help='Claves de los refugios a recalcular (por defecto, todos).')
+        parser.add_argument('--lote', type=int, default=500,
+                            help='Cantidad de refugios por lote (por defecto 500).')
+
+    def handle(self, *args, **options):
+        lote = options['lote']
+        refugios = Refugio.objects.order_by('pk')
+        if options['refugios']:
+            refugios = refugios.filter(pk__in=options['refugios'])
+
+        ultimo_pk = None
+        procesados = 0
+        while True:
+            pendientes = refugios if ultimo_pk is None else refugios.filter(pk__gt=ultimo_pk)
+            ids = list(pendientes.values_list('pk', flat=True)[:lote])
+            if not ids:
+                break
+            procesados += recalcular_estadisticas(ids)
+            ultimo_pk = ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f"Listo. {procesados} refugios recalculados."))
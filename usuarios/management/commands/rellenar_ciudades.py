@@ -0,0 +1,54 @@
+# usuarios/management/commands/rellenar_ciudades.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from usuarios.facetas import invalidar_facetas
+from usuarios.models import Refugio, extraer_ciudad
+
+
+class Command(BaseCommand):
+    help = (
+        "Calcula Refugio.ciudad a partir de la dirección para los refugios "
+        "existentes. Recorre la tabla por lotes ordenados por clave primaria, "
+        "así que se puede interrumpir y volver a ejecutar sin problema."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000,
+                            help='Cantidad de refugios por lote (por defecto 1000).')
+        parser.add_argument('--desde', type=int, default=0,
+                            help='Retomar a partir de esta clave primaria.')
+
+    def handle(self, *args, **options):
+        lote = options['lote']
+        ultimo_pk = options['desde']
+        actualizados = 0
+
+        while True:
+            refugios = list(
+                Refugio.objects
+                .filter(pk__gt=ultimo_pk)
+                .order_by('pk')
+                .only('pk', 'direccion', 'ciudad')[:lote]
+            )
+            if not refugios:
+                break
+
+            cambiados = []
+            for refugio in refugios:
+                ciudad = extraer_ciudad(refugio.direccion)
+                if refugio.ciudad != ciudad:
+                    refugio.ciudad = ciudad
+                    cambiados.append(refugio)
+
+            with transaction.atomic():
+                Refugio.objects.bulk_update(cambiados, ['ciudad'])
+
+            actualizados += len(cambiados)
+            ultimo_pk = refugios[-1].pk
+            self.stdout.write(f"Lote hasta pk={ultimo_pk}: {len(cambiados)} actualizados")
+
+        # bulk_update no dispara señales: las facetas se recalculan a mano
+        invalidar_facetas()
+
+        self.stdout.write(self.style.SUCCESS(f"Listo. {actualizados} refugios actualizados."))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0010_veterinario_apellido'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='refugio',
+            name='ciudad',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=100),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0011_refugio_ciudad'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='adoptante',
+            name='foto_miniatura',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+    ]
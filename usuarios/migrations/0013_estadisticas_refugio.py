@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0012_adoptante_foto_miniatura'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadisticasRefugio',
+            fields=[
+                ('refugio', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='estadisticas', serialize=False, to='usuarios.refugio')),
+                ('mascotas_total', models.IntegerField(default=0)),
+                ('mascotas_disponibles', models.IntegerField(default=0)),
+                ('solicitudes_pendientes', models.IntegerField(default=0)),
+                ('solicitudes_aprobadas', models.IntegerField(default=0)),
+                ('solicitudes_rechazadas', models.IntegerField(default=0)),
+                ('seguimientos_pendientes', models.IntegerField(default=0)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
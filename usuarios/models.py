@@ -1,6 +1,18 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+
+def extraer_ciudad(direccion):
+    """
+    Obtiene la ciudad de una dirección con el formato habitual
+    "Calle 123, Ciudad" (el último tramo después de la coma).
+    Devuelve '' si la dirección no trae ciudad.
+    """
+    if not direccion or ',' not in direccion:
+        return ''
+    ciudad = direccion.rsplit(',', 1)[1]
+    return ' '.join(ciudad.split())[:100]
+
 class Adoptante(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     cedula = models.CharField(max_length=20, unique=True)
@@ -8,6 +20,8 @@ class Adoptante(models.Model):
     direccion = models.CharField(max_length=255, blank=True)
     # foto subida por el usuario (opcional)
     foto_perfil = models.ImageField(upload_to='profiles/', blank=True, null=True)
+    # miniatura cuadrada generada en segundo plano (ver usuarios/imagenes.py)
+    foto_miniatura = models.CharField(max_length=255, blank=True, editable=False)
     is_active = models.BooleanField(default=True)
     fecha_registro = models.DateTimeField(auto_now_add=True)
     fecha_modificacion = models.DateTimeField(auto_now=True)
@@ -15,6 +29,15 @@ class Adoptante(models.Model):
     def __str__(self):
         return f"{self.user.username} ({self.cedula})"
 
+    @property
+    def foto_url(self):
+        """URL de la miniatura si ya existe; si no, la de la foto original."""
+        if self.foto_miniatura:
+            return self.foto_perfil.storage.url(self.foto_miniatura)
+        if self.foto_perfil:
+            return self.foto_perfil.url
+        return ''
+
 class Refugio(models.Model):
     usuario = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True) 
     
@@ -25,9 +48,18 @@ class Refugio(models.Model):
     
     # Campo que identifica el tipo de usuario (¡CLAVE!)
     es_refugio = models.BooleanField(default=True) 
+    # Ciudad derivada de la dirección (se calcula en save), indexada para los filtros
+    ciudad = models.CharField(max_length=100, blank=True, editable=False, db_index=True)
 
     def __str__(self):
         return self.nombre      
+
+    def save(self, *args, **kwargs):
+        self.ciudad = extraer_ciudad(self.direccion)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'direccion' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'ciudad'}
+        super().save(*args, **kwargs)
     
 class Veterinario(models.Model):
     nombre = models.CharField(max_length=100)
@@ -39,4 +71,23 @@ class Veterinario(models.Model):
     def __str__(self):
         return self.nombre
     
-    
\ No newline at end of file
+    
+
+class EstadisticasRefugio(models.Model):
+    """
+    Contadores del panel de cada refugio, mantenidos al guardar/borrar
+    mascotas, solicitudes y seguimientos (ver ``usuarios/contadores.py``).
+    Si se desajustan se reparan con ``manage.py recalcular_estadisticas_refugio``.
+    """
+    refugio = models.OneToOneField(Refugio, on_delete=models.CASCADE, primary_key=True, related_name='estadisticas')
+    mascotas_total = models.IntegerField(default=0)
+    mascotas_disponibles = models.IntegerField(default=0)
+    solicitudes_pendientes = models.IntegerField(default=0)
+    solicitudes_aprobadas = models.IntegerField(default=0)
+    solicitudes_rechazadas = models.IntegerField(default=0)
+    # Revisiones todavía no realizadas (estado 'pendiente' o 'en_curso')
+    seguimientos_pendientes = models.IntegerField(default=0)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Estadísticas de {self.refugio_id}"
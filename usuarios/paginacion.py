@@ -0,0 +1,163 @@
+# usuarios/paginacion.py
+"""
+Paginación por cursor (keyset / seek) para los listados grandes.
+
+En lugar de ``OFFSET`` (que obliga a la base a recorrer y descartar todas las
+filas anteriores), cada página continúa "después" de la última fila vista,
+comparando las columnas del orden. Así el costo de la página 1 y de la página
+10.000 es el mismo.
+
+El cursor es opaco: va firmado con ``django.core.signing`` y guarda tanto la
+posición (valores del orden de la última fila) como los filtros activos, para
+que las páginas siguientes se sigan construyendo con los mismos criterios.
+
+El orden puede incluir columnas que admiten NULL, escritas como
+``F('campo').asc(nulls_last=True)`` / ``F('campo').desc(nulls_first=True)``
+(las mismas posiciones de NULL que un índice btree de PostgreSQL, así el
+índice puede dar el orden). Los nombres con ``-`` siguen esa misma regla.
+"""
+from django.core import signing
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import F, OrderBy, Q
+
+SALT_CURSOR = 'usuarios.paginacion.cursor'
+
+
+class PaginaKeyset:
+    """Resultado de una página: objetos y cursor para pedir la siguiente."""
+
+    def __init__(self, objetos, cursor_siguiente=None):
+        self.objetos = objetos
+        self.cursor_siguiente = cursor_siguiente
+
+    @property
+    def hay_siguiente(self):
+        return self.cursor_siguiente is not None
+
+    def __iter__(self):
+        return iter(self.objetos)
+
+    def __len__(self):
+        return len(self.objetos)
+
+
+def codificar_cursor(posicion, filtros=None):
+    """Genera el token opaco a partir de la posición y los filtros activos."""
+    return signing.dumps({'p': posicion, 'f': filtros or {}}, salt=SALT_CURSOR, compress=True)
+
+
+def decodificar_cursor(cursor):
+    """
+    Devuelve ``{'posicion': [...], 'filtros': {...}}`` o ``None`` si el cursor
+    no existe, está vacío o fue manipulado.
+    """
+    if not cursor:
+        return None
+    try:
+        datos = signing.loads(cursor, salt=SALT_CURSOR)
+    except signing.BadSignature:
+        return None
+    if not isinstance(datos, dict) or not isinstance(datos.get('p'), list):
+        return None
+    filtros = datos.get('f') if isinstance(datos.get('f'), dict) else {}
+    return {'posicion': datos['p'], 'filtros': filtros}
+
+
+def _valor_a_json(valor):
+    # Fechas y horas viajan como ISO; el resto (enteros, textos) tal cual.
+    if hasattr(valor, 'isoformat'):
+        return valor.isoformat()
+    return valor
+
+
+def _valor_desde_json(modelo, campo, valor):
+    if valor is None:
+        return None
+    try:
+        return modelo._meta.get_field(campo).to_python(valor)
+    except FieldDoesNotExist:
+        return valor
+
+
+def _partes_orden(campo_orden):
+    """``(campo, descendente, nulos_al_final)`` de un elemento del orden."""
+    if isinstance(campo_orden, OrderBy) and isinstance(campo_orden.expression, F):
+        descendente = campo_orden.descending
+        if campo_orden.nulls_last or campo_orden.nulls_first:
+            return campo_orden.expression.name, descendente, bool(campo_orden.nulls_last)
+        return campo_orden.expression.name, descendente, not descendente
+    if isinstance(campo_orden, str):
+        descendente = campo_orden.startswith('-')
+        # Como PostgreSQL: ASC deja los NULL al final y DESC al principio
+        return campo_orden.lstrip('-'), descendente, not descendente
+    raise TypeError(f"Orden no soportado para paginar por cursor: {campo_orden!r}")
+
+
+def _admite_null(modelo, campo):
+    try:
+        return modelo._meta.get_field(campo).null
+    except FieldDoesNotExist:
+        return False
+
+
+def _posterior(campo, descendente, nulos_al_final, valor, admite_null):
+    """Filas estrictamente posteriores a ``valor`` en una sola columna."""
+    if valor is None:
+        # Después de NULL solo hay algo si los NULL van primero
+        return Q() if nulos_al_final else Q(**{f'{campo}__isnull': False})
+    lookup = 'lt' if descendente else 'gt'
+    posterior = Q(**{f'{campo}__{lookup}': valor})
+    if nulos_al_final and admite_null:
+        posterior |= Q(**{f'{campo}__isnull': True})
+    return posterior
+
+
+def condicion_posterior(modelo, orden, posicion):
+    """
+    Construye el filtro "fila posterior a ``posicion``" para el orden dado.
+
+    Para ``('-a', '-b')`` equivale a ``(a, b) < (va, vb)``:
+    ``a <= va AND (a < va OR (a = va AND b < vb))``. La primera comparación
+    redundante acota el rango del índice sobre la columna principal. Las
+    columnas con NULL se comparan según dónde los deja el orden.
+    """
+    partes = [_partes_orden(c) for c in orden]
+    valores = [_valor_desde_json(modelo, campo, v) for (campo, _, _), v in zip(partes, posicion)]
+
+    condicion = Q(pk__in=[])
+    iguales = Q()
+    for (campo, descendente, nulos_al_final), valor in zip(partes, valores):
+        posterior = _posterior(campo, descendente, nulos_al_final, valor, _admite_null(modelo, campo))
+        if posterior:
+            condicion |= iguales & posterior
+        iguales &= Q(**{f'{campo}__isnull': True}) if valor is None else Q(**{campo: valor})
+
+    primero, descendente, _ = partes[0]
+    if valores[0] is None:
+        return condicion
+    rango = 'lte' if descendente else 'gte'
+    return Q(**{f'{primero}__{rango}': valores[0]}) & condicion
+
+
+def paginar_keyset(queryset, orden, cursor=None, por_pagina=24, filtros=None):
+    """
+    Devuelve una :class:`PaginaKeyset` con a lo sumo ``por_pagina`` objetos.
+
+    ``orden`` debe terminar en una columna única (normalmente ``id``) para que
+    el orden sea total. Sus elementos son nombres (``'-fecha'``) o
+    ``F(...).asc()/.desc()`` con ``nulls_last`` / ``nulls_first``. ``cursor`` es el resultado de :func:`decodificar_cursor`.
+    Se pide una fila de más para saber si existe una página siguiente sin
+    hacer un ``COUNT``.
+    """
+    queryset = queryset.order_by(*orden)
+    if cursor and len(cursor['posicion']) == len(orden):
+        queryset = queryset.filter(condicion_posterior(queryset.model, orden, cursor['posicion']))
+
+    objetos = list(queryset[:por_pagina + 1])
+    cursor_siguiente = None
+    if len(objetos) > por_pagina:
+        objetos = objetos[:por_pagina]
+        ultimo = objetos[-1]
+        posicion = [_valor_a_json(getattr(ultimo, _partes_orden(c)[0])) for c in orden]
+        cursor_siguiente = codificar_cursor(posicion, filtros)
+    return PaginaKeyset(objetos, cursor_siguiente)
@@ -0,0 +1,118 @@
+# usuarios/roles.py
+"""
+Rol y perfil del usuario, resueltos una sola vez por request.
+
+- :class:`BackendPerfiles` carga el usuario (en cada request y en el login)
+  con ``select_related('refugio', 'adoptante')``: una sola consulta con JOIN
+  trae el usuario y su perfil, en lugar de una consulta más cada vez que
+  una vista prueba ``user.refugio`` o ``user.adoptante``.
+- :class:`RolMiddleware` deja el resultado en ``request.role``
+  (:data:`ROL_REFUGIO`, :data:`ROL_ADOPTANTE` o None) y ``request.profile``
+  (el ``Refugio`` / ``Adoptante``, o None).
+- Las vistas usan :func:`rol_requerido` / :data:`refugio_requerido` y
+  :func:`perfil_adoptante` en lugar de volver a consultar el perfil.
+
+``is_staff`` no es un rol: es un campo del propio usuario y se sigue leyendo
+de ``request.user``.
+
+Como el perfil se lee junto con el usuario en cada request, no hay nada que
+invalidar cuando el perfil cambia.
+"""
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.views import redirect_to_login
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import Http404
+
+ROL_REFUGIO = 'refugio'
+ROL_ADOPTANTE = 'adoptante'
+
+RELACIONES_PERFIL = ('refugio', 'adoptante')
+
+
+def resolver_rol(user):
+    """
+    ``(rol, perfil)`` del usuario. No consulta la base si el usuario se cargó
+    con :class:`BackendPerfiles` (los perfiles ya vienen en la misma fila).
+    """
+    if not user.is_authenticated:
+        return None, None
+    try:
+        refugio = user.refugio
+    except ObjectDoesNotExist:
+        refugio = None
+    if refugio is not None and refugio.es_refugio:
+        return ROL_REFUGIO, refugio
+    try:
+        return ROL_ADOPTANTE, user.adoptante
+    except ObjectDoesNotExist:
+        return None, None
+
+
+class BackendPerfiles(ModelBackend):
+    """``ModelBackend`` que trae los perfiles con el usuario (un JOIN)."""
+
+    def _usuarios(self):
+        return get_user_model()._default_manager.select_related(*RELACIONES_PERFIL)
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = self._usuarios().get(**{UserModel.USERNAME_FIELD: username})
+        except UserModel.DoesNotExist:
+            # Igual que ModelBackend: se calcula un hash para no revelar por el
+            # tiempo de respuesta si el usuario existe
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    def get_user(self, user_id):
+        try:
+            user = self._usuarios().get(pk=user_id)
+        except get_user_model().DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+
+class RolMiddleware:
+    """Deja ``request.role`` y ``request.profile`` (va después de AuthenticationMiddleware)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.role, request.profile = resolver_rol(request.user)
+        return self.get_response(request)
+
+
+def rol_requerido(*roles, permitir_staff=False, login_url=None):
+    """
+    Como ``user_passes_test``, pero mira ``request.role``: si el rol no está
+    en ``roles`` (y no es staff, cuando ``permitir_staff``) redirige al login.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            if request.role in roles or (permitir_staff and request.user.is_staff):
+                return vista(request, *args, **kwargs)
+            return redirect_to_login(request.get_full_path(), login_url)
+        return envoltura
+    return decorador
+
+
+refugio_requerido = rol_requerido(ROL_REFUGIO)
+
+
+def perfil_adoptante(request):
+    """El ``Adoptante`` del request, o 404 si el usuario no es adoptante."""
+    if request.role != ROL_ADOPTANTE:
+        raise Http404("El usuario no tiene perfil de adoptante.")
+    return request.profile
@@ -0,0 +1,47 @@
+# usuarios/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from mascotas.models import Mascota
+from seguimiento import calendario
+from .facetas import CAMPOS_MASCOTA, CAMPOS_REFUGIO, invalidar_facetas
+from .models import Refugio, Veterinario
+
+
+def _afecta(update_fields, campos):
+    # update_fields=None significa que se guardó el objeto completo
+    return update_fields is None or bool(campos.intersection(update_fields))
+
+
+@receiver(post_save, sender=Mascota)
+def mascota_guardada(sender, instance, update_fields=None, **kwargs):
+    if _afecta(update_fields, CAMPOS_MASCOTA):
+        invalidar_facetas()
+    if _afecta(update_fields, calendario.CAMPOS_MASCOTA):
+        calendario.invalidar_calendarios()
+
+
+@receiver(post_save, sender=Refugio)
+def refugio_guardado(sender, instance, update_fields=None, **kwargs):
+    if _afecta(update_fields, CAMPOS_REFUGIO):
+        invalidar_facetas()
+    if _afecta(update_fields, calendario.CAMPOS_REFUGIO):
+        calendario.invalidar_calendarios()
+
+
+@receiver(post_save, sender=Veterinario)
+def veterinario_guardado(sender, instance, update_fields=None, **kwargs):
+    if _afecta(update_fields, calendario.CAMPOS_VETERINARIO):
+        calendario.invalidar_calendarios()
+
+
+@receiver(post_delete, sender=Veterinario)
+def veterinario_eliminado(sender, instance, **kwargs):
+    # Sus revisiones quedan sin veterinario con un UPDATE que no toca actualizado_en
+    calendario.invalidar_calendarios()
+
+
+@receiver(post_delete, sender=Mascota)
+@receiver(post_delete, sender=Refugio)
+def facetas_registro_eliminado(sender, instance, **kwargs):
+    invalidar_facetas()
@@ -1,9 +1,19 @@
+from django.db import connection
 from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
 from django.urls import reverse
 from unittest.mock import patch
 # Importa tus modelos
-from .models import Adoptante, Refugio
+from .models import Adoptante, EstadisticasRefugio, Refugio
+from mascotas.models import Mascota, SolicitudAdopcion
+from seguimiento.models import Seguimiento
+from django.core.cache import cache
+from django.core.management import call_command
+import json
+import zipfile
+from io import BytesIO, StringIO
+from .facetas import obtener_facetas, CLAVE_FACETAS
 # Importa tus formularios (necesario para el patch)
 # **NOTA:** Si tus formularios se llaman diferente a RegistroForm, ajústalos aquí
 # from .forms import RegistroForm, RegistroRefugioForm 
@@ -67,6 +77,22 @@ class PerfilModelTests(TestCase):
         self.assertTrue(refugio.es_refugio)
         self.assertIsInstance(user.refugio, Refugio)
 
+    def test_refugio_calcula_ciudad(self):
+        """La ciudad se deriva de la dirección al guardar."""
+        user = User.objects.create_user(username='refugio_ciudad', password='x')
+        refugio = Refugio.objects.create(
+            usuario=user,
+            nombre='Refugio Luque',
+            direccion='Calle del Sol 456,  Luque ',
+            email='luque@test.com'
+        )
+        self.assertEqual(refugio.ciudad, 'Luque')
+
+        refugio.direccion = 'Ruta 2 km 10, San Lorenzo'
+        refugio.save(update_fields=['direccion'])
+        refugio.refresh_from_db()
+        self.assertEqual(refugio.ciudad, 'San Lorenzo')
+
 
 # ========================================================================
 # B. PRUEBAS PARA LAS VISTAS DE AUTENTICACIÓN Y REGISTRO
@@ -188,4 +214,384 @@ class AuthenticationViewTests(TestCase):
         }, follow=True) 
         
         # Verificar redirección al dashboard (asumiendo que 'admin_panel:dashboard' existe)
-        self.assertRedirects(response, reverse('admin_panel:dashboard'))
\ No newline at end of file
+        self.assertRedirects(response, reverse('admin_panel:dashboard'))
+
+# ========================================================================
+# C. PRUEBAS DEL CATÁLOGO PÚBLICO (paginación por cursor)
+# ========================================================================
+
+class CatalogoPaginacionTests(TestCase):
+    """Verifica que el home pagine por cursor y conserve los filtros."""
+
+    def setUp(self):
+        self.client = Client()
+        user = User.objects.create_user(username='refugio_cat', password='refugiopass')
+        self.refugio = Refugio.objects.create(
+            usuario=user,
+            nombre='Refugio Catálogo',
+            direccion='Calle 1, Asunción',
+            telefono='021000000',
+            email='catalogo@test.com'
+        )
+        for i in range(5):
+            Mascota.objects.create(nombre=f'Perro {i}', especie='Perro', edad=1, refugio=self.refugio)
+        for i in range(3):
+            Mascota.objects.create(nombre=f'Gato {i}', especie='Gato', edad=1, refugio=self.refugio)
+
+    @patch('usuarios.views.MASCOTAS_POR_PAGINA', 2)
+    def test_recorre_todas_las_paginas_sin_repetir(self):
+        """Siguiendo los cursores se ven todas las mascotas una sola vez."""
+        vistos = []
+        response = self.client.get(reverse('usuarios:home'))
+        while True:
+            vistos.extend(m.id for m in response.context['mascotas'])
+            pagina = response.context['pagina']
+            if not pagina.hay_siguiente:
+                break
+            response = self.client.get(reverse('usuarios:home'), {'cursor': pagina.cursor_siguiente})
+
+        self.assertEqual(len(vistos), 8)
+        self.assertEqual(len(set(vistos)), 8)
+
+    @patch('usuarios.views.MASCOTAS_POR_PAGINA', 2)
+    def test_cursor_conserva_filtros(self):
+        """El cursor de la página siguiente mantiene el filtro de especie."""
+        response = self.client.get(reverse('usuarios:home'), {'especie': 'Gato'})
+        cursor = response.context['pagina'].cursor_siguiente
+        self.assertIsNotNone(cursor)
+
+        response = self.client.get(reverse('usuarios:home'), {'cursor': cursor})
+        self.assertEqual(response.context['filtros']['especie'], 'Gato')
+        self.assertEqual(len(response.context['mascotas']), 1)
+        self.assertTrue(all(m.especie == 'Gato' for m in response.context['mascotas']))
+
+    def test_cursor_invalido_vuelve_a_la_primera_pagina(self):
+        """Un cursor manipulado no rompe la vista."""
+        response = self.client.get(reverse('usuarios:home'), {'cursor': 'no-es-un-cursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['es_primera_pagina'])
+
+
+# ========================================================================
+# D. PRUEBAS DEL CACHÉ DE FACETAS
+# ========================================================================
+
+class FacetasCatalogoTests(TestCase):
+    """Verifica los conteos de las facetas y su invalidación por señales."""
+
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user(username='refugio_fac', password='refugiopass')
+        self.refugio = Refugio.objects.create(
+            usuario=user,
+            nombre='Refugio Facetas',
+            direccion='Av. España 100, Asunción',
+            telefono='021000001',
+            email='facetas@test.com'
+        )
+        Mascota.objects.create(nombre='A', especie='Perro', raza='Caniche', edad=1, refugio=self.refugio)
+        Mascota.objects.create(nombre='B', especie='Perro', raza='Beagle', edad=1, refugio=self.refugio)
+        Mascota.objects.create(nombre='C', especie='Gato', edad=1, refugio=self.refugio)
+        Mascota.objects.create(nombre='D', especie='Gato', edad=1, refugio=self.refugio, adoptada=True)
+
+    def test_conteos_de_mascotas_disponibles(self):
+        facetas = obtener_facetas()
+        self.assertEqual(facetas['especies'], [('Gato', 1), ('Perro', 2)])
+        self.assertEqual(facetas['razas'], [('Beagle', 1), ('Caniche', 1)])
+        self.assertEqual(facetas['ciudades'], [('Asunción', 3)])
+
+    def test_segunda_lectura_no_consulta_la_base(self):
+        obtener_facetas()
+        with self.assertNumQueries(0):
+            obtener_facetas()
+
+    def test_guardar_mascota_invalida_el_cache(self):
+        obtener_facetas()
+        Mascota.objects.create(nombre='E', especie='Conejo', edad=1, refugio=self.refugio)
+        especies = dict(obtener_facetas()['especies'])
+        self.assertEqual(especies['Conejo'], 1)
+
+    def test_guardar_campos_ajenos_no_invalida(self):
+        obtener_facetas()
+        mascota = Mascota.objects.get(nombre='A')
+        mascota.edad = 5
+        mascota.save(update_fields=['edad'])
+        self.assertIsNotNone(cache.get(CLAVE_FACETAS))
+
+    def test_eliminar_refugio_invalida_el_cache(self):
+        obtener_facetas()
+        self.refugio.usuario.delete()
+        self.assertEqual(obtener_facetas()['especies'], [])
+
+    def test_rellenar_ciudades_corrige_filas_existentes(self):
+        # Simula una fila previa a la columna (ciudad vacía)
+        Refugio.objects.filter(pk=self.refugio.pk).update(ciudad='')
+        call_command('rellenar_ciudades', lote=1, stdout=StringIO())
+        self.refugio.refresh_from_db()
+        self.assertEqual(self.refugio.ciudad, 'Asunción')
+
+# ========================================================================
+# E. PRUEBAS DE LOS CONTADORES DEL PANEL DE REFUGIO
+# ========================================================================
+
+class EstadisticasRefugioTests(TestCase):
+    """Verifica que EstadisticasRefugio se mantenga al día con cada escritura."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='refugio_est', password='refugiopass')
+        self.refugio = Refugio.objects.create(
+            usuario=self.user,
+            nombre='Refugio Contadores',
+            direccion='Calle 1, Luque',
+            telefono='021000002',
+            email='contadores@test.com'
+        )
+        self.mascota = Mascota.objects.create(nombre='Toby', especie='Perro', edad=2, refugio=self.refugio)
+        Mascota.objects.create(nombre='Mia', especie='Gato', edad=1, refugio=self.refugio, adoptada=True)
+
+    def crear_solicitud(self, estado='pendiente'):
+        return SolicitudAdopcion.objects.create(
+            mascota=self.mascota, nombre_adoptante='Ana', apellido_adoptante='Pérez',
+            telefono='1', email='ana@test.com', direccion='X', estado=estado,
+        )
+
+    def contadores(self):
+        return EstadisticasRefugio.objects.get(refugio=self.refugio)
+
+    def test_altas_de_mascotas_y_solicitudes(self):
+        self.crear_solicitud()
+        self.crear_solicitud('rechazada')
+        Seguimiento.objects.create(mascota=self.mascota, fecha_revision='2030-01-01')
+
+        est = self.contadores()
+        self.assertEqual(est.mascotas_total, 2)
+        self.assertEqual(est.mascotas_disponibles, 1)
+        self.assertEqual(est.solicitudes_pendientes, 1)
+        self.assertEqual(est.solicitudes_rechazadas, 1)
+        self.assertEqual(est.seguimientos_pendientes, 1)
+
+    def test_cambios_de_estado_mueven_los_contadores(self):
+        solicitud = self.crear_solicitud()
+        solicitud.estado = 'aprobada'
+        solicitud.save()
+        self.mascota.adoptada = True
+        self.mascota.save()
+
+        est = self.contadores()
+        self.assertEqual(est.solicitudes_pendientes, 0)
+        self.assertEqual(est.solicitudes_aprobadas, 1)
+        self.assertEqual(est.mascotas_disponibles, 0)
+
+    def test_borrar_mascota_descuenta_sus_solicitudes(self):
+        self.crear_solicitud()
+        self.mascota.delete()
+
+        est = self.contadores()
+        self.assertEqual(est.mascotas_total, 1)
+        self.assertEqual(est.solicitudes_pendientes, 0)
+
+    def test_borrar_mascota_no_consulta_por_fila(self):
+        # Sin receptores post_delete las cascadas se borran con un DELETE por tabla
+        def consultas_al_borrar(cantidad):
+            mascota = Mascota.objects.create(nombre='Rex', especie='Perro', edad=1, refugio=self.refugio)
+            for _ in range(cantidad):
+                SolicitudAdopcion.objects.create(
+                    mascota=mascota, nombre_adoptante='Ana', apellido_adoptante='Pérez',
+                    telefono='1', email='ana@test.com', direccion='X',
+                )
+                Seguimiento.objects.create(mascota=mascota, fecha_revision='2030-01-01')
+            with CaptureQueriesContext(connection) as consultas:
+                mascota.delete()
+            return len(consultas)
+
+        self.assertEqual(consultas_al_borrar(1), consultas_al_borrar(5))
+        self.assertEqual(self.contadores().seguimientos_pendientes, 0)
+
+    def test_recalcular_corrige_desajustes(self):
+        # update() no pasa por save(): los contadores quedan desfasados
+        Mascota.objects.filter(pk=self.mascota.pk).update(adoptada=True)
+        call_command('recalcular_estadisticas_refugio', stdout=StringIO())
+        self.assertEqual(self.contadores().mascotas_disponibles, 0)
+
+    def test_panel_refugio_lee_los_contadores(self):
+        self.client.login(username='refugio_est', password='refugiopass')
+        # sesión + usuario + refugio + estadísticas (sin solicitudes pendientes)
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('usuarios:panel_refugio'))
+        self.assertEqual(response.context['conteo_mascotas'], 2)
+        self.assertEqual(response.context['conteo_solicitudes'], 0)
+
+# ========================================================================
+# F. PRUEBAS DE LA EXPORTACIÓN COMPLETA DE DATOS PERSONALES
+# ========================================================================
+
+class ExportacionDatosPersonalesTests(TestCase):
+    """Verifica el ZIP en streaming de descargar_datos."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='ana_zip', password='anapass', first_name='Ana', email='ana@zip.com'
+        )
+        self.adoptante = Adoptante.objects.create(user=self.user, cedula='7777777')
+        refugio_user = User.objects.create_user(username='refugio_zip', password='refugiopass')
+        refugio = Refugio.objects.create(
+            usuario=refugio_user, nombre='Refugio Zip', direccion='Calle 2, Asunción',
+            telefono='021000003', email='zip@test.com'
+        )
+        self.adoptada = Mascota.objects.create(nombre='Lola', especie='Perro', edad=3, refugio=refugio)
+        otra = Mascota.objects.create(nombre='Kira', especie='Gato', edad=1, refugio=refugio)
+        for mascota, estado in ((self.adoptada, 'aprobada'), (otra, 'pendiente')):
+            SolicitudAdopcion.objects.create(
+                mascota=mascota, adoptante=self.adoptante, nombre_adoptante='Ana',
+                apellido_adoptante='Pérez', telefono='1', email='ana@zip.com',
+                direccion='X', estado=estado,
+            )
+        Seguimiento.objects.create(mascota=self.adoptada, fecha_revision='2030-01-01', motivo='Control')
+        Seguimiento.objects.create(mascota=otra, fecha_revision='2030-01-02')
+        self.client.login(username='ana_zip', password='anapass')
+
+    def descargar(self):
+        response = self.client.get(reverse('usuarios:descargar_datos', args=['zip']))
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        self.assertTrue(response.streaming)
+        return zipfile.ZipFile(BytesIO(b''.join(response.streaming_content)))
+
+    def leer_jsonl(self, archivo_zip, nombre):
+        return [json.loads(linea) for linea in archivo_zip.read(nombre).decode().splitlines()]
+
+    def test_zip_incluye_todas_las_tablas(self):
+        archivo_zip = self.descargar()
+        self.assertIsNone(archivo_zip.testzip())
+        self.assertEqual(json.loads(archivo_zip.read('perfil.json'))['cedula'], '7777777')
+        self.assertEqual(len(self.leer_jsonl(archivo_zip, 'solicitudes.jsonl')), 2)
+        mascotas = self.leer_jsonl(archivo_zip, 'mascotas_adoptadas.jsonl')
+        self.assertEqual([m['nombre'] for m in mascotas], ['Lola'])
+        # Solo los seguimientos de las mascotas adoptadas
+        seguimientos = self.leer_jsonl(archivo_zip, 'seguimientos.jsonl')
+        self.assertEqual([s['motivo'] for s in seguimientos], ['Control'])
+
+    def test_zip_sin_foto_no_incluye_carpeta(self):
+        nombres = self.descargar().namelist()
+        self.assertFalse(any(nombre.startswith('foto_perfil/') for nombre in nombres))
+
+# ========================================================================
+# G. PRUEBAS DE MIS SEGUIMIENTOS
+# ========================================================================
+
+class MisSeguimientosTests(TestCase):
+    """Verifica que mis_seguimientos siga las relaciones reales y pagine por cursor."""
+
+    def setUp(self):
+        refugio_user = User.objects.create_user(username='refugio_seg', password='refugiopass')
+        refugio = Refugio.objects.create(
+            usuario=refugio_user, nombre='Refugio Seg', direccion='Calle 3, Luque',
+            telefono='021000004', email='seg@test.com'
+        )
+        self.user = User.objects.create_user(username='ana_seg', password='anapass',
+                                             first_name='Ana', last_name='Pérez')
+        self.adoptante = Adoptante.objects.create(user=self.user, cedula='5555555')
+        # Otra adoptante con el mismo nombre y apellido: no debe ver nada ajeno
+        tocaya = Adoptante.objects.create(
+            user=User.objects.create_user(username='ana_tocaya', first_name='Ana', last_name='Pérez'),
+            cedula='6666666',
+        )
+        self.mascota = Mascota.objects.create(nombre='Lola', especie='Perro', edad=3, refugio=refugio)
+        ajena = Mascota.objects.create(nombre='Kira', especie='Gato', edad=1, refugio=refugio)
+        for mascota, adoptante in ((self.mascota, self.adoptante), (ajena, tocaya)):
+            SolicitudAdopcion.objects.create(
+                mascota=mascota, adoptante=adoptante, nombre_adoptante='Ana',
+                apellido_adoptante='Pérez', telefono='1', email='ana@test.com',
+                direccion='X', estado='aprobada',
+            )
+        self.revisiones = [
+            Seguimiento.objects.create(mascota=self.mascota, fecha_revision='2030-01-01', hora_revision='10:00'),
+            Seguimiento.objects.create(mascota=self.mascota, fecha_revision='2030-01-01'),
+            Seguimiento.objects.create(mascota=self.mascota, fecha_revision='2030-02-01', hora_revision='09:00'),
+        ]
+        Seguimiento.objects.create(mascota=ajena, fecha_revision='2030-01-01')
+        self.client.login(username='ana_seg', password='anapass')
+
+    def ids(self, response):
+        return [s.pk for s in response.context['seguimientos']]
+
+    def test_solo_las_mascotas_adoptadas_por_el_usuario(self):
+        # sesión + usuario + una sola consulta con los joins
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('usuarios:mis_seguimientos'))
+        self.assertEqual(self.ids(response), [s.pk for s in self.revisiones])
+        self.assertNotContains(response, 'Kira')
+
+    def test_paginacion_de_a_uno_cruza_revisiones_sin_hora(self):
+        vistos, params = [], {}
+        with patch('usuarios.views.SEGUIMIENTOS_POR_PAGINA', 1):
+            while True:
+                pagina = self.client.get(reverse('usuarios:mis_seguimientos'), params)
+                vistos += self.ids(pagina)
+                if not pagina.context['pagina'].hay_siguiente:
+                    break
+                params = {'cursor': pagina.context['pagina'].cursor_siguiente}
+        self.assertEqual(vistos, [s.pk for s in self.revisiones])
+
+    def test_paginacion_por_cursor(self):
+        with patch('usuarios.views.SEGUIMIENTOS_POR_PAGINA', 2):
+            primera = self.client.get(reverse('usuarios:mis_seguimientos'))
+            self.assertEqual(self.ids(primera), [s.pk for s in self.revisiones[:2]])
+            segunda = self.client.get(reverse('usuarios:mis_seguimientos'),
+                                      {'cursor': primera.context['pagina'].cursor_siguiente})
+        self.assertEqual(self.ids(segunda), [self.revisiones[2].pk])
+
+
+# ========================================================================
+# H. PRUEBAS DEL ROL POR REQUEST (usuarios/roles.py)
+# ========================================================================
+
+class RolMiddlewareTests(TestCase):
+    """Verifica que el rol y el perfil se resuelvan una vez, con la carga del usuario."""
+
+    def setUp(self):
+        self.user_refugio = User.objects.create_user(username='refugio_rol', password='refugiopass')
+        self.refugio = Refugio.objects.create(
+            usuario=self.user_refugio, nombre='Refugio Rol', direccion='Calle 9, Luque',
+            telefono='021000009', email='rol@test.com'
+        )
+        self.user_adoptante = User.objects.create_user(username='ana_rol', password='anapass')
+        self.adoptante = Adoptante.objects.create(user=self.user_adoptante, cedula='7777777')
+
+    def test_refugio_en_una_sola_consulta(self):
+        self.client.login(username='refugio_rol', password='refugiopass')
+        # sesión + usuario con su perfil (JOIN)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('usuarios:redirigir_perfil'))
+        self.assertRedirects(response, reverse('usuarios:panel_refugio'), fetch_redirect_response=False)
+        self.assertEqual(response.wsgi_request.role, 'refugio')
+        self.assertEqual(response.wsgi_request.profile, self.refugio)
+
+    def test_adoptante(self):
+        self.client.login(username='ana_rol', password='anapass')
+        response = self.client.get(reverse('usuarios:redirigir_perfil'))
+        self.assertRedirects(response, reverse('usuarios:perfil'), fetch_redirect_response=False)
+        self.assertEqual(response.wsgi_request.role, 'adoptante')
+        self.assertEqual(response.wsgi_request.profile, self.adoptante)
+
+    def test_adoptante_no_entra_al_panel_del_refugio(self):
+        self.client.login(username='ana_rol', password='anapass')
+        response = self.client.get(reverse('usuarios:panel_refugio'))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('usuarios:login'), response.url)
+
+    def test_login_fallido_busca_una_sola_vez(self):
+        # Un solo backend: una búsqueda del usuario y un hash por intento
+        with self.assertNumQueries(1):
+            self.assertFalse(self.client.login(username='ana_rol', password='incorrecta'))
+
+    def test_anonimo(self):
+        response = self.client.get(reverse('usuarios:home'))
+        self.assertIsNone(response.wsgi_request.role)
+        self.assertIsNone(response.wsgi_request.profile)
+
+    def test_login_de_staff_con_refugio(self):
+        self.user_refugio.is_staff = True
+        self.user_refugio.save()
+        response = self.client.post(reverse('usuarios:login'),
+                                    {'username': 'refugio_rol', 'password': 'refugiopass'})
+        self.assertRedirects(response, reverse('usuarios:panel_refugio'), fetch_redirect_response=False)
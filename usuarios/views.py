@@ -1,19 +1,24 @@
-from django.shortcuts import render, redirect, get_object_or_404
-from django.db.models import Q
+from django.shortcuts import render, redirect
+from django.db.models import F, Q, prefetch_related_objects
 from django.db import transaction
 from django.contrib.auth import authenticate, login, logout, update_session_auth_hash
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import PasswordChangeForm, AuthenticationForm
 from django.contrib.auth.models import User
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 import json, csv
 from .forms import RegistroForm, UserForm, AdoptanteForm, RegistroRefugioForm, RefugioForm 
-from .models import Adoptante, Refugio
 from mascotas.models import Mascota, SolicitudAdopcion
+from mascotas.busqueda import buscar_mascotas, ORDEN_RELEVANCIA
+from mascotas.archivo import historial_solicitudes
 from django.contrib.admin.views.decorators import staff_member_required
-from django.contrib.auth.decorators import user_passes_test
 from seguimiento.models import Seguimiento
+from .paginacion import decodificar_cursor, paginar_keyset
+from .facetas import obtener_facetas
+from .contadores import obtener_estadisticas_refugio
+from .datos_personales import generar_zip
+from .roles import ROL_REFUGIO, perfil_adoptante, refugio_requerido, resolver_rol
 
 def register_adoptante(request):
     if request.method == "POST":
@@ -86,17 +91,13 @@ def login_adoptante(request):
                 
                 # 1. Redireccionar al Refugio/Admin (is_staff=True)
                 if user.is_staff:
-                    try:
+                    # El usuario viene de BackendPerfiles con el perfil ya cargado: no consulta
+                    rol, _ = resolver_rol(user)
+                    if rol == ROL_REFUGIO:
                         # Si es staff y tiene un perfil de Refugio, va al panel de Refugio
-                        if hasattr(user, 'refugio'):
-                            # ✅ ESTA DEBERÍA SER LA URL DEL PANEL DE REFUGIO
-                            return redirect('usuarios:panel_refugio') 
-                        else:
-                            # Si es staff pero no tiene perfil de Refugio (Superadmin puro)
-                            return redirect('admin_panel:dashboard')
-                    except Exception:
-                        # Fallback por si el objeto 'refugio' no está bien cargado o mapeado
-                        return redirect('admin_panel:dashboard')
+                        return redirect('usuarios:panel_refugio')
+                    # Si es staff pero no tiene perfil de Refugio (Superadmin puro)
+                    return redirect('admin_panel:dashboard')
 
                 # 2. Redireccionar al Adoptante (por defecto)
                 else:
@@ -128,37 +129,54 @@ def logout_adoptante(request):
     return redirect('usuarios:home')
 
 
+# Orden del catálogo público: más recientes primero, id desempata.
+ORDEN_CATALOGO = ('-fecha_ingreso', '-id')
+MASCOTAS_POR_PAGINA = 24
+FILTROS_CATALOGO = ('q', 'especie', 'raza', 'ciudad')
+
+
 def home(request):
-    qs = Mascota.objects.filter(adoptada=False)
+    # Si llega un cursor válido, los filtros salen de él (así se conservan al paginar)
+    cursor = decodificar_cursor(request.GET.get('cursor'))
+    if cursor:
+        filtros = {k: str(cursor['filtros'].get(k, '')) for k in FILTROS_CATALOGO}
+    else:
+        filtros = {k: request.GET.get(k, '').strip() for k in FILTROS_CATALOGO}
+
+    q = filtros['q']
+    especie = filtros['especie']
+    raza = filtros['raza']
+    ciudad = filtros['ciudad']
 
-    q = request.GET.get('q', '').strip()
-    especie = request.GET.get('especie', '').strip()
-    raza = request.GET.get('raza', '').strip()
-    ciudad = request.GET.get('ciudad', '').strip()
+    # select_related evita una consulta extra por tarjeta al leer refugio.direccion
+    qs = Mascota.objects.filter(adoptada=False).select_related('refugio')
 
+    orden = ORDEN_CATALOGO
     if q:
-        qs = qs.filter(Q(nombre__icontains=q) | Q(raza__icontains=q) | Q(especie__icontains=q))
+        # Texto completo + trigramas; los resultados se ordenan por relevancia
+        qs = buscar_mascotas(qs, q)
+        orden = ORDEN_RELEVANCIA
     if especie:
         qs = qs.filter(especie__iexact=especie)
     if raza:
         qs = qs.filter(raza__iexact=raza)
     if ciudad:
-        qs = qs.filter(refugio__direccion__icontains=ciudad)
+        # Igualdad sobre la columna indexada Refugio.ciudad
+        qs = qs.filter(refugio__ciudad=ciudad)
 
-    especies = Mascota.objects.order_by().values_list('especie', flat=True).distinct()
-    razas = Mascota.objects.order_by().values_list('raza', flat=True).exclude(raza__exact='').distinct()
-    # Ciudades (Mejor obtenidas desde Refugio)
-    ciudades = (Refugio.objects
-                .order_by() 
-                .values_list('direccion', flat=True)
-                .exclude(direccion__exact='')
-                .distinct())
+    pagina = paginar_keyset(qs, orden, cursor, por_pagina=MASCOTAS_POR_PAGINA, filtros=filtros)
+
+    # Especie / raza / ciudad con su conteo, desde el caché de facetas
+    facetas = obtener_facetas()
 
     context = {
-        'mascotas': qs,
-        'especies': especies,
-        'razas': razas,
-        'ciudades': ciudades,
+        'mascotas': pagina.objetos,
+        'pagina': pagina,
+        'filtros': filtros,
+        'es_primera_pagina': cursor is None,
+        'especies': facetas['especies'],
+        'razas': facetas['razas'],
+        'ciudades': facetas['ciudades'],
     }
     return render(request, 'usuarios/home.html', context)
 
@@ -166,24 +184,17 @@ def home(request):
 @login_required
 def ver_perfil(request):
     # 🔑 CORRECCIÓN: Si el usuario tiene un perfil de Refugio, redirigir allí.
-    try:
-        if request.user.refugio.es_refugio:
-            return redirect('usuarios:panel_refugio')
-    except Refugio.DoesNotExist:
-        # Esto significa que el usuario NO es un Refugio, que es lo esperado para un Adoptante.
-        pass
-    except AttributeError:
-        # Maneja casos donde 'user.refugio' no existe
-        pass
+    if request.role == ROL_REFUGIO:
+        return redirect('usuarios:panel_refugio')
 
     # Lógica original para Adoptantes:
-    adoptante = get_object_or_404(Adoptante, user=request.user)
+    adoptante = perfil_adoptante(request)
     return render(request, 'usuarios/perfil.html', {'adoptante': adoptante})
 
 
 @login_required
 def editar_perfil(request):
-    adoptante = get_object_or_404(Adoptante, user=request.user)
+    adoptante = perfil_adoptante(request)
     if request.method == "POST":
         user_form = UserForm(request.POST, instance=request.user)
         adoptante_form = AdoptanteForm(request.POST, request.FILES, instance=adoptante)
@@ -226,7 +237,7 @@ def cambiar_contrasena(request):
 @login_required
 def desactivar_cuenta(request):
     """Permite al adoptante desactivar su cuenta (sin eliminarla)."""
-    adoptante = get_object_or_404(Adoptante, user=request.user)
+    adoptante = perfil_adoptante(request)
 
     if request.method == "POST":
         # Desactiva el usuario y su perfil
@@ -245,7 +256,12 @@ def desactivar_cuenta(request):
 
 @login_required
 def descargar_datos(request, formato='json'):
-    adoptante = get_object_or_404(Adoptante, user=request.user)
+    adoptante = perfil_adoptante(request)
+    if formato == 'zip':
+        # Todos los datos (solicitudes, mascotas adoptadas, seguimientos y foto), en streaming
+        response = StreamingHttpResponse(generar_zip(adoptante), content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename=datos_{request.user.username}.zip'
+        return response
     data = {
         'nombre': request.user.first_name,
         'apellido': request.user.last_name,
@@ -277,52 +293,38 @@ def admin_dashboard(request):
     """
     return render(request, 'usuarios/admin_dashboard.html')
 
-def es_refugio(user):
-    """Verifica si el usuario logueado está asociado a un perfil Refugio."""
-    try:
-        # Devuelve True si el perfil Refugio existe y tiene el campo es_refugio=True
-        return user.refugio.es_refugio
-    except Refugio.DoesNotExist:
-        return False
-    except AttributeError:
-        # Maneja el caso en que user.refugio no existe (es Adoptante o Admin)
-        return False
-
-
-@user_passes_test(es_refugio, login_url='usuarios:login')
+@refugio_requerido
 @login_required
 def panel_refugio(request):
-    # Accede directamente al objeto Refugio a través del usuario logueado
-    refugio_usuario = request.user.refugio
-    
-    # 1. Mascotas propias: Filtra todas las mascotas que le pertenecen
-    mascotas_propias = Mascota.objects.filter(refugio=refugio_usuario).order_by('-fecha_ingreso')
-    
-    # 2. Solicitudes pendientes: Filtra solicitudes de SUS mascotas en estado 'pendiente'
-    solicitudes_pendientes = SolicitudAdopcion.objects.filter(
-        mascota__in=mascotas_propias, # Filtra por las mascotas que acabamos de obtener
-        estado='pendiente'
-    ).select_related('mascota').order_by('-fecha_solicitud')
-    
+    # El perfil Refugio ya viene resuelto por RolMiddleware
+    refugio_usuario = request.profile
+
+    # Contadores precalculados (ver usuarios/contadores.py): una fila, sin COUNT(*)
+    estadisticas = obtener_estadisticas_refugio(refugio_usuario)
+
+    # Solicitudes pendientes de SUS mascotas (solo se consultan si hay alguna)
+    solicitudes_pendientes = []
+    if estadisticas.solicitudes_pendientes:
+        solicitudes_pendientes = SolicitudAdopcion.objects.filter(
+            mascota__refugio=refugio_usuario,
+            estado='pendiente'
+        ).select_related('mascota').order_by('-fecha_solicitud')
+
     contexto = {
         'refugio': refugio_usuario,
-        'mascotas_propias': mascotas_propias,
+        'estadisticas': estadisticas,
         'solicitudes_pendientes': solicitudes_pendientes,
-        'conteo_mascotas': mascotas_propias.count(),
-        'conteo_solicitudes': solicitudes_pendientes.count(),
+        'conteo_mascotas': estadisticas.mascotas_total,
+        'conteo_solicitudes': estadisticas.solicitudes_pendientes,
     }
     return render(request, 'usuarios/panel_refugio.html', contexto)
 
-@user_passes_test(es_refugio, login_url='usuarios:login')
+@refugio_requerido
 @login_required
 def editar_perfil_refugio(request):
     """Permite a un usuario de tipo Refugio editar su perfil y la info del User asociado."""
     
-    try:
-        refugio = request.user.refugio
-    except Refugio.DoesNotExist:
-        messages.error(request, 'Error: Tu perfil de refugio no está vinculado correctamente.')
-        return redirect('usuarios:panel_refugio')
+    refugio = request.profile
 
     if request.method == "POST":
         # UserForm: maneja first_name, last_name, email (del User)
@@ -353,10 +355,20 @@ def solicitud_enviada(request):
 
 @login_required
 def mis_solicitudes(request):
-    # Obtiene todas las solicitudes hechas por el email del usuario logueado
-    solicitudes = SolicitudAdopcion.objects.filter(email=request.user.email).order_by('-fecha_solicitud')
+    # Solicitudes del adoptante logueado (join indexado por la FK, no por email)
+    historial = request.GET.get('historial') == '1'
+    if historial:
+        # Se suman las solicitudes archivadas (UNION ALL con la tabla de archivo)
+        solicitudes = list(historial_solicitudes(Q(adoptante__user=request.user))
+                           .order_by('-fecha_solicitud', '-id'))
+        prefetch_related_objects(solicitudes, 'mascota__refugio')
+    else:
+        solicitudes = (SolicitudAdopcion.objects
+                       .filter(adoptante__user=request.user)
+                       .select_related('mascota')
+                       .order_by('-fecha_solicitud'))
 
-    contexto = {'solicitudes': solicitudes}
+    contexto = {'solicitudes': solicitudes, 'historial': historial}
     return render(request, 'usuarios/mis_solicitudes.html', contexto)
 
     # usuarios/views.py
@@ -369,11 +381,8 @@ def redirigir_perfil(request):
         return redirect('admin_panel:dashboard')
 
     # 🔹 Si es refugio → panel del refugio
-    try:
-        if hasattr(user, 'refugio') and user.refugio.es_refugio:
-            return redirect('usuarios:panel_refugio')
-    except Exception:
-        pass
+    if request.role == ROL_REFUGIO:
+        return redirect('usuarios:panel_refugio')
 
     # 🔹 Caso por defecto → perfil del adoptante
     return redirect('usuarios:perfil')
@@ -385,37 +394,37 @@ from django.contrib.auth.decorators import login_required
 from mascotas.models import Mascota, SolicitudAdopcion
 from seguimiento.models import Seguimiento
 
+# Las revisiones sin hora van al final de su día: NULLS LAST, como en el índice btree
+ORDEN_MIS_SEGUIMIENTOS = ('fecha_revision', F('hora_revision').asc(nulls_last=True), 'id')
+SEGUIMIENTOS_POR_PAGINA = 25
+
+
+def seguimientos_de_adoptante(user):
+    """
+    Revisiones de las mascotas que ``user`` adoptó, en una sola consulta:
+    Seguimiento -> Mascota -> SolicitudAdopcion aprobada -> Adoptante. La
+    restricción única (mascota, adoptante) garantiza que no haya filas
+    repetidas.
+
+    Las revisiones de cada mascota se leen de ``seguimiento_mascota_orden_idx``
+    (mascota, fecha, hora, id), que tiene el mismo orden que
+    :data:`ORDEN_MIS_SEGUIMIENTOS`; la posición del cursor entra en la
+    condición del índice, así que una página no vuelve a leer las anteriores.
+    """
+    return (Seguimiento.objects
+            .filter(mascota__solicitudadopcion__adoptante__user=user,
+                    mascota__solicitudadopcion__estado='aprobada')
+            .select_related('mascota', 'veterinario'))
+
+
 @login_required
 def mis_seguimientos(request):
-    try:
-        # Obtener el adoptante logueado
-        adoptante = request.user.adoptante
-    except Exception:
-        # Si el usuario no es adoptante
-        adoptante = None
-
-    seguimientos = []
-    
-    if adoptante:
-        # Obtener solicitudes aprobadas del adoptante
-        solicitudes = SolicitudAdopcion.objects.filter(
-            nombre_adoptante=adoptante.user.first_name,
-            apellido_adoptante=adoptante.user.last_name,
-            estado='aprobada'
-        )
-
-        # Obtener mascotas asociadas a esas solicitudes
-        mascotas_adoptadas = Mascota.objects.filter(
-            id__in=solicitudes.values_list('mascota_id', flat=True)
-        )
-
-        # Obtener los seguimientos de esas mascotas
-        seguimientos = Seguimiento.objects.filter(
-            mascota__in=mascotas_adoptadas
-        ).order_by('fecha_revision')
-
+    cursor = decodificar_cursor(request.GET.get('cursor'))
+    pagina = paginar_keyset(seguimientos_de_adoptante(request.user), ORDEN_MIS_SEGUIMIENTOS,
+                            cursor, por_pagina=SEGUIMIENTOS_POR_PAGINA)
     context = {
-        'seguimientos': seguimientos
+        'seguimientos': pagina.objetos,
+        'pagina': pagina,
+        'es_primera_pagina': cursor is None,
     }
-
     return render(request, 'usuarios/mis_seguimientos.html', context)